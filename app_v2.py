@@ -1,52 +1,31 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
-import os
-import base64
-from datetime import datetime
-import io
+from importlib import import_module
 
-# Import necessary functions and constants from utils
-# Removed daily_bills_folder from import as it's not a direct export
-from utils.config import DATABASE_NAME, BILLS_FOLDER, create_bills_directory, create_tables 
-from utils.fetch_customers import get_customer_details_for_update, get_all_customer_names, fetch_all_customers, update_customer, add_new_customer, get_customer_details
-from utils.invoice_id_creation import generate_udhaar_invoice_id, generate_purchase_invoice_id, generate_sales_invoice_id, get_next_invoice_number
-from utils.save_sale import save_sale
-from utils.get_pending_udhaar_sale import get_pending_udhaar, get_all_pending_udhaar, get_sale_details, update_udhaar_balance
-from utils.generate_sell_pdf import generate_sell_pdf
-from utils.get_download_link import get_download_link
-from utils.load_and_display_pdf import load_and_display_pdf
-from utils.save_purchase import save_purchase
-from utils.generate_purchase_pdf import generate_purchase_pdf
-from utils.get_pending_purchase_udhaar import get_pending_purchase_udhaar, get_all_pending_purchase_udhaar, update_purchase_udhaar
-from utils.save_udhaar import save_udhaar_deposit
-from utils.delete_bill import delete_bill
-#from utils.delete_udhaar_bill import delete_udhaar_bill
-from utils.fetch_bill_data import fetch_bill_data
-from utils.db_manager import DBManager # Ensure DBManager is imported
-
-# Import UI sections
-from ui.sell_section_ui import sell_section
-from ui.purchase_section_ui import purchase_section
-from ui.udhaar_section_ui import udhaar_section
-from ui.delete_bill_section import delete_bill_section
-from ui.reprint_section import reprint_bill_section
-from ui.customer_management_ui import customer_management
-from ui.reports_section import reports_section
+# Only what the login page needs is imported up front. Each menu entry's section
+# (and with it pandas, reportlab and the utils it uses) is imported the first
+# time it is opened; later reruns get it from sys.modules.
+from utils.config import ensure_schema
+from utils.pdf_jobs import start_workers
 from ui.login_page import login_page
-from ui.modify_bill_section import modify_bill_section # NEW IMPORT
-
-# --- Page Configuration ---
-st.set_page_config(
-    page_title="Jewellery Shop Management",
-    page_icon="💎",
-    layout="wide",
-    initial_sidebar_state="expanded",
-)
 
-# --- Initialize Database (Crucial: Call create_tables at the very beginning) ---
-create_tables()
+# Menu entry -> (module, function) rendering it
+SECTIONS = {
+    "Sell Jewellery": ("ui.sell_section_ui", "sell_section"),
+    "Purchase Jewellery": ("ui.purchase_section_ui", "purchase_section"),
+    "Udhaar Management": ("ui.udhaar_section_ui", "udhaar_section"),
+    "Delete Bill": ("ui.delete_bill_section", "delete_bill_section"),
+    "Reprint Bill": ("ui.reprint_section", "reprint_bill_section"),
+    "Customer Management": ("ui.customer_management_ui", "customer_management"),
+    "Reports & Analytics": ("ui.reports_section", "reports_section"),
+    "Modify Bills": ("ui.modify_bill_section", "modify_bill_section"),
+    "Query Performance": ("ui.query_stats_section", "query_stats_section"),
+    "PDF Jobs": ("ui.pdf_jobs_ui", "pdf_jobs_section"),
+}
 
+def load_section(menu):
+    """Imports the section module for a menu entry on first use and returns its render function."""
+    module_name, function_name = SECTIONS[menu]
+    return getattr(import_module(module_name), function_name)
 
 # --- Main App ---
 def main():
@@ -54,34 +33,10 @@ def main():
     
     # Sidebar menu
     st.sidebar.title("Navigation")
-    menu = st.sidebar.radio("Select Option", [
-        "Sell Jewellery", 
-        "Purchase Jewellery", 
-        "Udhaar Management", 
-        "Delete Bill",
-        "Reprint Bill",
-        "Customer Management",
-        "Reports & Analytics",
-        "Modify Bills"
-    ])
+    menu = st.sidebar.radio("Select Option", list(SECTIONS))
     
     # Display appropriate section based on menu selection
-    if menu == "Sell Jewellery":
-        sell_section()
-    elif menu == "Purchase Jewellery":
-        purchase_section()
-    elif menu == "Udhaar Management":
-        udhaar_section()
-    elif menu == "Delete Bill":
-        delete_bill_section()
-    elif menu == "Reprint Bill":
-        reprint_bill_section()    
-    elif menu == "Customer Management":
-        customer_management()
-    elif menu == "Reports & Analytics":
-        reports_section()
-    elif menu == "Modify Bills": # NEW OPTION
-        modify_bill_section() 
+    load_section(menu)()
 
     
     # Copyright information in the sidebar (Recommended)
@@ -101,7 +56,24 @@ def main():
 
 
 # --- Main Application Logic ---
+# Streamlit's script runner executes this file as a module named __main__ (installed
+# as sys.modules['__main__'] during the run). Batch reprint workers (spawned processes,
+# see utils/batch_reprint.py) re-import it as __mp_main__ and must skip all of this.
 if __name__ == "__main__":
+    # --- Page Configuration ---
+    st.set_page_config(
+        page_title="Jewellery Shop Management",
+        page_icon="💎",
+        layout="wide",
+        initial_sidebar_state="expanded",
+    )
+
+    # --- Initialize Database (Crucial: before any section touches it) ---
+    # Creates/upgrades the schema once per SCHEMA_VERSION, not on every rerun
+    ensure_schema()
+    # Background PDF rendering for bills saved by any session (starts once per server process)
+    start_workers()
+
     # Initialize session state variables if they don't exist
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
@@ -0,0 +1,83 @@
+"""
+Batch reprint throughput: PDFs per second against the number of worker processes.
+
+Creates a scratch database with sales, purchases and udhaar deposits
+(benchmarks.generate_shop_data), then reprints all of them into a ZIP with
+utils.batch_reprint for each worker count. 1 worker renders in-process; the
+others include starting the process pool, as a batch from the Reprint screen
+does. Each configuration runs --repeat times and the best run is reported,
+with the speedup over one worker. The PDF cache is emptied before every run,
+so each one renders (and caches) every bill, like a first-time batch.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_reprint [--sales 600] [--purchases 150] [--deposits 100] [--workers 1,2,4,8]
+"""
+import argparse
+import os
+import tempfile
+from datetime import date
+
+from benchmarks.generate_shop_data import ShopDataGenerator, quiet
+
+
+def _default_workers():
+    cores = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sales", type=int, default=600)
+    parser.add_argument("--purchases", type=int, default=150)
+    parser.add_argument("--deposits", type=int, default=100)
+    parser.add_argument("--customers", type=int, default=300)
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="bills per worker task (default: REPRINT_CHUNK_SIZE)")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(',')] if args.workers else _default_workers()
+
+    scratch = tempfile.mkdtemp(prefix="bench_batch_reprint_")
+    os.chdir(scratch)
+    from utils.config import create_tables # Local imports: after the chdir into the scratch folder
+    from utils.batch_reprint import find_bills, batch_reprint, REPRINT_CHUNK_SIZE
+    from utils import pdf_cache
+    with quiet():
+        create_tables()
+        generator = ShopDataGenerator(args.seed)
+        for _ in range(args.customers):
+            generator.add_customer()
+        for _ in range(args.sales):
+            generator.sale()
+        for _ in range(args.purchases):
+            generator.purchase()
+        for _ in range(args.deposits):
+            if not generator.deposit():
+                break
+
+    bills = find_bills(date(2000, 1, 1), date.today())
+    chunk_size = args.chunk_size or REPRINT_CHUNK_SIZE
+    print(f"{len(bills)} bills, {os.cpu_count()} CPU(s), chunks of {chunk_size}")
+
+    baseline = None
+    for workers in worker_counts:
+        best = None
+        for _ in range(args.repeat):
+            pdf_cache.clear() # Workers share the cache folder; a warm cache would skip the rendering
+            zip_path = os.path.join(scratch, f"reprint_{workers}.zip")
+            result = batch_reprint(bills, zip_path, workers=workers, chunk_size=chunk_size)
+            if result['failed']:
+                raise RuntimeError(f"{len(result['failed'])} bills failed, e.g. {result['failed'][0]}")
+            best = result['seconds'] if best is None else min(best, result['seconds'])
+        rate = result['rendered'] / best
+        baseline = baseline or rate
+        print(f"{workers:3d} worker(s): {best:7.2f} s   {rate:7.1f} PDFs/s   x{rate / baseline:.2f}   "
+              f"ZIP {os.path.getsize(zip_path) / 1024 / 1024:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
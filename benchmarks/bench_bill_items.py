@@ -0,0 +1,96 @@
+"""
+Item-write benchmark for saving a bill: per-item statements vs executemany.
+
+"loop" issues what save_sale used to run for every line item: an INSERT into
+sale_items, a stock UPDATE, a SELECT to re-read the stock and an INSERT into
+inventory_transactions. "batched" is the current save_sale shape: one
+executemany for the item rows, UPDATE ... RETURNING for the stock and one
+executemany for the inventory log. Both run inside a single db.transaction()
+on the real schema, so the difference is only the statement pattern.
+
+Run from the repository root:
+    python -m benchmarks.bench_bill_items [--bills 200] [--sizes 1 10 100]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from utils.db_manager import DBManager
+
+ITEM_INSERT = """
+    INSERT INTO sale_items (
+        invoice_id, product_id, metal, metal_rate, description, qty, net_wt,
+        purity, gross_wt, loss_wt, making_charge, making_charge_type,
+        stone_weight, stone_charge, wastage_percentage, amount,
+        cgst_rate, sgst_rate, hsn, created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INVENTORY_INSERT = """
+    INSERT INTO inventory_transactions (
+        product_id, transaction_type, quantity_change,
+        current_stock_after, reference_id, transaction_date, notes, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _item_row(invoice_id, product_id, ts):
+    return (invoice_id, product_id, 'Gold', 6500.0, 'Ring', 1, 4.2, '22K', 4.5, 0.3,
+            500.0, 'fixed', 0.0, 0.0, 0.0, 27800.0, 1.5, 1.5, '7113', ts, ts)
+
+def _save_header(db, invoice_id, ts):
+    db.execute_query(
+        "INSERT INTO sales (invoice_id, sale_date, customer_id, total_amount, amount_balance, created_at, updated_at) VALUES (?, ?, 1, 0, 0, ?, ?)",
+        (invoice_id, ts, ts, ts)
+    )
+
+def save_items_loop(db, invoice_id, product_ids, ts):
+    with db.transaction():
+        _save_header(db, invoice_id, ts)
+        for product_id in product_ids:
+            db.execute_query(ITEM_INSERT, _item_row(invoice_id, product_id, ts))
+            db.execute_query("UPDATE products SET current_stock = current_stock - ?, updated_at = ? WHERE product_id = ?", (1, ts, product_id))
+            new_stock = db.fetch_one("SELECT current_stock FROM products WHERE product_id = ?", (product_id,))[0]
+            db.execute_query(INVENTORY_INSERT, (product_id, 'sale_out', -1, new_stock, invoice_id, ts, "bench", ts))
+
+def save_items_batched(db, invoice_id, product_ids, ts):
+    with db.transaction():
+        _save_header(db, invoice_id, ts)
+        db.execute_many(ITEM_INSERT, [_item_row(invoice_id, product_id, ts) for product_id in product_ids])
+        inventory_rows = []
+        for product_id in product_ids:
+            new_stock = db.fetch_all(
+                "UPDATE products SET current_stock = current_stock - ?, updated_at = ? WHERE product_id = ? RETURNING current_stock",
+                (1, ts, product_id)
+            )[0][0]
+            inventory_rows.append((product_id, 'sale_out', -1, new_stock, invoice_id, ts, "bench", ts))
+        db.execute_many(INVENTORY_INSERT, inventory_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=200, help="bills saved per size and strategy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="line items per bill")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_items_"))
+    from utils.config import create_tables # Local import: create_tables works on the current folder
+    create_tables()
+    db = DBManager()
+    db.execute_query("INSERT INTO customers (name) VALUES ('Bench Customer')")
+    with db.transaction():
+        for i in range(max(args.sizes)):
+            db.execute_query("INSERT INTO products (product_name, current_stock) VALUES (?, ?)", (f"Product {i}", 1e9))
+
+    for size in args.sizes:
+        product_ids = list(range(1, size + 1))
+        for label, save in (("loop", save_items_loop), ("batched", save_items_batched)):
+            timings = []
+            for n in range(args.bills):
+                start = time.perf_counter()
+                save(db, f"{label}-{size}-{n}", product_ids, "2024-01-01T10:00:00")
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{size:4d} items  {label:>8}: median {statistics.median(timings):7.3f} ms/bill   "
+                  f"mean {statistics.mean(timings):7.3f} ms/bill")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of logging on the save path: save_sale with debug logging off vs on.
+
+Creates a scratch database with some customers (benchmarks.generate_shop_data),
+then saves sales through utils.save_sale in alternating blocks with the
+utils.* loggers at INFO (the default: debug calls are skipped) and at DEBUG
+(every debug line is formatted and written as JSON to a log file in the
+scratch folder, as when debugging a problem at the counter). It also times a
+bare log.debug call below the configured level, which is what the hot path
+pays per call site with debug off.
+
+Run from the repository root:
+    python -m benchmarks.bench_logging [--sales 2000] [--blocks 10] [--customers 500]
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.generate_shop_data import ShopDataGenerator, quiet
+
+MODES = {
+    'debug off': {'utils': 'INFO'},
+    'debug on': {'utils': 'DEBUG'},
+}
+
+
+def _disabled_call_ns(logger, calls=200_000):
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.debug("Clearing %s from purchase invoice %s", i, 'PUR-2025-26-00001', extra={'invoice_id': 'SAL-2025-26-00001'})
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sales", type=int, default=2000, help="sales saved per mode")
+    parser.add_argument("--blocks", type=int, default=10, help="alternating blocks the sales are split into")
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_logging_")
+    os.chdir(scratch)
+    from utils.app_logging import configure_logging, get_logger # Local imports: after the chdir into the scratch folder
+    from utils.config import create_tables
+    from utils import query_stats
+    query_stats.configure(enabled=False) # Measure logging alone
+    log_file = os.path.join(scratch, 'logs', 'app.log')
+
+    configure_logging(MODES['debug off'], console=False)
+    with quiet():
+        create_tables()
+        generator = ShopDataGenerator(args.seed)
+        for _ in range(args.customers):
+            generator.add_customer()
+
+    per_block = max(args.sales // args.blocks, 1)
+    timings = {mode: [] for mode in MODES}
+    for _ in range(args.blocks):
+        for mode, levels in MODES.items():
+            configure_logging(levels, console=False, log_file=log_file if mode == 'debug on' else None)
+            with quiet():
+                for _ in range(per_block):
+                    start = time.perf_counter()
+                    generator.sale()
+                    timings[mode].append(time.perf_counter() - start)
+
+    configure_logging(MODES['debug off'], console=False)
+    disabled_ns = _disabled_call_ns(get_logger('utils.save_sale'))
+    logging.shutdown()
+
+    for mode, values in timings.items():
+        ms = sorted(t * 1000 for t in values)
+        print(f"save_sale, {mode:>9}: median {statistics.median(ms):7.3f} ms   "
+              f"p95 {ms[int(len(ms) * 0.95) - 1]:7.3f} ms   {len(ms) / sum(values):8.1f} sales/s")
+    off, on = (statistics.median(timings[mode]) for mode in MODES)
+    print(f"debug on costs {(on - off) * 1000:+.3f} ms per sale ({(on - off) / off * 100:+.1f}%)")
+    print(f"log.debug below the level: {disabled_ns:.0f} ns per call")
+    print(f"debug log written to {log_file} ({os.path.getsize(log_file) / 1024:.0f} KiB)")
+
+if __name__ == "__main__":
+    main()
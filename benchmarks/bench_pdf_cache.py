@@ -0,0 +1,73 @@
+"""
+Reprint latency with the PDF cache: rendering vs serving a cached PDF.
+
+Creates a scratch database with some sales (benchmarks.generate_shop_data)
+and reprints each bill the way the Reprint Bill screen does (fetch_bill_data,
+then generate_sell_pdf in memory) three times:
+
+    no cache  the cache turned off: every reprint renders with reportlab
+    cold      cache on but empty: render, plus hashing and storing the PDF
+    warm      the same bills again: served from the cache
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf_cache [--bills 200] [--customers 100]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.generate_shop_data import ShopDataGenerator, quiet
+
+
+def _reprint_times(invoice_ids):
+    from utils.fetch_bill_data import fetch_bill_data
+    from utils.generate_sell_pdf import generate_sell_pdf
+    timings = []
+    for invoice_id in invoice_ids:
+        start = time.perf_counter()
+        customer_details, sale_data, sale_items = fetch_bill_data(invoice_id)
+        generate_sell_pdf(customer_details, sale_data, sale_items, download=True, save_to_disk=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_pdf_cache_")
+    os.chdir(scratch)
+    from utils.config import create_tables # Local imports: after the chdir into the scratch folder
+    from utils.db_manager import DBManager
+    from utils import pdf_cache
+    with quiet():
+        create_tables()
+        generator = ShopDataGenerator(args.seed)
+        for _ in range(args.customers):
+            generator.add_customer()
+        for _ in range(args.bills):
+            generator.sale()
+    invoice_ids = [row[0] for row in DBManager().fetch_all("SELECT invoice_id FROM sales ORDER BY invoice_id")]
+    _reprint_times(invoice_ids[:5]) # Fonts, styles and imports load once, outside the timings
+
+    results = {}
+    pdf_cache.configure(enabled=False)
+    results['no cache'] = _reprint_times(invoice_ids)
+    pdf_cache.configure(enabled=True)
+    pdf_cache.clear()
+    results['cold'] = _reprint_times(invoice_ids)
+    results['warm'] = _reprint_times(invoice_ids)
+
+    for mode, timings in results.items():
+        ms = sorted(timings)
+        print(f"{mode:>8}: median {statistics.median(ms):7.3f} ms   p95 {ms[int(len(ms) * 0.95) - 1]:7.3f} ms   "
+              f"{len(ms) / sum(ms) * 1000:8.1f} reprints/s")
+    stats = pdf_cache.stats()
+    print(f"cache: {stats['files']} PDFs, {stats['bytes'] / 1024:.0f} KiB in {os.path.join(scratch, pdf_cache.PDF_CACHE_DIR)}")
+
+if __name__ == "__main__":
+    main()
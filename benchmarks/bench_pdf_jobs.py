@@ -0,0 +1,82 @@
+"""
+Time the counter waits for the invoice PDF after saving a bill: inline rendering vs the background queue.
+
+Creates a scratch database with some sales (benchmarks.generate_shop_data)
+and, for each bill, times what the Sell screen does after save_sale returns:
+
+    inline    fetch the bill and render its PDF into the bills folder, as the
+              screen did before utils.pdf_jobs
+    enqueue   enqueue_pdf only; the worker thread renders meanwhile
+
+For the queue it also reports how long the worker took to finish the PDFs
+of all the bills, saved back to back. The PDF cache is off, so every PDF
+is rendered.
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf_jobs [--bills 200] [--customers 100]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.generate_shop_data import ShopDataGenerator, quiet
+
+
+def _summary(name, timings):
+    ms = sorted(timings)
+    print(f"{name:>16}: median {statistics.median(ms):8.3f} ms   p95 {ms[int(len(ms) * 0.95) - 1]:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="bench_pdf_jobs_")
+    os.chdir(scratch)
+    from utils.config import create_tables # Local imports: after the chdir into the scratch folder
+    from utils.db_manager import DBManager
+    from utils.fetch_bill_data import fetch_bill_data
+    from utils.generate_sell_pdf import generate_sell_pdf
+    from utils import pdf_cache, pdf_jobs
+    with quiet():
+        create_tables()
+        generator = ShopDataGenerator(args.seed)
+        for _ in range(args.customers):
+            generator.add_customer()
+        for _ in range(args.bills):
+            generator.sale()
+    pdf_cache.configure(enabled=False)
+    invoice_ids = [row[0] for row in DBManager().fetch_all("SELECT invoice_id FROM sales ORDER BY invoice_id")]
+    for invoice_id in invoice_ids[:5]: # Fonts, styles and imports load once, outside the timings
+        generate_sell_pdf(*fetch_bill_data(invoice_id), download=True, save_to_disk=False)
+
+    inline = []
+    for invoice_id in invoice_ids:
+        start = time.perf_counter()
+        generate_sell_pdf(*fetch_bill_data(invoice_id))
+        inline.append((time.perf_counter() - start) * 1000)
+
+    enqueue, job_ids = [], []
+    with quiet():
+        pdf_jobs.start_workers()
+        first = time.perf_counter()
+        for invoice_id in invoice_ids:
+            start = time.perf_counter()
+            job_ids.append(pdf_jobs.enqueue_pdf('sale', invoice_id))
+            enqueue.append((time.perf_counter() - start) * 1000)
+        for job_id in job_ids:
+            job = pdf_jobs.wait_for_job(job_id, timeout=300)
+            if job['status'] != 'done':
+                raise RuntimeError(f"job {job_id} ended {job['status']}: {job['error']}")
+        drained = time.perf_counter() - first
+
+    _summary("inline", inline)
+    _summary("enqueue", enqueue)
+    print(f"queue drained: {len(job_ids)} PDFs in {drained:.2f} s ({len(job_ids) / drained:.1f} PDFs/s)")
+
+if __name__ == "__main__":
+    main()
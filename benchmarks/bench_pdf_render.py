@@ -0,0 +1,66 @@
+"""
+Per-invoice render time of generate_sell_pdf with and without the shared PDF resources.
+
+"per-invoice" clears the utils.pdf_resources caches before every bill, which
+repeats the font registration (TTF parsing) and getSampleStyleSheet() that
+each generator used to do on every call. "cached" registers once and reuses
+the frozen styles. Bills are rendered in a scratch folder.
+
+Pass the regular/bold TrueType files to measure with real fonts; they are
+copied into the scratch folder as arial.ttf / arialbd.ttf. Without them the
+built-in Helvetica is used and only the stylesheet cost is measured.
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf_render [--bills 50] [--font arial.ttf] [--bold-font arialbd.ttf]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import utils.pdf_cache as pdf_cache
+import utils.pdf_resources as pdf_resources
+from utils.generate_sell_pdf import generate_sell_pdf
+
+CUSTOMER = {'name': 'Bench Customer', 'address': 'Main Road', 'phone': '9999999999'}
+SALE = ('SAL-2025-26-00001', '2025-06-01T11:30:00', 1, 55600.0, 0.0, 0.0, 0.0, 50000.0,
+        5600.0, 0.0, 'Cash', '', '2025-06-01T11:30:00', '2025-06-01T11:30:00')
+ITEM = (1, 'SAL-2025-26-00001', None, 'Gold', 6500.0, 'Ring', 1, 4.2, '22K', 4.5, 0.3,
+        500.0, 'fixed', 0.0, 0.0, 0.0, 27800.0, 1.5, 1.5, '7113', '2025-06-01', '2025-06-01')
+
+def _render_times(bills, reset_caches):
+    timings = []
+    for _ in range(bills):
+        if reset_caches:
+            pdf_resources._fonts = None
+            pdf_resources._styles = None
+        start = time.perf_counter()
+        generate_sell_pdf(CUSTOMER, SALE, [ITEM, ITEM], download=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bills", type=int, default=50)
+    parser.add_argument("--font", help="TrueType file used as arial.ttf")
+    parser.add_argument("--bold-font", help="TrueType file used as arialbd.ttf")
+    args = parser.parse_args()
+    pdf_cache.configure(enabled=False) # Every bill is the same; measure rendering, not the PDF cache
+
+    folder = tempfile.mkdtemp(prefix="bench_pdf_")
+    if args.font:
+        shutil.copy(args.font, os.path.join(folder, pdf_resources.REGULAR_FONT[1]))
+    if args.bold_font:
+        shutil.copy(args.bold_font, os.path.join(folder, pdf_resources.BOLD_FONT[1]))
+    os.chdir(folder) # Fonts are looked up and bills written relative to the current folder
+
+    _render_times(3, reset_caches=False) # Warm up imports and reportlab internals
+    for label, reset_caches in (("per-invoice", True), ("cached", False)):
+        timings = _render_times(args.bills, reset_caches)
+        print(f"{label:>11}: median {statistics.median(timings):7.2f} ms/bill   "
+              f"mean {statistics.mean(timings):7.2f} ms/bill   (font: {pdf_resources.get_pdf_fonts()[0]})")
+
+if __name__ == "__main__":
+    main()
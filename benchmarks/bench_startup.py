@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark: time to first paint of login_page.
+
+Each sample starts a fresh Python process (so nothing is imported yet), loads
+Streamlit's AppTest harness and runs the app script once, which is what a
+browser opening the app triggers; the time until the login page has rendered
+is the first paint. A second run in the same process measures a rerun (every
+widget interaction re-executes the script). Streamlit's own import is not
+counted, since the server has it loaded before the first script run.
+
+The first sample starts on an empty folder (the database is created); the
+others reopen that database, as after a restart. The heavy modules loaded by
+the login page alone are listed, to catch eager imports creeping back.
+
+To compare with an older app script, save it next to app_v2.py and pass it:
+    git show <commit>:app_v2.py > app_old.py
+    python -m benchmarks.bench_startup --app app_old.py
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--samples 10] [--app app_v2.py]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('pandas', 'reportlab', 'numpy')
+
+CHILD = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file({app!r}, default_timeout=120)
+app.run()
+first_paint = time.perf_counter() - start
+if app.exception:
+    raise SystemExit(f"App raised: {{app.exception[0].value}}")
+if not app.text_input:
+    raise SystemExit("Login page did not render")
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+print(json.dumps({{
+    'first_paint_ms': first_paint * 1000,
+    'rerun_ms': rerun * 1000,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+def _sample(app, folder):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    result = subprocess.run([sys.executable, "-c", CHILD.format(app=app, heavy=HEAVY_MODULES)],
+                            cwd=folder, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup sample failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10, help="restarts on the existing database")
+    parser.add_argument("--app", default="app_v2.py", help="app script, relative to the repository root")
+    args = parser.parse_args()
+
+    app = os.path.join(REPO_ROOT, args.app)
+    folder = tempfile.mkdtemp(prefix="bench_startup_") # The app opens jewellery_app.db in its working folder
+
+    new_database = _sample(app, folder)
+    samples = [_sample(app, folder) for _ in range(args.samples)]
+
+    print(f"{args.app}: first paint on a new database {new_database['first_paint_ms']:8.1f} ms")
+    for key, label in (('first_paint_ms', 'first paint after restart'), ('rerun_ms', 'rerun')):
+        values = [sample[key] for sample in samples]
+        print(f"{args.app}: {label:>25} median {statistics.median(values):8.1f} ms   "
+              f"min {min(values):8.1f} ms   max {max(values):8.1f} ms")
+    print(f"{args.app}: heavy modules loaded by the login page: {', '.join(samples[-1]['heavy_modules']) or 'none'}")
+
+if __name__ == "__main__":
+    main()
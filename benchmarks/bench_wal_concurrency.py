@@ -0,0 +1,88 @@
+"""
+Reader/writer concurrency benchmark for the DBManager PRAGMA profile.
+
+One writer thread saves small bills (a sale row plus items, one transaction
+each) while reader threads keep running a full-table report aggregate. The
+run is repeated with the legacy settings (rollback journal, synchronous=FULL)
+and with PRAGMA_PROFILE (WAL, synchronous=NORMAL, ...), and writer latency
+and throughput are printed for both.
+
+Run from the repository root:
+    python -m benchmarks.bench_wal_concurrency [--seconds 5] [--readers 2]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from utils import query_stats
+from utils.db_manager import DBManager, PRAGMA_PROFILE
+
+LEGACY_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 10000,
+}
+
+def _setup(db):
+    db.execute_query("CREATE TABLE sales (invoice_id TEXT PRIMARY KEY, sale_date TEXT, total_amount REAL)")
+    db.execute_query("CREATE TABLE sale_items (item_id INTEGER PRIMARY KEY, invoice_id TEXT, amount REAL)")
+    with db.transaction():
+        for i in range(20000):
+            db.execute_query("INSERT INTO sales VALUES (?, ?, ?)", (f"SEED-{i}", "2024-01-01", i * 1.0))
+            db.execute_query("INSERT INTO sale_items (invoice_id, amount) VALUES (?, ?)", (f"SEED-{i}", i * 1.0))
+
+def _run(label, pragmas, seconds, readers):
+    folder = tempfile.mkdtemp(prefix="bench_wal_")
+    query_stats.configure(log_path=os.path.join(folder, 'logs', 'slow_queries.log')) # Not into the checkout we run from
+    db = DBManager(os.path.join(folder, f"{label}.db"), pool_size=readers + 2, pragmas=pragmas)
+    _setup(db)
+
+    stop = threading.Event()
+    write_latencies = []
+    reads = [0]
+
+    def writer():
+        n = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            with db.transaction():
+                db.execute_query("INSERT INTO sales VALUES (?, ?, ?)", (f"B-{n}", "2024-01-02", 100.0))
+                for _ in range(5):
+                    db.execute_query("INSERT INTO sale_items (invoice_id, amount) VALUES (?, ?)", (f"B-{n}", 20.0))
+            write_latencies.append(time.perf_counter() - start)
+            n += 1
+
+    def reader():
+        while not stop.is_set():
+            db.fetch_all("SELECT s.sale_date, COUNT(*), SUM(si.amount) FROM sales s JOIN sale_items si ON si.invoice_id = s.invoice_id GROUP BY s.sale_date")
+            reads[0] += 1
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies_ms = sorted(l * 1000 for l in write_latencies)
+    p95 = latencies_ms[int(len(latencies_ms) * 0.95) - 1] if latencies_ms else 0.0
+    print(f"{label:>8}: {len(latencies_ms) / seconds:8.1f} bills/s   "
+          f"median {statistics.median(latencies_ms) if latencies_ms else 0.0:7.2f} ms   "
+          f"p95 {p95:7.2f} ms   max {latencies_ms[-1] if latencies_ms else 0.0:8.2f} ms   "
+          f"{reads[0] / seconds:6.1f} reports/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+
+    _run("legacy", LEGACY_PRAGMAS, args.seconds, args.readers)
+    _run("profile", PRAGMA_PROFILE, args.seconds, args.readers)
+
+if __name__ == "__main__":
+    main()
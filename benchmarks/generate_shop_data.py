@@ -0,0 +1,260 @@
+"""
+Seeded synthetic shop data, written through the real utils/ write paths.
+
+Fills jewellery_app.db in a scratch folder with customers, sales (with line
+items and udhaar balances), purchases, udhaar deposits and udhaar payments by
+calling add_new_customer, save_sale, save_purchase, save_udhaar_deposit and
+update_udhaar_balance exactly as the app does, so triggers, the daily summary
+and the invoice counters are all exercised. The same --seed always produces
+the same bills.
+
+The default volumes are a busy shop's history (50k customers, 500k sales,
+~2M sale items); --scale shrinks or grows every volume, e.g. --scale 0.01 for
+a quick database. The folder can then be passed to benchmarks.run_benchmarks.
+
+Run from the repository root:
+    python -m benchmarks.generate_shop_data --folder /tmp/shop [--scale 1.0] [--seed 42]
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Volumes at --scale 1.0
+BASE_VOLUMES = {
+    'customers': 50_000,
+    'sales': 500_000,
+    'purchases': 50_000,
+    'deposits': 100_000,
+    'udhaar_payments': 50_000,
+}
+ITEMS_PER_SALE = (1, 7) # Uniform, ~4 items per sale on average
+CREDIT_SALE_SHARE = 0.3 # Sales that leave an udhaar balance
+HISTORY_DAYS = 3 * 365 # Sale and purchase dates are spread over this many past days
+
+FIRST_NAMES = ['Ramesh', 'Suresh', 'Anita', 'Priya', 'Mohan', 'Kiran', 'Lakshmi', 'Vijay', 'Deepa', 'Arjun', 'Meena', 'Ravi']
+LAST_NAMES = ['Kumar', 'Shetty', 'Rao', 'Patil', 'Sharma', 'Nair', 'Reddy', 'Iyer', 'Gowda', 'Joshi']
+CITIES = ['Bengaluru', 'Mysuru', 'Hubballi', 'Mangaluru', 'Belagavi', 'Pune', 'Chennai']
+METALS = [('Gold', '22K', 6500.0, '7113'), ('Gold', '18K', 5300.0, '7113'), ('Silver', '925', 85.0, '7113')]
+DESCRIPTIONS = ['Ring', 'Chain', 'Bangle', 'Earrings', 'Necklace', 'Pendant', 'Anklet']
+PAYMENT_MODES = ['Cash', 'UPI', 'Online', 'Cheque']
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences stdout while generating or timing; utils log records (stderr) follow the logging setup."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class ShopDataGenerator:
+    """
+    Produces one realistic shop operation per call, through the app's own functions.
+
+    Must be created with the scratch folder as the current directory, since the
+    utils/ modules open DATABASE_NAME relative to it.
+
+    Args:
+        seed (int): Seed for every random choice, so runs are reproducible.
+    """
+
+    def __init__(self, seed=42):
+        from utils.db_manager import DBManager # Local imports: the caller chdirs into the scratch folder first
+        from utils.config import DATABASE_NAME
+        self.rng = random.Random(seed)
+        self.db = DBManager(DATABASE_NAME)
+        self.customer_count = 0
+        self.open_udhaar = [] # [sell_invoice_id, customer_id, balance at sale] for sales with an unpaid balance
+        self.now = datetime.now()
+
+    def load_state(self):
+        """Picks up the customers and open balances of an already generated database."""
+        self.customer_count = self.db.fetch_one("SELECT COALESCE(MAX(customer_id), 0) FROM customers")[0]
+        self.open_udhaar = [list(row) for row in self.db.fetch_all(
+            "SELECT sell_invoice_id, customer_id, current_balance FROM udhaar WHERE current_balance > 0 ORDER BY udhaar_id"
+        )]
+        return self
+
+    def _past_timestamp(self):
+        when = self.now - timedelta(days=self.rng.randrange(HISTORY_DAYS), seconds=self.rng.randrange(10 * 3600))
+        return when.isoformat(timespec='seconds')
+
+    def _payment(self, paid):
+        mode = self.rng.choice(PAYMENT_MODES)
+        split = {'Cheque': 0.0, 'Online': 0.0, 'UPI': 0.0, 'Cash': 0.0}
+        split[mode] = paid
+        return split['Cheque'], split['Online'], split['UPI'], split['Cash'], mode
+
+    def _item(self):
+        metal, purity, rate, hsn = self.rng.choice(METALS)
+        net_wt = round(self.rng.uniform(1.0, 40.0), 3)
+        making_charge = round(self.rng.uniform(200, 3000), 2)
+        return {
+            'metal': metal, 'metal_rate': rate, 'description': self.rng.choice(DESCRIPTIONS),
+            'qty': 1, 'net_wt': net_wt, 'purity': purity,
+            'gross_wt': round(net_wt * 1.05, 3), 'loss_wt': round(net_wt * 0.05, 3),
+            'making_charge': making_charge, 'making_charge_type': 'fixed',
+            'stone_weight': 0.0, 'stone_charge': 0.0, 'wastage_percentage': 0.0,
+            'amount': round(net_wt * rate + making_charge, 2),
+            'cgst_rate': 1.5, 'sgst_rate': 1.5, 'hsn': hsn, 'product_id': None,
+        }
+
+    def _random_customer(self):
+        # Regulars buy more often: skew towards the older, lower customer IDs
+        return min(int(self.rng.paretovariate(1.2)), self.customer_count) if self.rng.random() < 0.5 \
+            else self.rng.randint(1, self.customer_count)
+
+    def add_customer(self):
+        from utils.fetch_customers import add_new_customer
+        from utils.errors import ServiceError
+        n = self.customer_count + 1
+        name = f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)} {n}" # Names are UNIQUE
+        try:
+            add_new_customer(name, f"9{n:09d}", address=self.rng.choice(CITIES))
+        except ServiceError as e:
+            raise RuntimeError(f"add_new_customer failed for {name}: {e}") from e
+        self.customer_count = n
+
+    def sale(self):
+        from utils.invoice_id_creation import generate_sales_invoice_id
+        from utils.save_sale import save_sale
+        from utils.errors import ServiceError
+        items = [self._item() for _ in range(self.rng.randint(*ITEMS_PER_SALE))]
+        total = round(sum(item['amount'] for item in items) * 1.03, 2) # Plus 3% GST
+        balance = round(total * self.rng.uniform(0.1, 0.6), 2) if self.rng.random() < CREDIT_SALE_SHARE else 0.0
+        cheque, online, upi, cash, mode = self._payment(round(total - balance, 2))
+        customer_id = self._random_customer()
+        invoice_id = generate_sales_invoice_id()
+        try:
+            save_sale(invoice_id, customer_id, total, cheque, online, upi, cash, 0.0, balance,
+                      mode, "", self._past_timestamp(), items)
+        except ServiceError as e:
+            raise RuntimeError(f"save_sale failed for {invoice_id}: {e}") from e
+        if balance > 0:
+            self.open_udhaar.append([invoice_id, customer_id, balance])
+
+    def purchase(self):
+        from utils.invoice_id_creation import generate_purchase_invoice_id
+        from utils.save_purchase import save_purchase
+        items = []
+        for _ in range(self.rng.randint(1, 3)):
+            item = self._item()
+            item['price'] = item['amount']
+            items.append(item)
+        total = round(sum(item['amount'] for item in items), 2)
+        balance = round(total * self.rng.uniform(0.2, 1.0), 2) if self.rng.random() < 0.5 else 0.0
+        cheque, online, upi, cash, mode = self._payment(round(total - balance, 2))
+        invoice_id = generate_purchase_invoice_id()
+        if not save_purchase(invoice_id, self._random_customer(), total, cheque, online, upi, cash, mode, "",
+                             self._past_timestamp(), json.dumps(items), balance):
+            raise RuntimeError(f"save_purchase failed for {invoice_id}")
+
+    def _take_open_udhaar(self):
+        """Picks a random unpaid sale. Returns (entry, udhaar_id, current balance in the database) or None."""
+        if not self.open_udhaar:
+            return None
+        index = self.rng.randrange(len(self.open_udhaar))
+        self.open_udhaar[index], self.open_udhaar[-1] = self.open_udhaar[-1], self.open_udhaar[index]
+        entry = self.open_udhaar[-1]
+        # The stored balance, not our copy: the write paths do unrounded float arithmetic on it
+        udhaar_id, balance = self.db.fetch_one(
+            "SELECT udhaar_id, current_balance FROM udhaar WHERE sell_invoice_id = ?", (entry[0],)
+        )
+        return entry, udhaar_id, balance
+
+    def _pay_off(self, balance, amount):
+        if balance - amount <= 0:
+            self.open_udhaar.pop() # _take_open_udhaar moved it to the end
+
+    def deposit(self):
+        """Returns False when there is no open balance to deposit against."""
+        from utils.invoice_id_creation import generate_udhaar_invoice_id
+        from utils.save_udhaar import save_udhaar_deposit
+        picked = self._take_open_udhaar()
+        if picked is None:
+            return False
+        (invoice_id, customer_id, _), _, balance = picked
+        amount = balance if self.rng.random() < 0.4 else round(balance * self.rng.uniform(0.1, 0.9), 2)
+        deposit_id = generate_udhaar_invoice_id(customer_id)
+        if not save_udhaar_deposit(deposit_id, invoice_id, customer_id, amount, self.rng.choice(PAYMENT_MODES), ""):
+            raise RuntimeError(f"save_udhaar_deposit failed for {deposit_id}")
+        self._pay_off(balance, amount)
+        return True
+
+    def udhaar_payment(self):
+        """Returns False when there is no open balance to pay."""
+        from utils.get_pending_udhaar_sale import update_udhaar_balance
+        picked = self._take_open_udhaar()
+        if picked is None:
+            return False
+        _, udhaar_id, balance = picked
+        amount = balance if self.rng.random() < 0.4 else round(balance * self.rng.uniform(0.1, 0.9), 2)
+        if not update_udhaar_balance(udhaar_id, amount, self.rng.choice(PAYMENT_MODES), "Synthetic payment"):
+            raise RuntimeError(f"update_udhaar_balance failed for udhaar {udhaar_id}")
+        self._pay_off(balance, amount)
+        return True
+
+
+def generate(folder, scale=1.0, seed=42):
+    """
+    Creates the schema in `folder` and fills it with scaled BASE_VOLUMES of shop activity.
+
+    Customers come first; sales, purchases, deposits and udhaar payments are then
+    interleaved in random order so balances are opened and paid off as in a real shop.
+
+    Returns:
+        dict: Operation name -> number of operations performed.
+    """
+    os.makedirs(folder, exist_ok=True)
+    os.chdir(folder)
+    from utils.config import create_tables # Local import: create_tables works on the current folder
+    with quiet():
+        create_tables()
+
+    volumes = {name: max(int(count * scale), 1) for name, count in BASE_VOLUMES.items()}
+    generator = ShopDataGenerator(seed).load_state()
+    done = dict.fromkeys(volumes, 0)
+    start = time.perf_counter()
+
+    def progress(force=False):
+        total = sum(done.values())
+        if force or total % 5000 == 0:
+            print(f"  {total:,}/{sum(volumes.values()):,} operations  ({time.perf_counter() - start:,.0f}s)  {done}",
+                  file=sys.stderr)
+
+    with quiet():
+        for _ in range(volumes['customers']):
+            generator.add_customer()
+            done['customers'] += 1
+            progress()
+
+        remaining = [name for name in ('sales', 'purchases', 'deposits', 'udhaar_payments') for _ in range(volumes[name])]
+        generator.rng.shuffle(remaining)
+        operations = {'sales': generator.sale, 'purchases': generator.purchase,
+                      'deposits': generator.deposit, 'udhaar_payments': generator.udhaar_payment}
+        for name in remaining:
+            if operations[name]() is not False: # Payments are skipped while nothing is outstanding
+                done[name] += 1
+                progress()
+
+    progress(force=True)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", required=True, help="scratch folder for jewellery_app.db (created if missing)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for every volume in BASE_VOLUMES")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    folder = os.path.abspath(args.folder)
+    done = generate(folder, args.scale, args.seed)
+    print(f"Generated in {folder}: " + ", ".join(f"{count:,} {name}" for name, count in done.items()))
+
+if __name__ == "__main__":
+    main()
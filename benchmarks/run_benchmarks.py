@@ -0,0 +1,161 @@
+"""
+Latency and throughput of the billing core's main operations.
+
+Copies a database made by benchmarks.generate_shop_data into a scratch folder
+(the original is never modified) and times each operation through the same
+utils/ functions the app calls: saving sales, purchases, udhaar deposits and
+payments, adding customers, the customer search and the customer ledger.
+For every operation it prints and records p50/p95/p99/max latency in ms and
+throughput in operations per second.
+
+Results are written as JSON with sorted keys, so two runs (e.g. before and
+after a change) can be compared with any diff tool or with --baseline, which
+prints the change in p50/p95/p99 next to each operation.
+
+Run from the repository root:
+    python -m benchmarks.generate_shop_data --folder /tmp/shop --scale 0.01
+    python -m benchmarks.run_benchmarks --folder /tmp/shop [--iterations 200] [--output results.json] [--baseline old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.generate_shop_data import ShopDataGenerator, FIRST_NAMES, quiet
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_FILE = 'jewellery_app.db'
+
+
+def _operations(generator):
+    """Operation name -> zero-argument callable, all going through the utils/ functions."""
+    from utils.fetch_customers import search_customers
+    from utils.customer_ledger import get_customer_ledger
+    rng = generator.rng
+    return {
+        'add_new_customer': generator.add_customer,
+        'save_sale': generator.sale,
+        'save_purchase': generator.purchase,
+        'save_udhaar_deposit': generator.deposit,
+        'update_udhaar_balance': generator.udhaar_payment,
+        'search_customers': lambda: search_customers(rng.choice(FIRST_NAMES)[:rng.randint(2, 4)] + f" {rng.randint(1, 99)}"),
+        'get_customer_ledger': lambda: get_customer_ledger(rng.randint(1, generator.customer_count)),
+    }
+
+
+def summarize(timings, elapsed):
+    """
+    Latency percentiles (ms) and throughput for one operation.
+
+    Args:
+        timings (list): Per-call latencies in seconds.
+        elapsed (float): Wall time for all calls, in seconds.
+    """
+    ms = sorted(t * 1000 for t in timings)
+    cuts = statistics.quantiles(ms, n=100, method='inclusive') if len(ms) > 1 else ms * 99
+    return {
+        'count': len(ms),
+        'p50_ms': round(cuts[49], 3),
+        'p95_ms': round(cuts[94], 3),
+        'p99_ms': round(cuts[98], 3),
+        'mean_ms': round(statistics.fmean(ms), 3),
+        'max_ms': round(ms[-1], 3),
+        'ops_per_sec': round(len(ms) / elapsed, 1) if elapsed else None,
+    }
+
+
+def run(folder, iterations, warmup, seed):
+    """Times every operation on a copy of folder/jewellery_app.db. Returns operation name -> summary."""
+    source = sqlite3.connect(os.path.join(folder, DATABASE_FILE))
+    scratch = tempfile.mkdtemp(prefix="bench_run_")
+    target = sqlite3.connect(os.path.join(scratch, DATABASE_FILE))
+    source.backup(target) # Consistent copy even if the source still has a WAL file
+    source.close()
+    target.close()
+    os.chdir(scratch)
+
+    generator = ShopDataGenerator(seed).load_state()
+    results = {}
+    for name, operation in _operations(generator).items():
+        timings = []
+        with quiet():
+            for _ in range(warmup):
+                operation()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call_start = time.perf_counter()
+                operation()
+                timings.append(time.perf_counter() - call_start)
+            elapsed = time.perf_counter() - start
+        results[name] = summarize(timings, elapsed)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _change(new, old):
+    if not old:
+        return ""
+    return f" ({(new - old) / old * 100:+.0f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folder", required=True, help="folder holding a generated jewellery_app.db")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per operation")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed calls per operation first")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    folder = os.path.abspath(args.folder)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['operations']
+
+    operations = run(folder, args.iterations, args.warmup, args.seed)
+
+    for name, stats in operations.items():
+        old = (baseline or {}).get(name, {})
+        print(f"{name:>22}: p50 {stats['p50_ms']:8.3f}{_change(stats['p50_ms'], old.get('p50_ms'))}"
+              f"  p95 {stats['p95_ms']:8.3f}{_change(stats['p95_ms'], old.get('p95_ms'))}"
+              f"  p99 {stats['p99_ms']:8.3f}{_change(stats['p99_ms'], old.get('p99_ms'))} ms"
+              f"  {stats['ops_per_sec']:9.1f} ops/s")
+
+    if output:
+        report = {
+            'meta': {
+                'git_commit': _git_commit(),
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'database': os.path.join(folder, DATABASE_FILE),
+                'iterations': args.iterations,
+                'warmup': args.warmup,
+                'seed': args.seed,
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+            },
+            'operations': operations,
+        }
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Concurrency stress test for invoice number allocation.
+
+Fires thousands of parallel get_next_invoice_number() / reserve_invoice_numbers()
+calls against a scratch database from several threads and processes, then
+checks that every number was handed out exactly once and that the allocated
+numbers form one gap-free sequence 1..N.
+
+Run from the repository root (exit code 1 on duplicates or gaps):
+    python -m benchmarks.stress_invoice_numbers [--allocations 5000] [--threads 8] [--processes 4] [--block 25]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.invoice_id_creation import get_next_invoice_number, reserve_invoice_numbers
+
+PREFIX = 'STRESS'
+
+def _allocate(n, block):
+    """Allocates numbers in one worker: single numbers, plus a block every 10th call."""
+    numbers = []
+    for i in range(n):
+        if block > 1 and i % 10 == 0:
+            reserved = reserve_invoice_numbers(PREFIX, block)
+            if reserved is None:
+                raise RuntimeError("reserve_invoice_numbers failed")
+            numbers.extend(reserved)
+        else:
+            number = get_next_invoice_number(PREFIX)
+            if number is None:
+                raise RuntimeError("get_next_invoice_number failed")
+            numbers.append(number)
+    return numbers
+
+def _process_worker(folder, n, threads, block):
+    os.chdir(folder) # The allocator works on DATABASE_NAME in the current folder
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(_allocate, n // threads, block) for _ in range(threads)]
+        return [number for future in futures for number in future.result()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--allocations", type=int, default=5000, help="calls per process")
+    parser.add_argument("--threads", type=int, default=8, help="threads per process")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--block", type=int, default=25, help="size of the blocks reserved every 10th call (1 disables)")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="stress_invoice_")
+    os.chdir(folder)
+    from utils.config import create_tables # Local import: keep the scratch folder as cwd first
+    create_tables()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [pool.submit(_process_worker, folder, args.allocations, args.threads, args.block)
+                   for _ in range(args.processes)]
+        numbers = [number for future in futures for number in future.result()]
+    elapsed = time.perf_counter() - start
+
+    duplicates = [number for number, seen in Counter(numbers).items() if seen > 1]
+    missing = set(range(1, max(numbers) + 1)) - set(numbers) if numbers else set()
+    print(f"{len(numbers)} numbers allocated in {elapsed:.2f}s "
+          f"({args.processes} processes x {args.threads} threads); "
+          f"{len(duplicates)} duplicate(s), {len(missing)} gap(s)")
+    if duplicates or missing:
+        print(f"Duplicates: {sorted(duplicates)[:20]}  Gaps: {sorted(missing)[:20]}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
 import streamlit as st
 import sqlite3
 from utils.config import DATABASE_NAME,BILLS_FOLDER
-from utils.fetch_customers import get_customer_details_for_update,get_all_customer_names,fetch_all_customers,update_customer,add_new_customer,get_customer_details
+from utils.fetch_customers import get_all_customer_names, fetch_all_customers, search_customers
 from datetime import datetime
 import pandas as pd
 from utils.invoice_id_creation import generate_udhaar_invoice_id,generate_purchase_invoice_id,generate_sales_invoice_id,get_next_invoice_number
-from utils.save_sale import save_sale
+from ui.service_adapters import get_customer_details_for_update, update_customer, add_new_customer, get_customer_details, save_sale # Streamlit wrappers around the billing core
 from utils.get_pending_udhaar_sale import get_pending_udhaar,get_sale_details
 from utils.generate_sell_pdf import generate_sell_pdf
 from utils.get_download_link import get_download_link
 from utils.load_and_display_pdf import load_and_display_pdf
+from utils.customer_ledger import get_customer_ledger
 
 def customer_management():
     st.header("Customer Management")
@@ -21,10 +22,11 @@ def customer_management():
     
     with tab1:
         # Search by name
-        search_name = st.text_input("Search Customer by Name")
+        search_name = st.text_input("Search Customer by Name, Phone, City or PAN")
         
         if search_name:
-            filtered_customers = {k: v for k, v in customers.items() if search_name.lower() in v.lower()}
+            # Ranked prefix matches from the customer search index
+            filtered_customers = {row['customer_id']: row['name'] for row in search_customers(search_name, limit=50)}
         else:
             filtered_customers = customers
         
@@ -65,59 +67,26 @@ def customer_management():
                      col2.write(f"**Landline Number:** {customer_details.get('landline_phone')}")
                 
                 
-                # Get customer transactions
-                conn = sqlite3.connect(DATABASE_NAME)
-                cursor = conn.cursor()
-                
-                # Get sales
-                cursor.execute("""
-                    SELECT invoice_id, sale_date, total_amount, old_gold_amount, amount_balance 
-                    FROM sales 
-                    WHERE customer_id = ? 
-                    ORDER BY sale_date DESC
-                """, (selected_id,))
-                sales = cursor.fetchall()
-                
-                # Get purchases
-                cursor.execute("""
-                    SELECT invoice_id, purchase_date, total_amount 
-                    FROM purchases 
-                    WHERE supplier_id = ? 
-                    ORDER BY purchase_date DESC
-                """, (selected_id,))
-                purchases = cursor.fetchall()
-                # Get deposits
-                cursor.execute("""
-                    SELECT deposit_invoice_id , sell_invoice_id , deposit_amount 
-                    FROM udhaar_deposits 
-                    WHERE customer_id = ? 
-                    
-                """, (selected_id,))
-                deposits = cursor.fetchall()
-                
-                conn.close()
-                
-                # Display transactions
-                if sales:
-                    st.subheader("Sales Transactions")
-                    sales_df = pd.DataFrame(sales, columns=["Invoice ID", "Date", "Total Amount", "Old Gold Amount", "Balance"])
-                    st.dataframe(sales_df)
-                
-                if purchases:
-                    st.subheader("Purchase Transactions")
-                    purchases_df = pd.DataFrame(purchases, columns=["Invoice ID", "Date", "Total Amount"])
-                    st.dataframe(purchases_df)
-                    
-                if deposits:
-                    st.subheader("Udhaar Deposits Transactions")
-                    deposits_df = pd.DataFrame(deposits, columns=["Deposit Invoice ID", "Sell Invoice ID", "Deposit Amount"])
-                    st.dataframe(purchases_df)
-                
-                # Get pending udhaar
-                pending_df = get_pending_udhaar(selected_id)
-                if not pending_df>0:
-                    st.subheader("Pending Amounts")
-                    st.dataframe(pending_df)
+                # Customer history: sales, purchases, deposits and udhaar payments in one timeline
+                ledger_page = st.number_input("Ledger Page", min_value=1, value=1, step=1, key=f"ledger_page_{selected_id}")
+                ledger = get_customer_ledger(selected_id, page=ledger_page)
+
+                balance = ledger['closing_balance']
+                if balance > 0:
+                    st.metric("Customer Owes", f"₹{balance:,.2f}")
+                elif balance < 0:
+                    st.metric("Shop Owes Customer", f"₹{-balance:,.2f}")
+
+                if ledger['entries']:
+                    st.subheader("Transaction History")
+                    ledger_df = pd.DataFrame(ledger['entries'])
+                    ledger_df.columns = ["Date", "Type", "Reference", "Against Invoice", "Amount", "Balance Change", "Running Balance", "Payment Mode"]
+                    st.dataframe(ledger_df)
+                    st.caption(f"Page {ledger['page']} of {ledger['total_pages']} ({ledger['total_entries']} entries, newest first)")
+                elif ledger['total_entries']:
+                    st.info(f"No entries on this page; the history has {ledger['total_pages']} page(s).")
+                else:
+                    st.info("No transactions recorded for this customer yet.")
         else:
             st.info("No customers found with that name.")
     
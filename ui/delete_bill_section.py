@@ -1,14 +1,14 @@
 import streamlit as st
 
 # Import necessary utility functions
-from utils.delete_bill import delete_bill
+from ui.service_adapters import delete_bill # Streamlit wrappers around the billing core
 #from utils.delete_udhaar_bill import delete_udhaar_bill
 
 def delete_bill_section():
     st.subheader("Delete Bills")
     st.warning("Use this section with caution. Deleting a bill is irreversible.")
 
-    invoice_id_to_delete = st.text_input("Enter Invoice ID to Delete (e.g., SAL-YYYY-NNNNN, PUR-YYYY-NNNNN, UDH-YYYY-CUSTOMERID-NNN)")
+    invoice_id_to_delete = st.text_input("Enter Invoice ID to Delete (e.g., SAL-YYYY-YY-NNNNN, PUR-YYYY-YY-NNNNN, UDH-YYYY-YY-CUSTOMERID-NNN)")
 
     if st.button("Delete Bill", key="confirm_delete_bill"):
         if invoice_id_to_delete:
@@ -21,7 +21,7 @@ def delete_bill_section():
     st.markdown("---")
     st.subheader("Delete Udhaar Deposit")
     st.warning("This will reverse an udhaar deposit and increase the pending balance of the associated sale invoice.")
-    deposit_invoice_id_to_delete = st.text_input("Enter Udhaar Deposit Invoice ID to Delete (e.g., UDH-YYYY-CUSTOMERID-NNN)", key="delete_udhaar_deposit_input")
+    deposit_invoice_id_to_delete = st.text_input("Enter Udhaar Deposit Invoice ID to Delete (e.g., UDH-YYYY-YY-CUSTOMERID-NNN)", key="delete_udhaar_deposit_input")
 
     if st.button("Delete Udhaar Deposit", key="confirm_delete_udhaar_deposit"):
         if deposit_invoice_id_to_delete:
@@ -2,7 +2,8 @@ import streamlit as st
 import pandas as pd
 from utils.db_manager import DBManager
 from utils.config import DATABASE_NAME
-from utils.fetch_customers import fetch_all_customers, get_customer_details
+from utils.fetch_customers import fetch_all_customers
+from ui.service_adapters import get_customer_details # Streamlit wrappers around the billing core
 from utils.update_sale_bill import update_sale_bill
 from utils.update_purchase_bill import update_purchase_bill
 from utils.update_udhaar_deposit import update_udhaar_deposit
@@ -0,0 +1,133 @@
+import streamlit as st
+import pandas as pd
+from utils.pdf_jobs import get_job, list_jobs, count_jobs, retry_job, JOB_STATUSES
+
+PDF_JOB_REFRESH_SECONDS = 1 # How often the save screens check on their queued PDFs
+RECENT_DOWNLOADS = 5 # Bills of this session listed under a save screen
+
+JOB_TABLE_COLUMNS = {
+    'job_id': "Job",
+    'kind': "Bill Type",
+    'invoice_id': "Invoice ID",
+    'status': "Status",
+    'attempts': "Attempts",
+    'created_at': "Queued At",
+    'finished_at': "Finished At",
+    'filename': "File",
+    'error': "Last Error",
+}
+
+def _finished_job(job):
+    """
+    What the save screen keeps for a job once it has finished, or None while it
+    is queued or running. A rendered PDF is read here, once, and its bytes are
+    reused by every later rerun.
+    """
+    if job['status'] in ('queued', 'running'):
+        return None
+    finished = {'status': job['status'], 'label': f"{job['kind'].title()} {job['invoice_id']}",
+                'filename': job['filename'], 'error': job['error'], 'data': None}
+    if job['status'] == 'done':
+        try:
+            with open(job['file_path'], 'rb') as f:
+                finished['data'] = f.read()
+        except (OSError, TypeError):
+            finished['status'] = 'missing' # Deleted from the bills folder since
+    return finished
+
+def pdf_downloads(session_key, title="Invoice PDFs"):
+    """
+    Download buttons for the PDFs queued from a save screen in this session.
+
+    While any of them is queued or running, the list is a fragment that reruns
+    on its own every PDF_JOB_REFRESH_SECONDS without rerunning the screen, so
+    the next bill can be entered while earlier ones render. Once all of them
+    have finished it is drawn without run_every and stops polling.
+
+    Args:
+        session_key (str): st.session_state list of job_ids the screen appends to.
+        title (str): Subheader above the list.
+    """
+    job_ids = st.session_state.get(session_key, [])[-RECENT_DOWNLOADS:]
+    if not job_ids:
+        return
+    finished = st.session_state.setdefault(f"{session_key}_finished", {}) # job_id -> _finished_job
+    for job_id in [job_id for job_id in finished if job_id not in job_ids]:
+        del finished[job_id] # Only the listed PDFs stay in memory
+    polling = any(job_id not in finished for job_id in job_ids)
+    download_list = st.fragment(_download_list, run_every=PDF_JOB_REFRESH_SECONDS if polling else None)
+    download_list(session_key, title, job_ids, polling)
+
+def _download_list(session_key, title, job_ids, polling):
+    finished = st.session_state[f"{session_key}_finished"]
+    pending = {}
+    for job_id in job_ids:
+        if job_id not in finished:
+            job = get_job(job_id)
+            outcome = _finished_job(job) if job else {'status': 'missing', 'label': f"Job {job_id}"}
+            if outcome is None:
+                pending[job_id] = job
+            else:
+                finished[job_id] = outcome
+
+    st.markdown("---")
+    st.subheader(title)
+    for job_id in reversed(job_ids): # Newest first
+        if job_id in pending:
+            job = pending[job_id]
+            retrying = f" (attempt {job['attempts'] + 1}, last error: {job['error']})" if job['error'] else ""
+            st.info(f"⏳ {job['kind'].title()} {job['invoice_id']}: generating PDF...{retrying}")
+            continue
+        outcome = finished[job_id]
+        if outcome['status'] == 'done':
+            st.download_button(
+                label=f"⬇️ Download {outcome['label']}",
+                data=outcome['data'],
+                file_name=outcome['filename'],
+                mime="application/pdf",
+                key=f"{session_key}_download_{job_id}",
+            )
+        elif outcome['status'] == 'failed':
+            col1, col2 = st.columns([0.8, 0.2])
+            col1.error(f"{outcome['label']}: the PDF could not be generated ({outcome['error']}).")
+            if col2.button("Retry", key=f"{session_key}_retry_{job_id}"):
+                retry_job(job_id)
+                del finished[job_id]
+                st.rerun() # Full rerun: the list polls again
+        else:
+            st.warning(f"{outcome['label']}: the PDF file is no longer in the bills folder; reprint it from Reprint Bill.")
+
+    if polling and not pending:
+        st.rerun() # Full rerun: the list is drawn again without run_every, so the polling stops
+
+def pdf_jobs_section():
+    """Admin page: the background PDF queue, with retry for failed jobs."""
+    st.header("PDF Jobs")
+    st.caption("Invoice PDFs are generated in the background after a bill is saved. "
+               "Failed jobs are retried automatically before they are marked failed.")
+
+    counts = count_jobs()
+    for column, status in zip(st.columns(len(JOB_STATUSES)), JOB_STATUSES):
+        column.metric(status.title(), f"{counts[status]:,}")
+
+    col1, col2 = st.columns([0.7, 0.3])
+    status_filter = col1.selectbox("Status", ["All", *JOB_STATUSES])
+    if col2.button("Refresh", key="pdf_jobs_refresh"):
+        st.rerun()
+
+    jobs = list_jobs(None if status_filter == "All" else status_filter)
+    if jobs:
+        jobs_df = pd.DataFrame(jobs)[list(JOB_TABLE_COLUMNS)].rename(columns=JOB_TABLE_COLUMNS)
+        st.dataframe(jobs_df, hide_index=True)
+    else:
+        st.info("No PDF jobs.")
+
+    failed = list_jobs('failed')
+    if failed:
+        st.subheader("Failed Jobs")
+        options = {f"#{job['job_id']} {job['kind']} {job['invoice_id']}: {job['error']}": job['job_id'] for job in failed}
+        selected = st.multiselect("Jobs to Retry", list(options), default=list(options))
+        if st.button("Retry Selected", key="pdf_jobs_retry") and selected:
+            for label in selected:
+                retry_job(options[label])
+            st.rerun()
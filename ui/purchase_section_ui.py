@@ -5,11 +5,12 @@ import json # Import the json library for serialization
 
 # Import necessary utility functions
 from utils.config import DATABASE_NAME # Only for DBManager, not direct use
-from utils.fetch_customers import fetch_all_customers, add_new_customer, get_customer_details
+from utils.fetch_customers import fetch_all_customers, search_customers
+from ui.service_adapters import add_new_customer, get_customer_details # Streamlit wrappers around the billing core
+from ui.pdf_jobs_ui import pdf_downloads
 from utils.invoice_id_creation import generate_purchase_invoice_id
 from utils.save_purchase import save_purchase
-from utils.generate_purchase_pdf import generate_purchase_pdf
-from utils.get_download_link import get_download_link
+from utils.pdf_jobs import enqueue_pdf
 from utils.db_manager import DBManager # Import DBManager for specific fetches if needed
 
 def purchase_section():
@@ -23,7 +24,12 @@ def purchase_section():
     supplier_col1, supplier_col2 = st.columns([0.7, 0.3])
 
     with supplier_col1:
-        customers = fetch_all_customers()
+        customer_search = st.text_input("Search Supplier (name, phone, city or PAN)", key="purchase_customer_search")
+        if customer_search:
+            # Type-ahead: only the best matches from the customer search index
+            customers = {row['customer_id']: row['name'] for row in search_customers(customer_search)}
+        else:
+            customers = fetch_all_customers()
         customer_options = ["Select Supplier"] + list(customers.values())
         selected_customer_name = st.selectbox("Select Existing Supplier", customer_options, key="purchase_customer")
 
@@ -254,41 +260,15 @@ def purchase_section():
                         )
 
                         if saved_invoice_id:
-                            purchase_data = db_manager_instance.fetch_one("SELECT * FROM purchases WHERE invoice_id = ?", (saved_invoice_id,))
-                            # When fetching, remember to json.loads() purchase_items_data if it's stored as JSON
-                            # For now, we're fetching all columns, so purchase_items_data will be a list of tuples
-                            # We need to ensure the generate_purchase_pdf function can handle the data structure
-                            purchase_items_data_raw = db_manager_instance.fetch_all("SELECT * FROM purchase_items WHERE invoice_id = ?", (saved_invoice_id,))
-                            
-                            # If purchase_items are stored as a single JSON string in 'purchases' table,
-                            # you'd need to fetch that specific column and parse it.
-                            # For now, assuming 'purchase_items' table is still used for individual items.
-                            # If 'purchase_items_data_raw' contains the JSON string, it needs parsing here.
-                            # Example: purchase_items_data = json.loads(purchase_items_data_raw[0][idx_of_json_column])
-                            # If purchase_items_data_raw is already a list of tuples, no change needed here.
-
-
-                            if purchase_data and purchase_items_data_raw: # Use purchase_items_data_raw for now
-                                pdf_content, filename = generate_purchase_pdf(
-                                    customer_details, # Supplier details
-                                    purchase_data,
-                                    purchase_items_data_raw, # Pass the raw fetched data
-                                    download=True
-                                )
-
+                            # The PDF renders in the background; pdf_downloads below offers it when ready
+                            st.session_state.setdefault('purchase_pdf_jobs', [])
+                            try:
+                                st.session_state.purchase_pdf_jobs.append(enqueue_pdf('purchase', saved_invoice_id))
                                 st.success(f"Purchase saved successfully! Invoice ID: {saved_invoice_id}")
-                                st.download_button(
-                                    label="⬇️ Download Purchase Invoice PDF",
-                                    data=pdf_content,
-                                    file_name=filename,
-                                    mime="application/pdf",
-                                    key=f"download_purchase_pdf_{saved_invoice_id}",
-                                    use_container_width=True
-                                )
-                                st.session_state.purchase_items = []
-                                #st.rerun()
-                            else:
-                                st.error("Error retrieving purchase details after saving.")
+                            except Exception as e:
+                                st.warning(f"Purchase {saved_invoice_id} saved, but its PDF could not be queued ({e}). Reprint it from Reprint Bill.")
+                            st.session_state.purchase_items = []
+                            #st.rerun()
                         else:
                             st.error("Error saving purchase. Please try again.")
 
@@ -296,3 +276,5 @@ def purchase_section():
                 if st.button("🗑️ Clear Purchase Form", key="clear_purchase_form_button", use_container_width=True):
                     st.session_state.purchase_items = []
                     st.rerun()
+
+    pdf_downloads('purchase_pdf_jobs', "Purchase Invoice PDFs")
@@ -0,0 +1,73 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+import utils.query_stats as query_stats_module
+from utils.query_stats import query_stats, read_slow_queries
+
+STATS_COLUMNS = {
+    'fingerprint': "Query",
+    'calls': "Calls",
+    'total_ms': "Total ms",
+    'mean_ms': "Mean ms",
+    'p50_ms': "p50 ms",
+    'p95_ms': "p95 ms",
+    'max_ms': "Max ms",
+    'rows': "Rows",
+    'lock_retries': "Lock Retries",
+    'errors': "Errors",
+}
+
+# Tab label -> snapshot key the ranking is by
+RANKINGS = {
+    "Most Total Time": 'total_ms',
+    "Slowest (p95)": 'p95_ms',
+    "Slowest Single Call": 'max_ms',
+    "Most Frequent": 'calls',
+}
+
+def _stats_df(rows):
+    df = pd.DataFrame(rows, columns=list(STATS_COLUMNS)).rename(columns=STATS_COLUMNS)
+    return df.round({"Total ms": 1, "Mean ms": 2, "p50 ms": 2, "p95 ms": 2, "Max ms": 2})
+
+def query_stats_section():
+    """Admin page: where the database time goes, to decide which queries need an index."""
+    st.header("Query Performance")
+    started = datetime.fromtimestamp(query_stats.started_at).strftime('%Y-%m-%d %H:%M:%S')
+    st.caption(f"Statements run by this server process since {started}. "
+               "p50/p95 are histogram bucket bounds; literals in the SQL are shown as ?.")
+
+    col1, col2, col3 = st.columns(3)
+    top_n = col1.number_input("Show Top", min_value=5, max_value=200, value=20, step=5)
+    threshold = col2.number_input("Slow Query Threshold (ms)", min_value=0, max_value=60000,
+                                  value=int(query_stats_module.SLOW_QUERY_THRESHOLD_MS), step=50)
+    if threshold != query_stats_module.SLOW_QUERY_THRESHOLD_MS:
+        query_stats_module.configure(threshold_ms=threshold)
+    if col3.button("Reset Statistics"):
+        query_stats.reset()
+        st.rerun()
+
+    snapshot = query_stats.snapshot()
+    if not snapshot:
+        st.info("No queries recorded yet.")
+    else:
+        total_calls = sum(row['calls'] for row in snapshot)
+        total_ms = sum(row['total_ms'] for row in snapshot)
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Distinct Queries", len(snapshot))
+        m2.metric("Statements", f"{total_calls:,}")
+        m3.metric("Database Time", f"{total_ms / 1000:.1f} s")
+
+        for tab, by in zip(st.tabs(list(RANKINGS)), RANKINGS.values()):
+            with tab:
+                rows = sorted(snapshot, key=lambda row: row[by], reverse=True)[:int(top_n)]
+                st.dataframe(_stats_df(rows), hide_index=True)
+
+    st.subheader("Recent Slow Queries")
+    st.caption(f"From {query_stats_module.SLOW_QUERY_LOG}, newest first (parameters are not logged).")
+    slow_queries = read_slow_queries(limit=int(top_n))
+    if slow_queries:
+        slow_df = pd.DataFrame(slow_queries, columns=['time', 'elapsed_ms', 'rows', 'lock_retries', 'error', 'thread', 'sql'])
+        slow_df.columns = ["Time", "Elapsed ms", "Rows", "Lock Retries", "Error", "Thread", "SQL"]
+        st.dataframe(slow_df, hide_index=True)
+    else:
+        st.info(f"No query has taken longer than {query_stats_module.SLOW_QUERY_THRESHOLD_MS} ms yet.")
@@ -1,16 +1,16 @@
 import streamlit as st
 import sqlite3
 from utils.config import DATABASE_NAME, BILLS_FOLDER
-from utils.fetch_customers import get_customer_details_for_update, get_all_customer_names, fetch_all_customers, update_customer, add_new_customer, get_customer_details
-from datetime import datetime
+from utils.fetch_customers import get_all_customer_names, fetch_all_customers
+from datetime import datetime, timedelta
 import pandas as pd
 from utils.invoice_id_creation import generate_udhaar_invoice_id, generate_purchase_invoice_id, generate_sales_invoice_id, get_next_invoice_number
-from utils.save_sale import save_sale
+from ui.service_adapters import get_customer_details_for_update, update_customer, add_new_customer, get_customer_details, save_sale # Streamlit wrappers around the billing core
 from utils.get_pending_udhaar_sale import get_pending_udhaar, get_sale_details, get_all_pending_udhaar # Added get_all_pending_udhaar
 from utils.generate_sell_pdf import generate_sell_pdf
 from utils.get_download_link import get_download_link
 from utils.load_and_display_pdf import load_and_display_pdf
-from utils.db_manager import DBManager # Import DBManager
+from utils.reporting_db import reporting_db, replica_age, refresh_replica # Read-only reporting connection
 
 def reports_section():
     st.header("Reports & Analytics")
@@ -23,21 +23,40 @@ def reports_section():
         "Outstanding Balances"
     ])
     
-    db = DBManager(DATABASE_NAME) # Initialize DBManager once for the section
+    # Reports read through a read-only connection (or the reporting replica),
+    # never the connections bills are saved on; see utils/reporting_db.py
+    db = reporting_db()
+    if db.db_path != DATABASE_NAME:
+        age = replica_age()
+        col1, col2 = st.columns([3, 1])
+        col1.caption(f"Reporting copy, refreshed {age / 60:.0f} min ago." if age is not None else "Reporting copy not created yet.")
+        if col2.button("Refresh Now"):
+            refresh_replica()
+            st.rerun()
 
     if report_type == "Daily Sales Report":
         selected_date = st.date_input("Select Date", value=datetime.now().date())
         date_str = selected_date.strftime('%Y-%m-%d')
+        next_date_str = (selected_date + timedelta(days=1)).strftime('%Y-%m-%d')
         
-        # Get daily sales
-        # Changed s.date to s.sale_date as per schema
-        sales = db.fetch_all("""
-            SELECT s.invoice_id, c.name, s.total_amount, s.old_gold_amount, s.amount_balance, s.payment_mode
-            FROM sales s
-            JOIN customers c ON s.customer_id = c.customer_id
-            WHERE s.sale_date LIKE ? -- Use LIKE for date string matching
-            ORDER BY s.invoice_id
-        """, (f"{date_str}%",)) # Use % to match any time part of the date
+        # Get daily sales and purchases from one snapshot, then render outside it:
+        # an open read transaction pins the WAL and holds back checkpoints
+        with db.transaction():
+            # Half-open range on the indexed sale_day column (covers any time part of sale_date)
+            sales = db.fetch_all("""
+                SELECT s.invoice_id, c.name, s.total_amount, s.old_gold_amount, s.amount_balance, s.payment_mode
+                FROM sales s
+                JOIN customers c ON s.customer_id = c.customer_id
+                WHERE s.sale_day >= ? AND s.sale_day < ?
+                ORDER BY s.invoice_id
+            """, (date_str, next_date_str))
+            purchases = db.fetch_all("""
+                SELECT p.invoice_id, c.name, p.total_amount, p.payment_mode
+                FROM purchases p
+                JOIN customers c ON p.supplier_id = c.customer_id -- Join on supplier_id
+                WHERE p.purchase_day >= ? AND p.purchase_day < ?
+                ORDER BY p.invoice_id
+            """, (date_str, next_date_str))
 
         if sales:
             sales_df = pd.DataFrame(sales, columns=["Invoice ID", "Customer", "Total Amount", "Old Gold Amount", "Balance", "Payment Mode"])
@@ -60,16 +79,6 @@ def reports_section():
         else:
             st.info(f"No sales found for {date_str}")
         
-        # Get daily purchases
-        # Changed p.date to p.purchase_date as per schema
-        purchases = db.fetch_all("""
-            SELECT p.invoice_id, c.name, p.total_amount, p.payment_mode
-            FROM purchases p
-            JOIN customers c ON p.supplier_id = c.customer_id -- Join on supplier_id
-            WHERE p.purchase_date LIKE ? -- Use LIKE for date string matching
-            ORDER BY p.invoice_id
-        """, (f"{date_str}%",))
-        
         if purchases:
             purchases_df = pd.DataFrame(purchases, columns=["Invoice ID", "Supplier", "Total Amount", "Payment Mode"])
             
@@ -91,19 +100,25 @@ def reports_section():
         year = st.selectbox("Select Year", list(range(current_year-5, current_year+1)), index=5)
         month = st.selectbox("Select Month", list(range(1, 13)), index=current_month-1)
         
-        # Format month for filtering
+        # Format month for filtering: [first day of month, first day of next month)
         month_str = f"{year}-{month:02d}"
+        month_start = f"{month_str}-01"
+        next_month_start = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
         
-        # Get monthly sales
-        # Changed s.date to s.sale_date as per schema
-        sales = db.fetch_all("""
-            SELECT s.sale_date, COUNT(s.invoice_id) as count, SUM(s.total_amount) as total,
-                   SUM(s.old_gold_amount) as old_gold, SUM(s.amount_balance) as balance
-            FROM sales s
-            WHERE s.sale_date LIKE ?
-            GROUP BY s.sale_date
-            ORDER BY s.sale_date
-        """, (f"{month_str}%",))
+        # Get monthly sales and purchases, one row per day from the daily_summary rollup
+        with db.transaction():
+            sales = db.fetch_all("""
+                SELECT day, sales_count, sales_total, sales_old_gold, sales_balance
+                FROM daily_summary
+                WHERE day >= ? AND day < ? AND sales_count > 0
+                ORDER BY day
+            """, (month_start, next_month_start))
+            purchases = db.fetch_all("""
+                SELECT day, purchase_count, purchase_total
+                FROM daily_summary
+                WHERE day >= ? AND day < ? AND purchase_count > 0
+                ORDER BY day
+            """, (month_start, next_month_start))
         
         if sales:
             sales_df = pd.DataFrame(sales, columns=["Date", "Number of Sales", "Total Amount", "Old Gold Amount", "Balance"])
@@ -130,16 +145,6 @@ def reports_section():
         else:
             st.info(f"No sales found for {month_str}")
         
-        # Get monthly purchases
-        # Changed p.date to p.purchase_date as per schema
-        purchases = db.fetch_all("""
-            SELECT p.purchase_date, COUNT(p.invoice_id) as count, SUM(p.total_amount) as total
-            FROM purchases p
-            WHERE p.purchase_date LIKE ?
-            GROUP BY p.purchase_date
-            ORDER BY p.purchase_date
-        """, (f"{month_str}%",))
-        
         if purchases:
             purchases_df = pd.DataFrame(purchases, columns=["Date", "Number of Purchases", "Total Amount"])
             
@@ -157,20 +162,19 @@ def reports_section():
     elif report_type == "Inventory Value Report":
         st.info("This report provides an estimated inventory value based on sales and purchases.")
         
-        # Get all sale items
-        sold_items_raw = db.fetch_all("""
-            SELECT si.metal, SUM(si.net_wt) as total_weight
-            FROM sale_items si
-            GROUP BY si.metal
-        """)
+        # Get all sale and purchase items from one snapshot
+        with db.transaction():
+            sold_items_raw = db.fetch_all("""
+                SELECT si.metal, SUM(si.net_wt) as total_weight
+                FROM sale_items si
+                GROUP BY si.metal
+            """)
+            purchased_items_raw = db.fetch_all("""
+                SELECT pi.metal, SUM(pi.net_wt) as total_weight
+                FROM purchase_items pi
+                GROUP BY pi.metal
+            """)
         sold_items = {metal: weight for metal, weight in sold_items_raw}
-        
-        # Get all purchase items
-        purchased_items_raw = db.fetch_all("""
-            SELECT pi.metal, SUM(pi.net_wt) as total_weight
-            FROM purchase_items pi
-            GROUP BY pi.metal
-        """)
         purchased_items = {metal: weight for metal, weight in purchased_items_raw}
         
         # Current metal rates
@@ -1,17 +1,22 @@
 import streamlit as st
+import glob
+import os
+import tempfile
+import time
 import sqlite3 # Keep for type hinting if needed, but direct use will be removed
 from utils.config import DATABASE_NAME,BILLS_FOLDER
-from utils.fetch_customers import get_customer_details_for_update,get_all_customer_names,fetch_all_customers,update_customer,add_new_customer,get_customer_details
-from datetime import datetime
+from utils.fetch_customers import get_all_customer_names, fetch_all_customers
+from datetime import datetime, date
 import pandas as pd
 from utils.invoice_id_creation import generate_udhaar_invoice_id,generate_purchase_invoice_id,generate_sales_invoice_id,get_next_invoice_number
-from utils.save_sale import save_sale
+from ui.service_adapters import get_customer_details_for_update, update_customer, add_new_customer, get_customer_details, save_sale # Streamlit wrappers around the billing core
 from utils.get_pending_udhaar_sale import get_pending_udhaar,get_sale_details
 from utils.generate_sell_pdf import generate_sell_pdf
 from utils.get_download_link import get_download_link
 from utils.load_and_display_pdf import load_and_display_pdf
 from utils.fetch_bill_data import fetch_bill_data # Ensure this is imported
 from utils.db_manager import DBManager # Import DBManager
+from utils.batch_reprint import find_bills, batch_reprint
 
 def reprint_bill_section():
     # --- Streamlit UI for Reprinting ---
@@ -28,7 +33,7 @@ def reprint_bill_section():
         customer_details, sale_data, sale_items = fetch_bill_data(reprint_invoice_id)
 
         if sale_data:
-            pdf_bytes, filename = generate_sell_pdf(customer_details, sale_data, sale_items, download=True)
+            pdf_bytes, filename = generate_sell_pdf(customer_details, sale_data, sale_items, download=True, save_to_disk=False) # Original is already in bills/
             st.download_button(
                 label="Download Reprinted Bill PDF",
                 data=pdf_bytes,
@@ -55,7 +60,7 @@ def reprint_bill_section():
             # fetch_bill_data already uses DBManager internally
             customer_details, sale_data, sale_items = fetch_bill_data(selected_invoice_reprint)
             if sale_data:
-                pdf_bytes, filename = generate_sell_pdf(customer_details, sale_data, sale_items, download=True)
+                pdf_bytes, filename = generate_sell_pdf(customer_details, sale_data, sale_items, download=True, save_to_disk=False) # Original is already in bills/
                 st.download_button(
                     label=f"Download Reprinted Bill PDF for {selected_invoice_reprint}",
                     data=pdf_bytes,
@@ -69,3 +74,74 @@ def reprint_bill_section():
     else:
         st.info("No sales invoices found to reprint.")
 
+
+    batch_reprint_section()
+
+BATCH_ZIP_PREFIX = "reprint_"
+BATCH_ZIP_MAX_AGE = 24 * 3600 # Seconds; older batch ZIPs in the temp folder belong to ended sessions
+
+def _remove_stale_zips():
+    """Deletes batch ZIPs left in the temp folder by sessions that ended or crashed."""
+    cutoff = time.time() - BATCH_ZIP_MAX_AGE
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{BATCH_ZIP_PREFIX}*.zip")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass # Removed meanwhile by another session
+
+def _financial_year_start(today):
+    return date(today.year if today.month >= 4 else today.year - 1, 4, 1)
+
+def batch_reprint_section():
+    # --- Batch reprint: every bill of a date range (and customer) as one ZIP ---
+    st.subheader("Batch Reprint (ZIP)")
+
+    kind_labels = {"Sales": 'sale', "Purchases": 'purchase', "Deposits": 'deposit'}
+    selected_kinds = st.multiselect("Bill Types", list(kind_labels), default=list(kind_labels))
+    today = datetime.now().date()
+    date_range = st.date_input("Date Range", value=(_financial_year_start(today), today), key="batch_reprint_dates")
+    customers = fetch_all_customers() # {customer_id: name}
+    customer_id = st.selectbox("Customer", [None] + list(customers),
+                               format_func=lambda cid: "All Customers" if cid is None else f"{customers[cid]} (ID: {cid})")
+    workers = st.number_input("Worker Processes", min_value=1, max_value=64, value=os.cpu_count() or 1)
+
+    if st.button("Generate ZIP"):
+        if len(date_range) != 2:
+            st.error("Select both the first and the last day of the range.")
+            return
+        start_date, end_date = date_range
+        bills = find_bills(start_date, end_date, [kind_labels[label] for label in selected_kinds], customer_id)
+        if not bills:
+            st.info("No bills found for this selection.")
+            return
+
+        # The ZIP goes to a temporary file, not memory; the previous batch's file is replaced
+        old_zip = st.session_state.pop('batch_reprint_zip', None)
+        if old_zip and os.path.exists(old_zip):
+            os.remove(old_zip)
+        _remove_stale_zips()
+        with tempfile.NamedTemporaryFile(prefix=BATCH_ZIP_PREFIX, suffix=".zip", delete=False) as f:
+            zip_path = f.name
+
+        progress_bar = st.progress(0.0, text=f"Rendering {len(bills)} bills...")
+        try:
+            result = batch_reprint(bills, zip_path, workers=int(workers),
+                                   progress=lambda done, total: progress_bar.progress(done / total, text=f"{done} / {total} bills"))
+        except Exception as e:
+            os.remove(zip_path) # Incomplete; don't leave it in the temp folder
+            st.error(f"Batch reprint failed: {e}")
+            return
+        st.session_state.batch_reprint_zip = zip_path
+        st.session_state.batch_reprint_name = f"bills_{start_date:%Y%m%d}_{end_date:%Y%m%d}.zip"
+        st.success(f"Rendered {result['rendered']} PDFs in {result['seconds']:.1f}s "
+                   f"({result['rendered'] / max(result['seconds'], 1e-9):.1f} PDFs/s with {result['workers']} worker(s)).")
+        if result['failed']:
+            st.warning(f"{len(result['failed'])} bill(s) could not be rendered:")
+            st.dataframe(pd.DataFrame(result['failed'], columns=["Type", "Invoice ID", "Error"]), hide_index=True)
+
+    zip_path = st.session_state.get('batch_reprint_zip')
+    if zip_path and os.path.exists(zip_path):
+        with open(zip_path, 'rb') as f:
+            st.download_button("Download ZIP", data=f, file_name=st.session_state.batch_reprint_name,
+                               mime="application/zip", key="batch_reprint_download")
@@ -4,13 +4,13 @@ from datetime import datetime
 
 # Import necessary utility functions
 from utils.config import DATABASE_NAME # Only for DBManager, not direct use
-from utils.fetch_customers import fetch_all_customers, add_new_customer, get_customer_details
+from utils.fetch_customers import fetch_all_customers, search_customers
 from utils.invoice_id_creation import generate_sales_invoice_id
-from utils.save_sale import save_sale
+from ui.service_adapters import add_new_customer, get_customer_details, save_sale # Streamlit wrappers around the billing core
+from ui.pdf_jobs_ui import pdf_downloads
 from utils.get_pending_udhaar_sale import get_pending_udhaar
 from utils.get_pending_purchase_udhaar import get_pending_purchase_udhaar
-from utils.generate_sell_pdf import generate_sell_pdf
-from utils.get_download_link import get_download_link
+from utils.pdf_jobs import enqueue_pdf
 from utils.db_manager import DBManager # Import DBManager for specific fetches if needed
 
 def sell_section():
@@ -24,7 +24,12 @@ def sell_section():
     customer_col1, customer_col2 = st.columns([0.7, 0.3])
 
     with customer_col1:
-        customers = fetch_all_customers()
+        customer_search = st.text_input("Search Customer (name, phone, city or PAN)", key="sell_customer_search")
+        if customer_search:
+            # Type-ahead: only the best matches from the customer search index
+            customers = {row['customer_id']: row['name'] for row in search_customers(customer_search)}
+        else:
+            customers = fetch_all_customers()
         customer_options = ["Select Customer"] + list(customers.values())
         selected_customer_name = st.selectbox("Select Existing Customer", customer_options, key="sell_customer")
 
@@ -293,30 +298,15 @@ def sell_section():
                         )
 
                         if saved_invoice_id:
-                            sale_data = db_manager_instance.fetch_one("SELECT * FROM sales WHERE invoice_id = ?", (saved_invoice_id,))
-                            sale_items_data = db_manager_instance.fetch_all("SELECT * FROM sale_items WHERE invoice_id = ?", (saved_invoice_id,))
-
-                            if sale_data and sale_items_data:
-                                pdf_content, filename = generate_sell_pdf(
-                                    customer_details,
-                                    sale_data,
-                                    sale_items_data,
-                                    download=True
-                                )
-
+                            # The PDF renders in the background; pdf_downloads below offers it when ready
+                            st.session_state.setdefault('sale_pdf_jobs', [])
+                            try:
+                                st.session_state.sale_pdf_jobs.append(enqueue_pdf('sale', saved_invoice_id))
                                 st.success(f"Sale saved successfully! Invoice ID: {saved_invoice_id}")
-                                st.download_button(
-                                    label="⬇️ Download Sale Invoice PDF",
-                                    data=pdf_content,
-                                    file_name=filename,
-                                    mime="application/pdf",
-                                    key=f"download_sale_pdf_{saved_invoice_id}",
-                                    use_container_width=True
-                                )
-                                st.session_state.sale_items = []
-                                #st.rerun()
-                            else:
-                                st.error("Error retrieving sale details after saving.")
+                            except Exception as e:
+                                st.warning(f"Sale {saved_invoice_id} saved, but its PDF could not be queued ({e}). Reprint it from Reprint Bill.")
+                            st.session_state.sale_items = []
+                            #st.rerun()
                         else:
                             st.error("Error saving sale. Please try again.")
 
@@ -324,3 +314,5 @@ def sell_section():
                 if st.button("🗑️ Clear Sale Form", key="clear_sale_form_button", use_container_width=True):
                     st.session_state.sale_items = []
                     st.rerun()
+
+    pdf_downloads('sale_pdf_jobs', "Sale Invoice PDFs")
@@ -0,0 +1,72 @@
+import streamlit as st
+
+from utils.errors import ServiceError
+import utils.delete_bill as bill_service
+import utils.fetch_customers as customer_service
+import utils.save_sale as sale_service
+
+# Streamlit adapters for the billing core.
+# The utils/ functions raise utils.errors exceptions and return structured results;
+# these wrappers show them as st.error/st.success messages and keep the return
+# values the UI sections were written against (None/False on failure).
+
+def save_sale(*args, **kwargs):
+    """Saves a sale via utils.save_sale. Returns the invoice_id, or None after showing the error."""
+    try:
+        result = sale_service.save_sale(*args, **kwargs)
+    except ServiceError as e:
+        st.error(str(e))
+        return None
+    if result['unapplied_purchase_udhaar'] > 0:
+        st.warning(f"Note: Could not fully apply pending purchase amount. Remaining to apply: {result['unapplied_purchase_udhaar']:.2f}")
+    return result['invoice_id']
+
+def delete_bill(invoice_id):
+    """Deletes the latest bill via utils.delete_bill and reruns the page on success."""
+    try:
+        result = bill_service.delete_bill(invoice_id)
+    except ServiceError as e:
+        st.error(str(e))
+        return
+    messages = {
+        'sale': f"Sale bill with Invoice ID '{invoice_id}' and associated records deleted successfully.",
+        'purchase': f"Purchase bill with Invoice ID '{invoice_id}' and associated records deleted successfully.",
+        'deposit': f"Deposit record with Invoice ID '{invoice_id}' deleted and associated balances reversed successfully.",
+    }
+    st.success(messages[result['bill_type']])
+    st.rerun() # Rerun to reflect changes in UI (e.g., updated pending amounts, cleared forms)
+
+def add_new_customer(name, phone, address="", pan="", aadhaar="", alternate_phone="", alternate_phone2="", landline_phone=""):
+    """Adds a customer. Returns the new customer_id, or None after showing the error."""
+    try:
+        customer_id = customer_service.add_new_customer(name, phone, address, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone)
+    except ServiceError as e:
+        st.error(str(e))
+        return None
+    st.success(f"Customer '{name}' added successfully!")
+    return customer_id
+
+def update_customer(phone, name=None, address=None, pan=None, aadhaar=None, alternate_phone=None, alternate_phone2=None, landline_phone=None):
+    """Updates a customer by phone. Returns True, or False after showing the error."""
+    try:
+        customer_service.update_customer(phone, name, address, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone)
+    except ServiceError as e:
+        st.error(str(e))
+        return False
+    st.success(f"Customer with phone '{phone}' updated successfully!")
+    return True
+
+def get_customer_details(customer_id):
+    """Customer contact details as a dict; {} if missing or on a database error (shown to the user)."""
+    try:
+        return customer_service.get_customer_details(customer_id)
+    except Exception as e:
+        st.error(f"Error fetching customer details: {str(e)}")
+        return {}
+
+def get_customer_details_for_update(selected_name):
+    """Editable customer fields by name, or None (with a note) if there is no such customer."""
+    details = customer_service.get_customer_details_for_update(selected_name)
+    if details is None:
+        st.info(f"Customer '{selected_name}' not found.")
+    return details
@@ -4,7 +4,8 @@ from datetime import datetime
 
 # Import necessary utility functions
 from utils.config import DATABASE_NAME # Only for DBManager, not direct use
-from utils.fetch_customers import fetch_all_customers, get_customer_details
+from utils.fetch_customers import fetch_all_customers
+from ui.service_adapters import get_customer_details # Streamlit wrappers around the billing core
 from utils.invoice_id_creation import generate_udhaar_invoice_id
 from utils.get_pending_udhaar_sale import get_all_pending_udhaar, update_udhaar_balance
 from utils.get_pending_purchase_udhaar import get_all_pending_purchase_udhaar, update_purchase_udhaar
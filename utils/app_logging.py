@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import sys
+import threading
+from logging.handlers import RotatingFileHandler
+
+# Leveled, structured logging for the billing core.
+#
+# Modules get a standard logger with get_logger(__name__) and log with lazy
+# %-style arguments, which are only formatted when the record is emitted:
+#
+#     log = get_logger(__name__)
+#     log.debug("Clearing %s from purchase invoice %s", amount, invoice_id, extra={'invoice_id': invoice_id})
+#
+# A debug call below the configured level costs one cached level check, so the
+# write path pays (almost) nothing with debug off. Guard anything expensive to
+# compute (not just to format) with `if log.isEnabledFor(logging.DEBUG):`.
+# Fields passed in extra= are appended as key=value on the console and become
+# keys in the JSON log file.
+#
+# Levels are set per module (logger name prefix). The defaults below can be
+# overridden without code changes through the JEWELLERY_LOG_LEVELS environment
+# variable, e.g. JEWELLERY_LOG_LEVELS="utils.save_sale=DEBUG,utils.db_manager=INFO".
+#
+# Only the LOG_NAMESPACE logger is configured: its handlers are installed
+# there and the root logger is left alone, so importing utils from a script,
+# benchmark or another program does not change how anything else logs.
+LOG_NAMESPACE = 'utils'
+LOG_LEVELS = {
+    'utils': 'INFO',
+}
+LOG_LEVELS_ENV = 'JEWELLERY_LOG_LEVELS'
+LOG_FILE = os.path.join('logs', 'app.log') # JSON lines, relative to the app folder like DATABASE_NAME
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+CONSOLE_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+def _record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Console format: the usual line, followed by the extra= fields as key=value pairs."""
+
+    def formatMessage(self, record):
+        # formatMessage, not format: the fields stay on the first line, before any traceback
+        line = super().formatMessage(record)
+        fields = _record_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value!r}" if isinstance(value, str) and ' ' in value else f"{key}={value}"
+                                   for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Log file format: one JSON object per record, extra= fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        entry.update(_record_fields(record))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_levels(spec):
+    """'utils.save_sale=DEBUG,utils=INFO' -> {'utils.save_sale': 'DEBUG', 'utils': 'INFO'}."""
+    levels = {}
+    for part in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = part.rpartition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+_configured = False
+_configure_lock = threading.Lock()
+
+def configure_logging(levels=None, console=True, log_file=None):
+    """
+    Installs the handlers on the LOG_NAMESPACE logger and sets the per-module levels.
+    Called by get_logger on first use; call it again (e.g. from a benchmark or script)
+    to change the setup.
+
+    With a handler installed, utils records stop at LOG_NAMESPACE instead of also
+    reaching the root logger's handlers (no duplicate lines under a host that logs
+    to stderr itself). With console=False and no log_file they propagate as usual.
+
+    Args:
+        levels (dict, optional): Logger name prefix -> level name. Defaults to LOG_LEVELS
+                                 updated with the JEWELLERY_LOG_LEVELS environment variable.
+                                 Names outside LOG_NAMESPACE (the root is '') are only
+                                 touched when given here explicitly.
+        console (bool): Log to stderr (human-readable, key=value fields).
+        log_file (str, optional): Also write JSON lines to this rotating file, e.g. LOG_FILE.
+    """
+    global _configured
+    if levels is None:
+        levels = dict(LOG_LEVELS, **parse_levels(os.environ.get(LOG_LEVELS_ENV, '')))
+    with _configure_lock:
+        app_logger = logging.getLogger(LOG_NAMESPACE)
+        for handler in [h for h in app_logger.handlers if getattr(h, '_jewellery_handler', False)]:
+            app_logger.removeHandler(handler)
+            handler.close()
+        if console:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(KeyValueFormatter(CONSOLE_FORMAT))
+            handler._jewellery_handler = True
+            app_logger.addHandler(handler)
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            handler = RotatingFileHandler(log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+            handler.setFormatter(JsonFormatter())
+            handler._jewellery_handler = True
+            app_logger.addHandler(handler)
+        app_logger.propagate = not (console or log_file)
+        for name, level in levels.items():
+            logging.getLogger(name or None).setLevel(level)
+        _configured = True
+
+def get_logger(name):
+    """The logger for a module (pass __name__), configuring logging on first use."""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(name)
@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+from utils.config import DATABASE_NAME
+from utils.db_manager import DBManager
+from utils.fetch_bill_data import fetch_bill_data, fetch_purchase_data, fetch_deposit_data
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Batch reprint: every sale, purchase and deposit PDF for a date range (and
+# optionally one customer) rendered across worker processes into one ZIP.
+#
+# The parent process does all the database reads and writes the ZIP; workers
+# only render, so they never open the database. reportlab is pure Python and
+# holds the GIL, hence processes rather than threads. Bills go to the workers
+# in chunks, and only a few chunks per worker are in flight at a time, so
+# memory stays flat however many bills the range holds: each PDF is written
+# to the ZIP as soon as its chunk comes back.
+REPRINT_CHUNK_SIZE = 20 # Bills per worker task
+REPRINT_IN_FLIGHT_PER_WORKER = 2 # Chunks queued per worker beyond the one it is rendering
+# spawn, not fork: a forked child would inherit the parent's open SQLite
+# connections; spawn is also the only start method on Windows. Under
+# `streamlit run` the main module is Streamlit's CLI, but while a page runs its
+# script runner installs the page (app_v2.py) as sys.modules['__main__'], and
+# spawn re-imports that file in every worker as __mp_main__. So app_v2.py keeps
+# its work under the __main__ guard.
+REPRINT_MP_CONTEXT = 'spawn'
+
+BILL_KINDS = ('sale', 'purchase', 'deposit')
+ZIP_FOLDERS = {'sale': 'sales', 'purchase': 'purchases', 'deposit': 'deposits'}
+
+# kind -> (query by date range, query by date range and customer); dates are [start, end)
+_BILL_QUERIES = {
+    'sale': (
+        "SELECT invoice_id FROM sales WHERE sale_day >= ? AND sale_day < ? ORDER BY invoice_id",
+        "SELECT invoice_id FROM sales WHERE customer_id = ? AND sale_day >= ? AND sale_day < ? ORDER BY invoice_id",
+    ),
+    'purchase': (
+        "SELECT invoice_id FROM purchases WHERE purchase_day >= ? AND purchase_day < ? ORDER BY invoice_id",
+        "SELECT invoice_id FROM purchases WHERE supplier_id = ? AND purchase_day >= ? AND purchase_day < ? ORDER BY invoice_id",
+    ),
+    'deposit': (
+        "SELECT deposit_invoice_id FROM udhaar_deposits WHERE deposit_date >= ? AND deposit_date < ? ORDER BY deposit_invoice_id",
+        "SELECT deposit_invoice_id FROM udhaar_deposits WHERE customer_id = ? AND deposit_date >= ? AND deposit_date < ? ORDER BY deposit_invoice_id",
+    ),
+}
+
+_FETCHERS = {'sale': fetch_bill_data, 'purchase': fetch_purchase_data, 'deposit': fetch_deposit_data}
+
+
+def find_bills(start_date, end_date, kinds=BILL_KINDS, customer_id=None):
+    """
+    The bills a batch reprint covers.
+
+    Args:
+        start_date (date): First day, inclusive.
+        end_date (date): Last day, inclusive.
+        kinds (iterable): Any of 'sale', 'purchase', 'deposit'.
+        customer_id (int, optional): Only this customer's bills (as supplier for purchases).
+
+    Returns:
+        list of (kind, invoice_id) tuples, sales first, each kind in invoice order.
+    """
+    db = DBManager(DATABASE_NAME)
+    start, end = start_date.strftime('%Y-%m-%d'), (end_date + timedelta(days=1)).strftime('%Y-%m-%d')
+    bills = []
+    for kind in BILL_KINDS:
+        if kind not in kinds:
+            continue
+        by_date, by_customer = _BILL_QUERIES[kind]
+        rows = db.fetch_all(by_date, (start, end)) if customer_id is None else db.fetch_all(by_customer, (customer_id, start, end))
+        bills.extend((kind, row[0]) for row in rows)
+    return bills
+
+def _fetch_chunk(chunk):
+    """Reads the PDF inputs of a chunk of bills: (kind, invoice_id, details, data, items) per bill found."""
+    jobs = []
+    for kind, invoice_id in chunk:
+        details, data, items = _FETCHERS[kind](invoice_id)
+        if data:
+            jobs.append((kind, invoice_id, details, data, items))
+        else:
+            log.warning("Bill not found for reprint", extra={'kind': kind, 'invoice_id': invoice_id})
+    return jobs
+
+def render_bills(jobs):
+    """
+    Worker entry point: renders a chunk of bills in memory.
+
+    Returns:
+        list of (kind, invoice_id, filename, pdf_bytes, error) tuples. A bill that
+        fails to render has pdf_bytes None and the error text, instead of failing the chunk.
+    """
+    # Imported here so the parent only pays for reportlab if it renders in-process
+    from utils.generate_sell_pdf import generate_sell_pdf
+    from utils.generate_purchase_pdf import generate_purchase_pdf
+    from utils.generate_udhaar_deposit_pdf import generate_udhaar_deposit_pdf
+    generators = {'sale': generate_sell_pdf, 'purchase': generate_purchase_pdf, 'deposit': generate_udhaar_deposit_pdf}
+
+    results = []
+    for kind, invoice_id, details, data, items in jobs:
+        try:
+            pdf_bytes, filename = generators[kind](details, data, items, download=True, save_to_disk=False)
+            results.append((kind, invoice_id, filename, pdf_bytes, None))
+        except Exception as e:
+            results.append((kind, invoice_id, None, None, f"{type(e).__name__}: {e}"))
+    return results
+
+def batch_reprint(bills, output, workers=None, chunk_size=REPRINT_CHUNK_SIZE, progress=None):
+    """
+    Renders the PDFs of bills in parallel and writes them into one ZIP.
+
+    Args:
+        bills (list): (kind, invoice_id) tuples, e.g. from find_bills.
+        output (str or file): The ZIP file path, or a writable binary file object.
+        workers (int, optional): Worker processes; defaults to the CPU count.
+                                 1 renders in this process, without a pool.
+        chunk_size (int): Bills per worker task.
+        progress (callable, optional): Called as progress(done, total) after every chunk.
+
+    Returns:
+        dict: 'rendered' (count), 'failed' (list of (kind, invoice_id, error)),
+              'seconds' and 'workers'.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    chunks = [bills[i:i + chunk_size] for i in range(0, len(bills), chunk_size)]
+    total = len(bills)
+    done = 0
+    rendered = 0
+    failed = []
+    start = time.perf_counter()
+
+    def add(zf, chunk, results):
+        nonlocal done, rendered
+        for kind, invoice_id, filename, pdf_bytes, error in results:
+            if error is None:
+                zf.writestr(f"{ZIP_FOLDERS[kind]}/{filename}", pdf_bytes)
+                rendered += 1
+            else:
+                log.error("Reprint failed: %s", error, extra={'kind': kind, 'invoice_id': invoice_id})
+                failed.append((kind, invoice_id, error))
+        found = {(kind, invoice_id) for kind, invoice_id, *_ in results}
+        failed.extend((kind, invoice_id, "Bill not found") for kind, invoice_id in chunk if (kind, invoice_id) not in found)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+
+    # Deflate takes about a third off these PDFs and costs little next to rendering them
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        if workers == 1:
+            for chunk in chunks:
+                add(zf, chunk, render_bills(_fetch_chunk(chunk)))
+        else:
+            context = multiprocessing.get_context(REPRINT_MP_CONTEXT)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                pending = {}
+                remaining = iter(chunks)
+                max_in_flight = workers * (1 + REPRINT_IN_FLIGHT_PER_WORKER)
+                while True:
+                    # Keep the workers busy, but don't read every bill of the range up front
+                    for chunk in remaining:
+                        pending[pool.submit(render_bills, _fetch_chunk(chunk))] = chunk
+                        if len(pending) >= max_in_flight:
+                            break
+                    if not pending:
+                        break
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        add(zf, pending.pop(future), future.result())
+
+    seconds = time.perf_counter() - start
+    log.info("Batch reprint: %d PDFs in %.1fs with %d worker(s)", rendered, seconds, workers,
+             extra={'failed': len(failed)})
+    return {'rendered': rendered, 'failed': failed, 'seconds': seconds, 'workers': workers}
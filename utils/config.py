@@ -1,11 +1,15 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime
 from utils.db_manager import DBManager # Import the new DBManager
+from utils.app_logging import get_logger
 
 DATABASE_NAME = 'jewellery_app.db'
 BILLS_FOLDER = 'bills' # Base folder for all bills
 
+log = get_logger(__name__)
+
 def create_bills_directory():
     """Ensures the base bills directory and a daily sub-directory exist."""
     today_folder = datetime.now().strftime('%Y-%m-%d')
@@ -16,11 +20,17 @@ def create_bills_directory():
     return daily_bills_path
 
 def create_tables():
-    """Creates database tables if they don't exist."""
-    db = DBManager(DATABASE_NAME) # Use DBManager
+    """Creates the database tables, or upgrades an existing database to the current schema."""
+    from utils.migrations import migrate # Local import: migrations imports config
+    migrate()
+    log.info("Database tables checked/created successfully.")
+
+def create_base_tables(db=None):
+    """Creates the core tables (invoice numbers, customers, catalogue, bills, udhaar, settings) if they don't exist."""
+    db = db or DBManager(DATABASE_NAME) # Use DBManager
 
-    # Enable foreign key constraints for data integrity (important!)
-    db.execute_query("PRAGMA foreign_keys = ON;")
+    # Foreign keys, WAL and the other connection settings are applied to every
+    # pooled connection by DBManager (see PRAGMA_PROFILE in utils/db_manager.py)
 
     # --- New: invoice_numbers table for sequential IDs ---
     db.execute_query('''
@@ -162,6 +172,7 @@ def create_tables():
             payment_other_info TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sale_day TEXT GENERATED ALWAYS AS (substr(sale_date, 1, 10)) VIRTUAL, -- 'YYYY-MM-DD', indexed for date-range reports
             FOREIGN KEY (customer_id) REFERENCES customers (customer_id) ON DELETE RESTRICT
         )
     ''')
@@ -212,6 +223,7 @@ def create_tables():
             amount_balance REAL NOT NULL,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            purchase_day TEXT GENERATED ALWAYS AS (substr(purchase_date, 1, 10)) VIRTUAL, -- 'YYYY-MM-DD', indexed for date-range reports
             FOREIGN KEY (supplier_id) REFERENCES customers (customer_id) ON DELETE RESTRICT
         )
     ''')
@@ -338,5 +350,212 @@ def create_tables():
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
-    
-    print("Database tables checked/created successfully.")
+
+def create_daily_summary_table(db=None):
+    """
+    Creates the daily_summary table (per-day sales/purchase rollup for reports).
+
+    Maintained by utils/daily_summary.py inside the bill write transactions.
+
+    Returns:
+        bool: True if the table was created, False if it already existed.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    if db.fetch_one("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'daily_summary'"):
+        return False
+    db.execute_query('''
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            day TEXT PRIMARY KEY, -- 'YYYY-MM-DD', same as sales.sale_day / purchases.purchase_day
+            sales_count INTEGER NOT NULL DEFAULT 0,
+            sales_total REAL NOT NULL DEFAULT 0.0,
+            sales_old_gold REAL NOT NULL DEFAULT 0.0,
+            sales_balance REAL NOT NULL DEFAULT 0.0,
+            sales_cash REAL NOT NULL DEFAULT 0.0,
+            sales_upi REAL NOT NULL DEFAULT 0.0,
+            sales_online REAL NOT NULL DEFAULT 0.0,
+            sales_cheque REAL NOT NULL DEFAULT 0.0,
+            purchase_count INTEGER NOT NULL DEFAULT 0,
+            purchase_total REAL NOT NULL DEFAULT 0.0,
+            purchase_balance REAL NOT NULL DEFAULT 0.0,
+            purchase_cash REAL NOT NULL DEFAULT 0.0,
+            purchase_upi REAL NOT NULL DEFAULT 0.0,
+            purchase_online REAL NOT NULL DEFAULT 0.0,
+            purchase_cheque REAL NOT NULL DEFAULT 0.0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    return True
+
+# --- Background PDF jobs ---
+# Invoices are rendered after the bill is committed by the worker threads in
+# utils/pdf_jobs.py; one row per PDF to render, polled by the sell/purchase screens.
+def create_pdf_jobs_table(db=None):
+    """Creates the pdf_jobs queue table and its indexes. Safe to run on every start."""
+    db = db or DBManager(DATABASE_NAME)
+    db.execute_query('''
+        CREATE TABLE IF NOT EXISTS pdf_jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL, -- 'sale', 'purchase' or 'deposit'
+            invoice_id TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done or failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after TEXT NOT NULL, -- Local 'YYYY-MM-DD HH:MM:SS'; a retry waits until then
+            file_path TEXT, -- The rendered PDF in the daily bills folder
+            filename TEXT,
+            error TEXT, -- Last failure
+            worker TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+    ''')
+    # Workers pick the oldest runnable queued job; screens look jobs up by bill
+    db.execute_query("CREATE INDEX IF NOT EXISTS idx_pdf_jobs_status ON pdf_jobs (status, run_after)")
+    db.execute_query("CREATE INDEX IF NOT EXISTS idx_pdf_jobs_invoice ON pdf_jobs (kind, invoice_id)")
+
+# --- One-time schema initialization ---
+# The schema version is stored in the database (PRAGMA user_version) and
+# advanced by the ordered steps in utils/migrations.py.
+_schema_lock = threading.Lock()
+_schema_ready = set() # Absolute database paths already checked by this process
+
+def ensure_schema():
+    """
+    Runs the pending schema migrations, if the database is behind utils.migrations.SCHEMA_VERSION.
+
+    Streamlit re-executes the app script on every interaction; after the first
+    check in a process this is a set lookup, and on a restart with an
+    up-to-date database it is a single PRAGMA read. Every migration step
+    re-checks the version under the write lock, so concurrent first starts
+    cannot both apply it.
+
+    Returns:
+        bool: True if migrations ran.
+    """
+    path = os.path.abspath(DATABASE_NAME) # Relative name: scripts and benchmarks chdir first
+    if path in _schema_ready:
+        return False
+    with _schema_lock:
+        if path in _schema_ready:
+            return False
+        from utils.migrations import SCHEMA_VERSION, migrate # Local import: migrations imports config
+        db = DBManager(DATABASE_NAME)
+        ran = False
+        if db.fetch_one("PRAGMA user_version")[0] < SCHEMA_VERSION:
+            migrate(db)
+            ran = True
+        _schema_ready.add(path)
+        return ran
+
+# --- Normalized day columns for date-range reports ---
+# sale_date/purchase_date hold either ISO timestamps ('2024-05-01T10:15:00.123456'),
+# 'YYYY-MM-DD HH:MM:SS' (modified bills) or plain 'YYYY-MM-DD'. The generated
+# *_day columns reduce all of them to 'YYYY-MM-DD' so reports can filter with
+# half-open ranges (day >= ? AND day < ?) on an index instead of LIKE scans.
+DAY_COLUMNS = [
+    ('sales', 'sale_day', 'sale_date'),
+    ('purchases', 'purchase_day', 'purchase_date'),
+]
+
+def add_day_columns(db=None):
+    """Adds the generated day columns to databases created before they existed."""
+    db = db or DBManager(DATABASE_NAME)
+    for table, day_column, date_column in DAY_COLUMNS:
+        # table_xinfo (unlike table_info) also lists generated columns
+        existing_columns = {row[1] for row in db.fetch_all(f"PRAGMA table_xinfo({table})")}
+        if day_column not in existing_columns:
+            # VIRTUAL columns are computed on read, so existing rows need no rewrite;
+            # building the index on it below fills in the values for every old row.
+            db.execute_query(
+                f"ALTER TABLE {table} ADD COLUMN {day_column} TEXT GENERATED ALWAYS AS (substr({date_column}, 1, 10)) VIRTUAL"
+            )
+            log.info("Added %s.%s for date-range reports", table, day_column)
+
+# --- Customer search (FTS5) ---
+# External-content full-text index over the customer fields people type into the
+# pickers. Triggers keep it in step with every INSERT/UPDATE/DELETE on customers;
+# the prefix indexes make type-ahead queries like "ram"* or "98450"* cheap.
+CUSTOMER_SEARCH_COLUMNS = ['name', 'phone', 'alternate_phone', 'alternate_phone2', 'landline_phone', 'city', 'pan']
+
+def create_customer_search(db=None):
+    """
+    Creates the customers_fts index and its sync triggers. Safe to run on every start.
+
+    Returns:
+        bool: True if full-text search is available, False if this SQLite build lacks FTS5.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    if db.fetch_one("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'"):
+        return True
+
+    columns = ', '.join(CUSTOMER_SEARCH_COLUMNS)
+    new_values = ', '.join(f"new.{column}" for column in CUSTOMER_SEARCH_COLUMNS)
+    old_values = ', '.join(f"old.{column}" for column in CUSTOMER_SEARCH_COLUMNS)
+    try:
+        with db.transaction():
+            db.execute_query(f"""
+                CREATE VIRTUAL TABLE customers_fts USING fts5(
+                    {columns},
+                    content='customers', content_rowid='customer_id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+                )
+            """)
+            db.execute_query(f"""
+                CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+                    INSERT INTO customers_fts (rowid, {columns}) VALUES (new.customer_id, {new_values});
+                END
+            """)
+            db.execute_query(f"""
+                CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+                    INSERT INTO customers_fts (customers_fts, rowid, {columns}) VALUES ('delete', old.customer_id, {old_values});
+                END
+            """)
+            db.execute_query(f"""
+                CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN
+                    INSERT INTO customers_fts (customers_fts, rowid, {columns}) VALUES ('delete', old.customer_id, {old_values});
+                    INSERT INTO customers_fts (rowid, {columns}) VALUES (new.customer_id, {new_values});
+                END
+            """)
+            # Index the customers that already exist
+            db.execute_query("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+        log.info("Created customers_fts search index")
+        return True
+    except sqlite3.OperationalError as e:
+        # e.g. "no such module: fts5"; search_customers falls back to LIKE matching
+        log.warning("Customer full-text search is not available: %s", e)
+        return False
+
+# --- Secondary indexes on the hot lookup columns ---
+# (index name, table, indexed columns, optional WHERE clause for a partial index)
+INDEXES = [
+    ('idx_sales_customer_id', 'sales', 'customer_id', None),
+    ('idx_sales_created_at', 'sales', 'created_at', None),
+    ('idx_sales_sale_day', 'sales', 'sale_day', None),
+    ('idx_sale_items_invoice_id', 'sale_items', 'invoice_id', None),
+    ('idx_purchases_supplier_id', 'purchases', 'supplier_id', None),
+    ('idx_purchases_created_at', 'purchases', 'created_at', None),
+    ('idx_purchases_purchase_day', 'purchases', 'purchase_day', None),
+    ('idx_purchase_items_invoice_id', 'purchase_items', 'invoice_id', None),
+    ('idx_udhaar_customer_id', 'udhaar', 'customer_id', None),
+    ('idx_udhaar_pending', 'udhaar', 'created_at', 'current_balance > 0'), # Outstanding balance screens
+    ('idx_udhaar_transactions_udhaar_id', 'udhaar_transactions', 'udhaar_id', None),
+    ('idx_udhaar_deposits_customer_id', 'udhaar_deposits', 'customer_id', None),
+    ('idx_udhaar_deposits_sell_invoice_id', 'udhaar_deposits', 'sell_invoice_id', None), # Foreign key lookups when a sale is deleted
+    ('idx_udhaar_deposits_created_at', 'udhaar_deposits', 'created_at', None),
+    ('idx_udhaar_deposits_deposit_date', 'udhaar_deposits', 'deposit_date', None),
+    ('idx_purchase_udhaar_supplier_id', 'purchase_udhaar', 'supplier_id, created_at', None),
+    ('idx_purchase_udhaar_pending', 'purchase_udhaar', 'created_at', 'current_balance > 0'),
+    ('idx_purchase_udhaar_transactions_udhaar_id', 'purchase_udhaar_transactions', 'udhaar_id', None),
+    ('idx_inventory_transactions_product_id', 'inventory_transactions', 'product_id', None),
+]
+
+def create_indexes(db=None):
+    """Creates the managed secondary indexes. Safe to run on every start."""
+    db = db or DBManager(DATABASE_NAME)
+    with db.transaction():
+        for index_name, table, columns, where in INDEXES:
+            query = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+            if where:
+                query += f" WHERE {where}"
+            db.execute_query(query)
@@ -0,0 +1,105 @@
+from utils.config import DATABASE_NAME
+from utils.db_manager import DBManager
+
+LEDGER_PAGE_SIZE = 50
+
+# One timeline for a customer, in a single statement. Every branch is an indexed
+# lookup on the customer (idx_sales_customer_id, idx_purchases_supplier_id,
+# idx_udhaar_deposits_customer_id, idx_udhaar_customer_id, idx_purchase_udhaar_supplier_id).
+#
+# balance_change is from the shop's side: positive when the customer owes the shop
+# more (unpaid part of a sale, a payment made to them as supplier), negative when
+# they owe less (a deposit, a payment they received, the unpaid part of a purchase
+# from them). The running balance is therefore what the customer owes the shop;
+# negative means the shop owes the customer.
+#
+# save_udhaar_deposit also logs each deposit in udhaar_transactions as
+# "Deposit against <invoice>"; those rows are left out so deposits count once.
+LEDGER_QUERY = """
+    WITH entries (entry_date, entry_type, reference_id, related_invoice_id, amount, balance_change, payment_mode, seq) AS (
+        SELECT sale_date, 'sale', invoice_id, NULL, total_amount, amount_balance, payment_mode, 1
+        FROM sales WHERE customer_id = :customer_id
+        UNION ALL
+        SELECT purchase_date, 'purchase', invoice_id, NULL, total_amount, -amount_balance, payment_mode, 2
+        FROM purchases WHERE supplier_id = :customer_id
+        UNION ALL
+        SELECT deposit_date, 'deposit', deposit_invoice_id, sell_invoice_id, deposit_amount, -deposit_amount, payment_mode, 3
+        FROM udhaar_deposits WHERE customer_id = :customer_id
+        UNION ALL
+        SELECT t.payment_date, 'udhaar_payment', u.sell_invoice_id, NULL, t.amount_paid, -t.amount_paid, t.payment_mode, 4
+        FROM udhaar u
+        JOIN udhaar_transactions t ON t.udhaar_id = u.udhaar_id
+        WHERE u.customer_id = :customer_id
+          AND t.amount_paid <> 0
+          AND COALESCE(t.transaction_info, '') NOT LIKE 'Deposit against %'
+        UNION ALL
+        SELECT t.payment_date, 'purchase_udhaar_payment', pu.purchase_invoice_id, NULL, t.amount_paid, t.amount_paid, t.payment_mode, 5
+        FROM purchase_udhaar pu
+        JOIN purchase_udhaar_transactions t ON t.udhaar_id = pu.udhaar_id
+        WHERE pu.supplier_id = :customer_id
+          AND t.amount_paid <> 0 -- Skip the zero 'Initial Balance/Balance Added' markers
+    ),
+    ledger AS (
+        SELECT
+            entries.*,
+            SUM(balance_change) OVER running AS running_balance,
+            COUNT(*) OVER () AS total_entries,
+            SUM(balance_change) OVER () AS closing_balance
+        FROM entries
+        WINDOW running AS (ORDER BY entry_date, seq, reference_id ROWS UNBOUNDED PRECEDING)
+    )
+    SELECT entry_date, entry_type, reference_id, related_invoice_id, amount, balance_change,
+           running_balance, payment_mode, total_entries, closing_balance
+    FROM ledger
+    ORDER BY entry_date DESC, seq DESC, reference_id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+def get_customer_ledger(customer_id, page=1, page_size=LEDGER_PAGE_SIZE):
+    """
+    Returns one page of a customer's history: sales, purchases, deposits and udhaar
+    payments merged into a single timeline, newest first, with a running balance.
+
+    The whole timeline, running balance and totals come from one query; only the
+    requested page is transferred to Python.
+
+    Args:
+        customer_id (int): The customer (or supplier) to report on.
+        page (int): 1-based page number.
+        page_size (int): Entries per page.
+
+    Returns:
+        dict: {
+            'entries': list of dicts (entry_date, entry_type, reference_id,
+                       related_invoice_id, amount, balance_change, running_balance, payment_mode),
+            'page': page, 'page_size': page_size,
+            'total_entries': int, 'total_pages': int,
+            'closing_balance': float (what the customer owes the shop now; negative if the shop owes them)
+        }
+    """
+    page = max(int(page), 1)
+    db = DBManager(DATABASE_NAME)
+    rows = db.fetch_all(
+        LEDGER_QUERY,
+        {'customer_id': customer_id, 'limit': page_size, 'offset': (page - 1) * page_size},
+        row_factory='dict'
+    )
+
+    totals = rows
+    if not rows and page > 1:
+        # Past the last page: read the window totals from the newest entry instead
+        totals = db.fetch_all(LEDGER_QUERY, {'customer_id': customer_id, 'limit': 1, 'offset': 0}, row_factory='dict')
+    total_entries = totals[0]['total_entries'] if totals else 0
+    closing_balance = (totals[0]['closing_balance'] or 0.0) if totals else 0.0
+
+    for row in rows:
+        del row['total_entries'], row['closing_balance']
+
+    return {
+        'entries': rows,
+        'page': page,
+        'page_size': page_size,
+        'total_entries': total_entries,
+        'total_pages': max((total_entries + page_size - 1) // page_size, 1),
+        'closing_balance': closing_balance,
+    }
@@ -0,0 +1,70 @@
+import sys
+from utils.config import DATABASE_NAME
+from utils.db_manager import DBManager
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# One statement recomputes a whole day from the bills of that day. The day is
+# re-aggregated (not adjusted by +/- deltas) so a summary row can never drift
+# from the bills, and a modified bill that moves to another date only needs
+# both days refreshed. sale_day/purchase_day are indexed, so this reads just
+# the bills of that one day.
+REFRESH_DAY_QUERY = """
+    INSERT OR REPLACE INTO daily_summary (
+        day, sales_count, sales_total, sales_old_gold, sales_balance,
+        sales_cash, sales_upi, sales_online, sales_cheque,
+        purchase_count, purchase_total, purchase_balance,
+        purchase_cash, purchase_upi, purchase_online, purchase_cheque, updated_at
+    )
+    SELECT ?, s.*, p.*, CURRENT_TIMESTAMP
+    FROM (
+        SELECT COUNT(*), COALESCE(SUM(total_amount), 0), COALESCE(SUM(old_gold_amount), 0), COALESCE(SUM(amount_balance), 0),
+               COALESCE(SUM(cash_amount), 0), COALESCE(SUM(upi_amount), 0), COALESCE(SUM(online_amount), 0), COALESCE(SUM(cheque_amount), 0)
+        FROM sales WHERE sale_day = ?
+    ) s, (
+        SELECT COUNT(*), COALESCE(SUM(total_amount), 0), COALESCE(SUM(amount_balance), 0),
+               COALESCE(SUM(cash_amount), 0), COALESCE(SUM(upi_amount), 0), COALESCE(SUM(online_amount), 0), COALESCE(SUM(cheque_amount), 0)
+        FROM purchases WHERE purchase_day = ?
+    ) p
+"""
+
+def refresh_daily_summary(days, db=None):
+    """
+    Recomputes the daily_summary rows for the given days.
+
+    Call it from inside the same db.transaction() that wrote the bills so the
+    summary commits (or rolls back) together with them.
+
+    Args:
+        days (iterable): 'YYYY-MM-DD' strings; None entries are ignored.
+        db (DBManager, optional): The manager used for the bill writes.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    for day in sorted({day for day in days if day}):
+        db.execute_query(REFRESH_DAY_QUERY, (day, day, day))
+        # Days whose last bill was deleted or moved away drop out of the summary
+        db.execute_query("DELETE FROM daily_summary WHERE day = ? AND sales_count = 0 AND purchase_count = 0", (day,))
+
+def rebuild_daily_summary(db=None):
+    """
+    Rebuilds the whole daily_summary table from the sales and purchases tables.
+
+    Returns:
+        int: The number of days in the rebuilt summary.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    with db.transaction():
+        days = [row[0] for row in db.fetch_all("SELECT sale_day FROM sales UNION SELECT purchase_day FROM purchases")]
+        db.execute_query("DELETE FROM daily_summary")
+        refresh_daily_summary(days, db)
+    log.info("Rebuilt daily_summary for %d day(s)", len(days))
+    return len(days)
+
+
+if __name__ == "__main__":
+    # python -m utils.daily_summary --rebuild  (repairs the summary from the bills)
+    if "--rebuild" not in sys.argv[1:]:
+        print("Usage: python -m utils.daily_summary --rebuild")
+        sys.exit(2)
+    rebuild_daily_summary()
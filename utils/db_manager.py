@@ -1,58 +1,434 @@
+import os
 import sqlite3
+import threading
 import time
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from queue import Queue, Empty, Full
+from urllib.parse import quote
+from utils.query_stats import record_query # Per-statement timing and the slow-query log
+from utils.app_logging import get_logger
 # Removed: from utils.config import DATABASE_NAME # This line caused the circular import
 
 # Define DATABASE_NAME directly here to break the circular dependency
 DATABASE_NAME = 'jewellery_app.db'
 
-class DBManager:
-    def __init__(self, db_path=DATABASE_NAME):
+log = get_logger(__name__)
+
+# --- Connection pool settings ---
+POOL_SIZE = 5 # Max idle connections kept open per database file
+CONNECT_TIMEOUT = 10 # Seconds sqlite3 waits on a locked database before raising
+HEALTH_CHECK_INTERVAL = 30 # Seconds a connection may sit idle before it is re-validated
+
+# --- PRAGMA profile applied to every new connection ---
+# WAL lets report queries read while a counter is saving a bill, and
+# synchronous=NORMAL is crash-safe in WAL mode with one fsync per checkpoint
+# instead of one per commit. Override per database via DBManager(pragmas=...).
+PRAGMA_PROFILE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'cache_size': -32000, # Negative means KiB, i.e. ~32 MB page cache per connection
+    'mmap_size': 268435456, # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY',
+    'busy_timeout': CONNECT_TIMEOUT * 1000, # Milliseconds
+}
+
+# Read-only connections (DBManager(read_only=True), used for reports) open the
+# file with a mode=ro URI and can't change the journal mode or write anything;
+# query_only makes that explicit even if the URI is ignored.
+READ_ONLY_PRAGMA_PROFILE = {
+    'query_only': 'ON',
+    'cache_size': -32000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'busy_timeout': CONNECT_TIMEOUT * 1000,
+}
+
+
+class ConnectionPool:
+    """
+    A small thread-safe pool of long-lived sqlite3 connections for one database file.
+
+    Streamlit runs every browser session on its own thread, so connections are
+    created with check_same_thread=False and handed to one thread at a time.
+    Idle connections are re-validated with 'SELECT 1' before reuse and replaced
+    if they have gone bad. With read_only=True the connections can only read.
+    """
+
+    def __init__(self, db_path, size=POOL_SIZE, timeout=CONNECT_TIMEOUT, health_check_interval=HEALTH_CHECK_INTERVAL, pragmas=None, read_only=False):
         self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.read_only = read_only
+        if pragmas is None:
+            pragmas = READ_ONLY_PRAGMA_PROFILE if read_only else PRAGMA_PROFILE
+        self.pragmas = pragmas
+        self._idle = Queue(maxsize=size) # Holds (connection, last_used_time) tuples
 
-    def _execute_query(self, query, params=(), fetch_mode='none', retries=5, delay=0.1):
-        for i in range(retries):
-            conn = None
+    def _connect(self):
+        # isolation_level=None: statements autocommit unless DBManager.transaction() issues BEGIN
+        if self.read_only:
+            # mode=ro: fails instead of creating a missing file, and never takes a write lock
+            uri = f"file:{quote(os.path.abspath(self.db_path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        self._apply_pragmas(conn)
+        return conn
+
+    def _apply_pragmas(self, conn):
+        for name, value in self.pragmas.items():
+            try:
+                # journal_mode returns a row, the others return nothing
+                conn.execute(f"PRAGMA {name} = {value}").fetchall()
+            except sqlite3.Error as e:
+                # e.g. WAL is not available for in-memory or read-only databases
+                log.warning("Could not apply PRAGMA %s = %s: %s", name, value, e)
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Returns an open connection, reusing an idle one when available."""
+        while True:
             try:
-                # Add timeout to connection attempt
-                conn = sqlite3.connect(self.db_path, timeout=10) # 10 seconds timeout
-                cursor = conn.cursor()
+                conn, last_used = self._idle.get_nowait()
+            except Empty:
+                return self._connect()
+
+            if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return conn
+            # Stale or broken connection: drop it and try the next one
+            self._close_quietly(conn)
+
+    def release(self, conn, discard=False):
+        """Returns a connection to the pool, or closes it if the pool is full or it is unusable."""
+        if discard or conn.in_transaction:
+            # Never hand out a connection with a half-finished transaction
+            self._close_quietly(conn)
+            return
+        try:
+            self._idle.put_nowait((conn, time.monotonic()))
+        except Full:
+            self._close_quietly(conn)
+
+    def close_all(self):
+        """Closes every idle connection (e.g. before deleting or replacing the database file)."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=DATABASE_NAME, size=POOL_SIZE, pragmas=None, read_only=False):
+    """
+    Returns the process-wide connection pool for db_path, creating it on first use.
+    Pool size and PRAGMA profile are fixed by whichever caller creates the pool.
+    Read-only connections to a file are pooled separately from read-write ones.
+    """
+    with _pools_lock:
+        pool = _pools.get((db_path, read_only))
+        if pool is None:
+            pool = ConnectionPool(db_path, size=size, pragmas=pragmas, read_only=read_only)
+            _pools[(db_path, read_only)] = pool
+        return pool
+
+def close_all_pools():
+    """Closes all idle pooled connections for every database file."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+
+
+# Open transactions of the current thread, keyed by (database path, read_only).
+# Shared by every DBManager instance so helpers called from inside a
+# transaction (e.g. update_purchase_udhaar from save_sale) join it.
+_local = threading.local()
+
+def _active_transactions():
+    if not hasattr(_local, 'transactions'):
+        _local.transactions = {}
+    return _local.transactions
+
+
+# --- Row factories ---
+# Rows come back as plain tuples unless a row_factory is chosen, either for the
+# whole DBManager or per fetch call. The factory is set on the cursor, so pooled
+# connections shared with other callers keep returning tuples.
+def _dict_factory(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+@lru_cache(maxsize=128)
+def _namedtuple_class(fields):
+    return namedtuple('Row', fields, rename=True) # rename: e.g. 'COUNT(*)' is not a valid field name
+
+def _namedtuple_factory(cursor, row):
+    return _namedtuple_class(tuple(col[0] for col in cursor.description))(*row)
+
+ROW_FACTORIES = {
+    None: None, # Plain tuples
+    'tuple': None,
+    'dict': _dict_factory,
+    'namedtuple': _namedtuple_factory,
+    'row': sqlite3.Row, # Index by position or column name
+}
+
+
+class DBManager:
+    def __init__(self, db_path=DATABASE_NAME, pool_size=POOL_SIZE, pragmas=None, row_factory=None, read_only=False):
+        """
+        Args:
+            db_path (str): The SQLite database file.
+            pool_size (int): Idle connections kept for db_path (first caller wins).
+            pragmas (dict, optional): PRAGMA profile for new connections; defaults to PRAGMA_PROFILE
+                                      (READ_ONLY_PRAGMA_PROFILE with read_only=True).
+            row_factory (str, optional): Default row type for fetch_all/fetch_one:
+                                         None/'tuple', 'dict', 'namedtuple' or 'row' (sqlite3.Row).
+            read_only (bool): Open db_path with a mode=ro URI on a separate pool. Writes raise
+                              sqlite3.OperationalError and transaction() starts a read
+                              transaction: one WAL snapshot for the whole block that never
+                              blocks (or waits for) the billing writes.
+        """
+        if row_factory not in ROW_FACTORIES:
+            raise ValueError(f"Unknown row_factory {row_factory!r}; expected one of {list(ROW_FACTORIES)}")
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.read_only = read_only
+        self._tx_key = (db_path, read_only) # A read-only manager never joins a write transaction, or vice versa
+        self.pool = get_pool(db_path, size=pool_size, pragmas=pragmas, read_only=read_only)
+
+    def _run(self, conn, query, params, fetch_mode, row_factory=None, timing=None):
+        cursor = conn.cursor()
+        try:
+            if fetch_mode == 'many':
+                cursor.executemany(query, params) # params is a list of parameter tuples
+                result, rows = None, cursor.rowcount
+            else:
+                if row_factory is not None:
+                    cursor.row_factory = ROW_FACTORIES[row_factory]
                 cursor.execute(query, params)
 
                 if fetch_mode == 'all':
                     result = cursor.fetchall()
+                    rows = len(result)
                 elif fetch_mode == 'one':
                     result = cursor.fetchone()
+                    rows = int(result is not None)
+                elif fetch_mode == 'columns':
+                    # Column names straight from the cursor, for fetch_df
+                    columns = [col[0] for col in cursor.description] if cursor.description else []
+                    result = columns, cursor.fetchall()
+                    rows = len(result[1])
                 else:
-                    result = None # For 'none' (INSERT/UPDATE/DELETE)
+                    result, rows = None, cursor.rowcount # For 'none' (INSERT/UPDATE/DELETE)
+            if timing is not None:
+                timing['rows'] = max(rows, 0) # rowcount is -1 for statements that change no rows
+            return result
+        finally:
+            cursor.close()
+
+    def _execute_query(self, query, params=(), fetch_mode='none', retries=5, delay=0.1, row_factory=None):
+        """Runs one statement and records its time, row count and lock retries (see utils/query_stats.py)."""
+        timing = {'rows': 0, 'lock_retries': 0}
+        error = None
+        start = time.perf_counter()
+        try:
+            return self._execute(query, params, fetch_mode, retries, delay, row_factory, timing)
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record_query(self.db_path, query, (time.perf_counter() - start) * 1000,
+                         timing['rows'], timing['lock_retries'], error)
+
+    def _execute(self, query, params, fetch_mode, retries, delay, row_factory, timing):
+        if row_factory is None:
+            row_factory = self.row_factory
+        elif row_factory not in ROW_FACTORIES:
+            raise ValueError(f"Unknown row_factory {row_factory!r}; expected one of {list(ROW_FACTORIES)}")
 
+        tx = _active_transactions().get(self._tx_key)
+        if tx is not None:
+            # Inside db.transaction(): run on the transaction's connection, commit happens at the end
+            return self._run(tx['conn'], query, params, fetch_mode, row_factory, timing)
+
+        for i in range(retries):
+            conn = None
+            discard = False
+            try:
+                # Reuse a pooled connection instead of opening a new one per query
+                conn = self.pool.acquire()
+                result = self._run(conn, query, params, fetch_mode, row_factory, timing)
                 conn.commit()
                 return result
             except sqlite3.OperationalError as e:
+                if conn and conn.in_transaction:
+                    conn.rollback()
                 if "database is locked" in str(e) and i < retries - 1:
-                    print(f"Database locked. Retrying in {delay}s... (Attempt {i+1}/{retries})")
+                    log.warning("Database locked. Retrying in %ss (attempt %d/%d)", delay, i + 1, retries)
+                    timing['lock_retries'] += 1
                     time.sleep(delay)
                     delay *= 2 # Exponential backoff
                 else:
-                    print(f"Database operation failed after retries or for other reason: {e}")
-                    if conn:
-                        conn.rollback() # Rollback on final failure
+                    log.error("Database operation failed: %s", e, extra={'sql': query})
+                    discard = "database is locked" not in str(e) # Possibly a broken connection
                     raise # Re-raise the exception if it's not a lock or after max retries
+            except sqlite3.DatabaseError as e:
+                # Integrity errors and the like leave the connection usable
+                log.warning("Database error: %s", e, extra={'sql': query})
+                if conn and conn.in_transaction:
+                    conn.rollback()
+                raise
             except Exception as e:
-                print(f"An unexpected error occurred: {e}")
-                if conn:
-                    conn.rollback() # Rollback on any other exception
+                log.error("An unexpected error occurred: %s", e, extra={'sql': query})
+                discard = True # Connection state is unknown, don't return it to the pool
                 raise # Re-raise other exceptions
             finally:
                 if conn:
-                    conn.close()
+                    self.pool.release(conn, discard=discard)
         return None # Should not be reached if exceptions are re-raised
 
-    def fetch_all(self, query, params=()):
-        return self._execute_query(query, params, fetch_mode='all')
+    def _begin(self, conn, retries=5, delay=0.1):
+        """Starts a write transaction (a read transaction when read_only), retrying while another writer holds the lock."""
+        # IMMEDIATE takes the write lock up front so the bill can't fail half-way on a lock.
+        # A read-only manager uses a deferred BEGIN: the snapshot is taken by the first SELECT.
+        statement = "BEGIN" if self.read_only else "BEGIN IMMEDIATE"
+        # Recorded like a statement: the time spent here is the wait for the write lock
+        start = time.perf_counter()
+        error = None
+        i = 0
+        try:
+            for i in range(retries):
+                try:
+                    conn.execute(statement)
+                    return
+                except sqlite3.OperationalError as e:
+                    if "database is locked" in str(e) and i < retries - 1:
+                        log.warning("Database locked. Retrying in %ss (attempt %d/%d)", delay, i + 1, retries)
+                        time.sleep(delay)
+                        delay *= 2 # Exponential backoff
+                    else:
+                        error = type(e).__name__
+                        raise
+        finally:
+            record_query(self.db_path, statement, (time.perf_counter() - start) * 1000, 0, i, error)
+
+    def _commit(self, conn):
+        """Commits the open transaction; recorded so slow fsyncs and checkpoints show up too."""
+        start = time.perf_counter()
+        error = None
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record_query(self.db_path, "COMMIT", (time.perf_counter() - start) * 1000, 0, 0, error)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Runs every DBManager statement inside the block as one atomic unit.
+
+        All queries issued on this thread against the same database file, from any
+        DBManager instance, share one connection and are committed together when
+        the block exits, or rolled back if it raises. Nested transaction() blocks
+        become savepoints, so an inner failure only undoes the inner block.
+        On a read_only manager the block reads one consistent snapshot instead.
+
+        Usage:
+            with db.transaction():
+                db.execute_query(...)
+                db.execute_query(...)
+        """
+        active = _active_transactions()
+        tx = active.get(self._tx_key)
+
+        if tx is not None:
+            # Nested block: use a savepoint on the already open transaction
+            conn = tx['conn']
+            tx['depth'] += 1
+            savepoint = f"sp_{tx['depth']}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield self
+            except BaseException:
+                conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+                raise
+            else:
+                conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+            finally:
+                tx['depth'] -= 1
+            return
+
+        conn = self.pool.acquire()
+        discard = False
+        try:
+            self._begin(conn)
+            active[self._tx_key] = {'conn': conn, 'depth': 0}
+            try:
+                yield self
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                self._commit(conn)
+        except sqlite3.Error as e:
+            log.error("Transaction failed and was rolled back: %s", e)
+            if conn.in_transaction:
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    discard = True
+            raise
+        finally:
+            active.pop(self._tx_key, None)
+            self.pool.release(conn, discard=discard)
+
+    def fetch_all(self, query, params=(), row_factory=None):
+        return self._execute_query(query, params, fetch_mode='all', row_factory=row_factory)
+
+    def fetch_one(self, query, params=(), row_factory=None):
+        return self._execute_query(query, params, fetch_mode='one', row_factory=row_factory)
 
-    def fetch_one(self, query, params=()):
-        return self._execute_query(query, params, fetch_mode='one')
+    def fetch_df(self, query, params=()):
+        """
+        Runs a SELECT and returns the result as a pandas DataFrame whose columns
+        are named after the query's result columns (aliases included).
+        """
+        import pandas as pd # Local import: only the report/udhaar screens need pandas
+        columns, rows = self._execute_query(query, params, fetch_mode='columns', row_factory='tuple')
+        return pd.DataFrame.from_records(rows, columns=columns)
 
     def execute_query(self, query, params=()):
         self._execute_query(query, params, fetch_mode='none')
 
+    def execute_many(self, query, params_list):
+        """
+        Runs one INSERT/UPDATE/DELETE for every parameter tuple in params_list
+        with a single executemany call (e.g. all item rows of a bill).
+        """
+        params_list = list(params_list) # A generator would be used up by a lock retry
+        if params_list:
+            self._execute_query(query, params_list, fetch_mode='many')
@@ -1,104 +1,111 @@
 import sqlite3
-import streamlit as st
-import os
-from utils.config import DATABASE_NAME, BILLS_FOLDER
+from utils.config import DATABASE_NAME
 from utils.db_manager import DBManager
-from datetime import datetime # Import datetime for timestamp comparison
 from utils.delete_udhaar_deposit import delete_udhaar_deposit_and_reverse # NEW: Import the specific deposit deletion/reversal function
+from utils.daily_summary import refresh_daily_summary
+from utils.invoice_id_creation import invoice_counter_prefix
+from utils.errors import ServiceError, ValidationError, NotFoundError, ConflictError
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
 
 def delete_bill(invoice_id):
     """
     Deletes a bill (sale, purchase, or deposit) from the database and its associated records.
     Deletion is restricted to only the latest bill recorded across sales, purchases, and deposits.
     If the latest bill is deleted, its invoice ID is made available for reuse.
+
+    Returns:
+        dict: {'invoice_id': str, 'bill_type': 'sale' | 'purchase' | 'deposit'}
+
+    Raises:
+        ValidationError: If no invoice ID is given.
+        ConflictError: If the bill is not the latest sale, purchase or deposit.
+        NotFoundError: If no bill has this invoice ID.
+        ServiceError: If the deletion fails; nothing is changed.
     """
     if not invoice_id:
-        st.error("Invoice ID is required for deletion!")
-        return
+        raise ValidationError("Invoice ID is required for deletion!", field="invoice_id")
 
     db = DBManager(DATABASE_NAME) # Instantiate DBManager
 
     try:
-        # --- Check if the provided invoice_id is the latest bill ---
-        # Get the latest sale invoice ID based on created_at
-        latest_sale_invoice_data = db.fetch_one("SELECT invoice_id FROM sales ORDER BY created_at DESC LIMIT 1")
-        latest_sale_invoice_id = latest_sale_invoice_data[0] if latest_sale_invoice_data else None
+        with db.transaction(): # Latest-bill check, delete and counter decrement are atomic
+            # --- Check if the provided invoice_id is the latest bill ---
+            # Get the latest sale invoice ID based on created_at
+            latest_sale_invoice_data = db.fetch_one("SELECT invoice_id, created_at FROM sales ORDER BY created_at DESC LIMIT 1")
+            latest_sale_invoice_id = latest_sale_invoice_data[0] if latest_sale_invoice_data else None
 
-        # Get the latest purchase invoice ID based on created_at
-        latest_purchase_invoice_data = db.fetch_one("SELECT invoice_id FROM purchases ORDER BY created_at DESC LIMIT 1")
-        latest_purchase_invoice_id = latest_purchase_invoice_data[0] if latest_purchase_invoice_data else None
+            # Get the latest purchase invoice ID based on created_at
+            latest_purchase_invoice_data = db.fetch_one("SELECT invoice_id, created_at FROM purchases ORDER BY created_at DESC LIMIT 1")
+            latest_purchase_invoice_id = latest_purchase_invoice_data[0] if latest_purchase_invoice_data else None
 
-        # Get the latest deposit invoice ID based on created_at
-        latest_deposit_invoice_data = db.fetch_one("SELECT deposit_invoice_id, customer_id FROM udhaar_deposits ORDER BY created_at DESC LIMIT 1")
-        latest_deposit_invoice_id = latest_deposit_invoice_data[0] if latest_deposit_invoice_data else None
-        latest_deposit_customer_id = latest_deposit_invoice_data[1] if latest_deposit_invoice_data else None
+            # Get the latest deposit invoice ID based on created_at
+            latest_deposit_invoice_data = db.fetch_one("SELECT deposit_invoice_id, customer_id, created_at FROM udhaar_deposits ORDER BY created_at DESC LIMIT 1")
+            latest_deposit_invoice_id = latest_deposit_invoice_data[0] if latest_deposit_invoice_data else None
+            latest_deposit_customer_id = latest_deposit_invoice_data[1] if latest_deposit_invoice_data else None
 
 
-        is_latest_bill = False
-        bill_type = None # To identify which type of bill was deleted
+            is_latest_bill = False
+            bill_type = None # To identify which type of bill was deleted
         
-        if invoice_id == latest_sale_invoice_id:
-            is_latest_bill = True
-            bill_type = 'sale'
-        elif invoice_id == latest_purchase_invoice_id:
-            is_latest_bill = True
-            bill_type = 'purchase'
-        elif invoice_id == latest_deposit_invoice_id:
-            is_latest_bill = True
-            bill_type = 'deposit'
-
-        if not is_latest_bill:
-            st.error(f"Deletion restricted: Only the latest bill (sale, purchase, or deposit) can be deleted at this time. The latest invoice IDs are: Sale: {latest_sale_invoice_id or 'N/A'}, Purchase: {latest_purchase_invoice_id or 'N/A'}, Deposit: {latest_deposit_invoice_id or 'N/A'}")
-            return
-        # --- END Check for latest bill ---
-
-        # First, check if the bill exists in any of the primary tables
-        sale_exists = db.fetch_one("SELECT invoice_id FROM sales WHERE invoice_id = ?", (invoice_id,))
-        purchase_exists = db.fetch_one("SELECT invoice_id FROM purchases WHERE invoice_id = ?", (invoice_id,))
-        deposit_exists = db.fetch_one("SELECT deposit_invoice_id FROM udhaar_deposits WHERE deposit_invoice_id = ?", (invoice_id,))
-
-        if not sale_exists and not purchase_exists and not deposit_exists:
-            st.error(f"Bill with Invoice ID '{invoice_id}' not found.")
-            return
-
-        deletion_successful = False
+            if invoice_id == latest_sale_invoice_id:
+                is_latest_bill = True
+                bill_type = 'sale'
+            elif invoice_id == latest_purchase_invoice_id:
+                is_latest_bill = True
+                bill_type = 'purchase'
+            elif invoice_id == latest_deposit_invoice_id:
+                is_latest_bill = True
+                bill_type = 'deposit'
+
+            if not is_latest_bill:
+                raise ConflictError(f"Deletion restricted: Only the latest bill (sale, purchase, or deposit) can be deleted at this time. The latest invoice IDs are: Sale: {latest_sale_invoice_id or 'N/A'}, Purchase: {latest_purchase_invoice_id or 'N/A'}, Deposit: {latest_deposit_invoice_id or 'N/A'}")
+            # --- END Check for latest bill ---
+
+            # First, check if the bill exists in any of the primary tables
+            sale_exists = db.fetch_one("SELECT invoice_id FROM sales WHERE invoice_id = ?", (invoice_id,))
+            purchase_exists = db.fetch_one("SELECT invoice_id FROM purchases WHERE invoice_id = ?", (invoice_id,))
+            deposit_exists = db.fetch_one("SELECT deposit_invoice_id FROM udhaar_deposits WHERE deposit_invoice_id = ?", (invoice_id,))
+
+            if not sale_exists and not purchase_exists and not deposit_exists:
+                raise NotFoundError(f"Bill with Invoice ID '{invoice_id}' not found.")
         
-        # Delete from sales and related tables
-        if sale_exists:
-            db.execute_query("DELETE FROM sales WHERE invoice_id = ?", (invoice_id,))
-            st.success(f"Sale bill with Invoice ID '{invoice_id}' and associated records deleted successfully.")
-            deletion_successful = True
-            # Decrement invoice number for reuse
-            db.execute_query("UPDATE invoice_numbers SET invoice_number = invoice_number - 1 WHERE prefix = ?", ('SALES',))
-            print(f"Debug: Decremented SALES invoice number.")
+            # Delete from sales and related tables
+            if sale_exists:
+                sale_day = db.fetch_one("SELECT sale_day FROM sales WHERE invoice_id = ?", (invoice_id,))[0]
+                db.execute_query("DELETE FROM sales WHERE invoice_id = ?", (invoice_id,))
+                refresh_daily_summary([sale_day], db)
+                # Decrement invoice number for reuse (counter of the financial year the bill was created in)
+                db.execute_query("UPDATE invoice_numbers SET invoice_number = invoice_number - 1 WHERE prefix = ?", (invoice_counter_prefix('SALES', latest_sale_invoice_data[1]),))
+                log.debug("Deleted sale and decremented the SALES invoice number", extra={'invoice_id': invoice_id})
             
-        # Delete from purchases and related tables
-        elif purchase_exists: # Use elif to ensure only one type of bill is deleted per call
-            db.execute_query("DELETE FROM purchases WHERE invoice_id = ?", (invoice_id,))
-            st.success(f"Purchase bill with Invoice ID '{invoice_id}' and associated records deleted successfully.")
-            deletion_successful = True
-            # Decrement invoice number for reuse
-            db.execute_query("UPDATE invoice_numbers SET invoice_number = invoice_number - 1 WHERE prefix = ?", ('PURCHASE',))
-            print(f"Debug: Decremented PURCHASE invoice number.")
-
-        # Delete from udhaar_deposits and reverse effects
-        elif deposit_exists: # Use elif
-            if delete_udhaar_deposit_and_reverse(invoice_id):
-                st.success(f"Deposit record with Invoice ID '{invoice_id}' deleted and associated balances reversed successfully.")
-                deletion_successful = True
-                # Decrement invoice number for reuse (requires customer_id for prefix)
-                if latest_deposit_customer_id: # Use the customer_id fetched earlier for the latest deposit
-                    db.execute_query("UPDATE invoice_numbers SET invoice_number = invoice_number - 1 WHERE prefix = ?", (f'UDHAAR-{latest_deposit_customer_id}',))
-                    print(f"Debug: Decremented UDHAAR invoice number for customer {latest_deposit_customer_id}.")
+            # Delete from purchases and related tables
+            elif purchase_exists: # Use elif to ensure only one type of bill is deleted per call
+                purchase_day = db.fetch_one("SELECT purchase_day FROM purchases WHERE invoice_id = ?", (invoice_id,))[0]
+                db.execute_query("DELETE FROM purchases WHERE invoice_id = ?", (invoice_id,))
+                refresh_daily_summary([purchase_day], db)
+                # Decrement invoice number for reuse (counter of the financial year the bill was created in)
+                db.execute_query("UPDATE invoice_numbers SET invoice_number = invoice_number - 1 WHERE prefix = ?", (invoice_counter_prefix('PURCHASE', latest_purchase_invoice_data[1]),))
+                log.debug("Deleted purchase and decremented the PURCHASE invoice number", extra={'invoice_id': invoice_id})
+
+            # Delete from udhaar_deposits and reverse effects
+            elif deposit_exists: # Use elif
+                if delete_udhaar_deposit_and_reverse(invoice_id):
+                    # Decrement invoice number for reuse (requires customer_id for prefix)
+                    if latest_deposit_customer_id: # Use the customer_id fetched earlier for the latest deposit
+                        db.execute_query("UPDATE invoice_numbers SET invoice_number = invoice_number - 1 WHERE prefix = ?", (invoice_counter_prefix(f'UDHAAR-{latest_deposit_customer_id}', latest_deposit_invoice_data[2]),))
+                        log.debug("Deleted deposit and decremented the UDHAAR invoice number", extra={'invoice_id': invoice_id, 'customer_id': latest_deposit_customer_id})
+                    else:
+                        log.warning("Could not decrement the UDHAAR invoice number: customer_id not found", extra={'invoice_id': invoice_id})
                 else:
-                    print(f"Warning: Could not decrement UDHAAR invoice number for {invoice_id} as customer_id was not found.")
-            else:
-                st.error(f"Error deleting deposit record with Invoice ID '{invoice_id}' or reversing its effects. Check logs.")
-                # Deletion_successful remains False
+                    # Raising rolls back anything the reversal already changed
+                    raise ServiceError(f"Error deleting deposit record with Invoice ID '{invoice_id}' or reversing its effects. Check logs.")
 
-        if deletion_successful:
-            st.rerun() # Rerun to reflect changes in UI (e.g., updated pending amounts, cleared forms)
+        return {'invoice_id': invoice_id, 'bill_type': bill_type}
 
+    except ServiceError:
+        raise
     except Exception as e:
-        st.error(f"Error deleting bill: {str(e)}")
-        print(f"Debug: Error in delete_bill: {e}")
+        log.exception("delete_bill failed", extra={'invoice_id': invoice_id})
+        raise ServiceError(f"Error deleting bill: {str(e)}") from e
@@ -2,6 +2,9 @@ import sqlite3
 from datetime import datetime
 from utils.db_manager import DBManager
 from utils.config import DATABASE_NAME
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
 
 def delete_udhaar_deposit_and_reverse(deposit_invoice_id):
     """
@@ -11,69 +14,70 @@ def delete_udhaar_deposit_and_reverse(deposit_invoice_id):
     """
     db = DBManager(DATABASE_NAME)
     try:
-        # 1. Retrieve the deposit info, including linked_purchase_invoice_id
-        deposit_info = db.fetch_one(
-            "SELECT sell_invoice_id, deposit_amount, customer_id, linked_purchase_invoice_id FROM udhaar_deposits WHERE deposit_invoice_id = ?",
-            (deposit_invoice_id,),
-        )
-
-        if not deposit_info:
-            print(f"Error: Udhaar Deposit with Invoice ID '{deposit_invoice_id}' not found for reversal.")
-            return False
+        with db.transaction(): # Delete and both reversals commit together
+            # 1. Retrieve the deposit info, including linked_purchase_invoice_id
+            deposit_info = db.fetch_one(
+                "SELECT sell_invoice_id, deposit_amount, customer_id, linked_purchase_invoice_id FROM udhaar_deposits WHERE deposit_invoice_id = ?",
+                (deposit_invoice_id,),
+            )
 
-        sell_invoice_id, deposit_amount, customer_id, linked_purchase_invoice_id = deposit_info
+            if not deposit_info:
+                log.error("Udhaar deposit not found for reversal", extra={'deposit_invoice_id': deposit_invoice_id})
+                return False
 
-        # 2. Delete the udhaar_deposit record
-        db.execute_query(
-            "DELETE FROM udhaar_deposits WHERE deposit_invoice_id = ?",
-            (deposit_invoice_id,),
-        )
-        print(f"Debug: Deleted udhaar_deposit record for ID: {deposit_invoice_id}")
+            sell_invoice_id, deposit_amount, customer_id, linked_purchase_invoice_id = deposit_info
 
-        # 3. Reverse effects on udhaar (sale pending) balance if linked
-        if sell_invoice_id:
-            udhaar_record = db.fetch_one(
-                "SELECT udhaar_id, current_balance FROM udhaar WHERE sell_invoice_id = ?",
-                (sell_invoice_id,),
+            # 2. Delete the udhaar_deposit record
+            db.execute_query(
+                "DELETE FROM udhaar_deposits WHERE deposit_invoice_id = ?",
+                (deposit_invoice_id,),
             )
-            if udhaar_record:
-                udhaar_id, current_pending = udhaar_record
-                new_pending_amount = current_pending + deposit_amount
-                # Determine status based on new balance
-                status = 'pending' if new_pending_amount > 0 else 'paid'
-                db.execute_query(
-                    "UPDATE udhaar SET current_balance = ?, status = ?, updated_at = ? WHERE udhaar_id = ?",
-                    (new_pending_amount, status, datetime.now().isoformat(), udhaar_id),
-                )
-                print(f"Debug: Reversed deposit: Udhaar for sale invoice {sell_invoice_id} increased by {deposit_amount}. New balance: {new_pending_amount}")
-            else:
-                # If no corresponding udhaar entry exists (implies it was fully paid off by this deposit), create one
-                db.execute_query(
-                    "INSERT INTO udhaar (sell_invoice_id, customer_id, initial_balance, current_balance, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (sell_invoice_id, customer_id, deposit_amount, deposit_amount, 'pending', datetime.now().isoformat(), datetime.now().isoformat()),
+            log.debug("Deleted udhaar deposit record", extra={'deposit_invoice_id': deposit_invoice_id})
+
+            # 3. Reverse effects on udhaar (sale pending) balance if linked
+            if sell_invoice_id:
+                udhaar_record = db.fetch_one(
+                    "SELECT udhaar_id, current_balance FROM udhaar WHERE sell_invoice_id = ?",
+                    (sell_invoice_id,),
                 )
-                print(f"Debug: Reversed deposit: New udhaar record created for sale invoice {sell_invoice_id} with amount {deposit_amount}.")
+                if udhaar_record:
+                    udhaar_id, current_pending = udhaar_record
+                    new_pending_amount = current_pending + deposit_amount
+                    # Determine status based on new balance
+                    status = 'pending' if new_pending_amount > 0 else 'paid'
+                    db.execute_query(
+                        "UPDATE udhaar SET current_balance = ?, status = ?, updated_at = ? WHERE udhaar_id = ?",
+                        (new_pending_amount, status, datetime.now().isoformat(), udhaar_id),
+                    )
+                    log.debug("Reversed deposit: udhaar increased by %s to %s", deposit_amount, new_pending_amount, extra={'deposit_invoice_id': deposit_invoice_id, 'sell_invoice_id': sell_invoice_id})
+                else:
+                    # If no corresponding udhaar entry exists (implies it was fully paid off by this deposit), create one
+                    db.execute_query(
+                        "INSERT INTO udhaar (sell_invoice_id, customer_id, initial_balance, current_balance, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (sell_invoice_id, customer_id, deposit_amount, deposit_amount, 'pending', datetime.now().isoformat(), datetime.now().isoformat()),
+                    )
+                    log.debug("Reversed deposit: created udhaar record for %s", deposit_amount, extra={'deposit_invoice_id': deposit_invoice_id, 'sell_invoice_id': sell_invoice_id})
 
-        # 4. Reverse effects on purchase_udhaar (your pending) balance if linked
-        if linked_purchase_invoice_id:
-            purchase_udhaar_record = db.fetch_one(
-                "SELECT udhaar_id, current_balance FROM purchase_udhaar WHERE purchase_invoice_id = ?",
-                (linked_purchase_invoice_id,)
-            )
-            if purchase_udhaar_record:
-                pur_udhaar_id, pur_current_balance = purchase_udhaar_record
-                pur_new_balance = pur_current_balance + deposit_amount
-                # Determine status based on new balance
-                pur_status = 'pending' if pur_new_balance > 0 else 'paid'
-                db.execute_query(
-                    "UPDATE purchase_udhaar SET current_balance = ?, status = ?, updated_at = ? WHERE udhaar_id = ?",
-                    (pur_new_balance, pur_status, datetime.now().isoformat(), pur_udhaar_id)
+            # 4. Reverse effects on purchase_udhaar (your pending) balance if linked
+            if linked_purchase_invoice_id:
+                purchase_udhaar_record = db.fetch_one(
+                    "SELECT udhaar_id, current_balance FROM purchase_udhaar WHERE purchase_invoice_id = ?",
+                    (linked_purchase_invoice_id,)
                 )
-                print(f"Debug: Reversed deposit: Purchase udhaar for invoice {linked_purchase_invoice_id} increased by {deposit_amount}. New balance: {pur_new_balance}")
-            else:
-                print(f"Warning: Linked purchase udhaar record {linked_purchase_invoice_id} not found during deposit reversal.")
+                if purchase_udhaar_record:
+                    pur_udhaar_id, pur_current_balance = purchase_udhaar_record
+                    pur_new_balance = pur_current_balance + deposit_amount
+                    # Determine status based on new balance
+                    pur_status = 'pending' if pur_new_balance > 0 else 'paid'
+                    db.execute_query(
+                        "UPDATE purchase_udhaar SET current_balance = ?, status = ?, updated_at = ? WHERE udhaar_id = ?",
+                        (pur_new_balance, pur_status, datetime.now().isoformat(), pur_udhaar_id)
+                    )
+                    log.debug("Reversed deposit: purchase udhaar increased by %s to %s", deposit_amount, pur_new_balance, extra={'deposit_invoice_id': deposit_invoice_id, 'purchase_invoice_id': linked_purchase_invoice_id})
+                else:
+                    log.warning("Linked purchase udhaar record not found during deposit reversal", extra={'deposit_invoice_id': deposit_invoice_id, 'purchase_invoice_id': linked_purchase_invoice_id})
 
         return True
     except Exception as e:
-        print(f"Error in delete_udhaar_deposit_and_reverse: {e}")
+        log.exception("Error reversing udhaar deposit", extra={'deposit_invoice_id': deposit_invoice_id})
         return False
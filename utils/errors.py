@@ -0,0 +1,22 @@
+# Errors raised by the billing core (save_sale, delete_bill, customer functions).
+# The core never talks to Streamlit; ui/service_adapters.py turns these into
+# st.error messages, while batch jobs and benchmarks can catch them directly.
+
+class ServiceError(Exception):
+    """Base class: the operation failed and nothing was written."""
+
+
+class ValidationError(ServiceError):
+    """The input is incomplete or invalid (missing customer, bad PAN, zero amount, ...)."""
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        self.field = field # Name of the offending argument, when there is one
+
+
+class NotFoundError(ServiceError):
+    """The bill or customer the operation refers to does not exist."""
+
+
+class ConflictError(ServiceError):
+    """The operation clashes with existing data (duplicate phone/name, not the latest bill, ...)."""
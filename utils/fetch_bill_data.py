@@ -1,9 +1,14 @@
-import streamlit as st
 import sqlite3
 from utils.config import DATABASE_NAME, BILLS_FOLDER
 from utils.db_manager import DBManager
 
 
+def _customer_details(db, customer_id):
+    """The customers row as the dict the PDF generators take, or {} if there is none."""
+    return db.fetch_one(
+        "SELECT * FROM customers WHERE customer_id = ?", (customer_id,), row_factory='dict'
+    ) or {}
+
 def fetch_bill_data(invoice_id):
     db = DBManager(DATABASE_NAME)
     customer_details = {}
@@ -17,16 +22,44 @@ def fetch_bill_data(invoice_id):
 
         # Fetch customer details
         customer_id = sale_record[2]  # Assuming customer_id is at index 2
-        customer_record = db.fetch_one(
-            "SELECT * FROM customers WHERE customer_id = ?", (customer_id,)
-        )
-        if customer_record:
-            # Assuming fetch_one returns a tuple, we create a dictionary manually, if needed.
-            # If your DBManager already returns a dict, you can skip this.
-            customer_details = dict(zip(['customer_id', 'name', 'phone', 'address', 'pan', 'aadhaar', 'firstname', 'lastname', 'gender', 'email', 'alternate_phone', 'alternate_phone2', 'landline_phone', 'city', 'state', 'country', 'pincode', 'created_at', 'updated_at'], customer_record))
-
+        customer_details = _customer_details(db, customer_id)
 
         # Fetch sale items
         sale_items = db.fetch_all("SELECT * FROM sale_items WHERE invoice_id = ?", (invoice_id,))
 
-    return customer_details, sale_data, sale_items
\ No newline at end of file
+    return customer_details, sale_data, sale_items
+
+def fetch_purchase_data(invoice_id):
+    """
+    Everything generate_purchase_pdf needs for a saved purchase.
+
+    Returns:
+        tuple: (supplier_details dict, purchase row or None, list of purchase_items rows)
+    """
+    db = DBManager(DATABASE_NAME)
+    purchase_data = db.fetch_one("SELECT * FROM purchases WHERE invoice_id = ?", (invoice_id,))
+    if not purchase_data:
+        return {}, None, []
+    supplier_details = _customer_details(db, purchase_data[2]) # supplier_id
+    purchase_items = db.fetch_all("SELECT * FROM purchase_items WHERE invoice_id = ?", (invoice_id,))
+    return supplier_details, purchase_data, purchase_items
+
+def fetch_deposit_data(deposit_invoice_id):
+    """
+    Everything generate_udhaar_deposit_pdf needs for a saved udhaar deposit.
+
+    Returns:
+        tuple: (customer_details dict, deposit_data tuple or None, original_invoice_data dict).
+               deposit_data is (deposit_invoice_id, sell_invoice_id, deposit_date, customer_id,
+               deposit_amount, remaining_amount, payment_mode, payment_other_info); the
+               remaining amount is not stored per deposit and is None.
+    """
+    db = DBManager(DATABASE_NAME)
+    deposit_data = db.fetch_one("""
+        SELECT deposit_invoice_id, sell_invoice_id, deposit_date, customer_id,
+               deposit_amount, NULL, payment_mode, payment_other_info
+        FROM udhaar_deposits WHERE deposit_invoice_id = ?
+    """, (deposit_invoice_id,))
+    if not deposit_data:
+        return {}, None, {}
+    return _customer_details(db, deposit_data[3]), deposit_data, {}
@@ -1,9 +1,56 @@
-import streamlit as st
+import os
+import re
 import sqlite3
+import threading
 from utils.config import DATABASE_NAME
 from utils.db_manager import DBManager
+from utils.errors import ServiceError, ValidationError, NotFoundError, ConflictError
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# --- In-process customer directory cache ---
+# The customer pickers call fetch_all_customers()/get_all_customer_names() on every
+# Streamlit rerun. Results are cached per data version; add_new_customer and
+# update_customer bump the version, so the next call reloads from the database.
+# Customers written by another process are picked up after its next bump here or a restart.
+# Entries are keyed by the database file as well, so a process that opens more than one
+# database (benchmarks, the reporting replica) never gets another database's customers.
+_customer_cache_lock = threading.Lock()
+_customer_data_version = 0
+_customer_cache = {} # (database path, cache key) -> (data version, value)
+_customer_cache_stats = {'hits': 0, 'misses': 0}
+
+def bump_customer_data_version():
+    """Marks the cached customer directory as stale. Call after any write to customers."""
+    global _customer_data_version
+    with _customer_cache_lock:
+        _customer_data_version += 1
+
+def get_customer_cache_stats():
+    """Returns the cache hit/miss counters and the current data version, for tuning."""
+    with _customer_cache_lock:
+        return dict(_customer_cache_stats, version=_customer_data_version, entries=len(_customer_cache))
+
+def _cached_customer_query(key, loader):
+    key = (os.path.abspath(DATABASE_NAME), key) # Absolute: the same relative name in another folder is another database
+    with _customer_cache_lock:
+        version = _customer_data_version
+        cached = _customer_cache.get(key)
+        if cached is not None and cached[0] == version:
+            _customer_cache_stats['hits'] += 1
+            return cached[1]
+        _customer_cache_stats['misses'] += 1
+
+    value = loader() # Outside the lock: a slow load must not block other sessions' cache hits
+    with _customer_cache_lock:
+        # Only store it if no write happened while loading
+        if _customer_data_version == version:
+            _customer_cache[key] = (version, value)
+    return value
 
 def get_customer_details_for_update(selected_name):
+    # Returns the editable fields of a customer by name, or None if there is no such customer
     db = DBManager(DATABASE_NAME)
     # Using fetch_one directly
     result = db.fetch_one(
@@ -12,7 +59,6 @@ def get_customer_details_for_update(selected_name):
     )
 
     if result:
-        # st.success(f"Customer '{selected_name}' details fetched") # Moved outside, if you want it after return
         return {
             "name": result[0],
             "phone": result[1],
@@ -23,113 +69,208 @@ def get_customer_details_for_update(selected_name):
             "alternate_phone2": result[6],
             "landline_phone": result[7]
         }
-    else:
-        st.info(f"Customer '{selected_name}' not found.") # Changed to info for clarity
-        return None
+    return None
 
-def get_all_customer_names():
+def _load_customer_names():
     db = DBManager(DATABASE_NAME)
-    # Using fetch_all directly
     rows = db.fetch_all("SELECT DISTINCT name FROM customers")
-    names = [row[0] for row in rows] # Extract names from tuples
-    return names
+    return tuple(row[0] for row in rows) # Extract names from tuples; immutable while cached
 
-def fetch_all_customers():
+def get_all_customer_names():
+    # Served from the customer cache until a customer is added or updated
+    return list(_cached_customer_query('names', _load_customer_names))
+
+def _load_customers():
     db = DBManager(DATABASE_NAME)
-    # Using fetch_all directly
     customers = db.fetch_all("SELECT customer_id, name FROM customers")
-
-    # Return as a dictionary {customer_id: name}
     return {cust_id: name for cust_id, name in customers}
 
-def update_customer(phone, name=None, address=None, pan=None, aadhaar=None, alternate_phone=None, alternate_phone2=None, landline_phone=None):
-    # Phone number validation (basic - can be extended)
+def fetch_all_customers():
+    # Return as a dictionary {customer_id: name}; a copy, so callers can't change the cached one
+    return dict(_cached_customer_query('directory', _load_customers))
+
+# Column weights for bm25() in customers_fts column order: a match on the name
+# outranks phone numbers and PAN, which outrank the city
+CUSTOMER_SEARCH_WEIGHTS = (10.0, 5.0, 3.0, 3.0, 3.0, 1.0, 5.0)
+# bm25() scores every matching row (~2 microseconds each), so a one- or two-letter
+# prefix matching thousands of customers is not fully ranked; see search_customers
+RANKED_SEARCH_MAX_CANDIDATES = 2000
+_customer_fts_databases = set() # absolute paths of databases known to have customers_fts
+
+def _has_customer_fts(db):
+    # Only a positive answer is remembered: a migration can add the table later
+    # in this process, but nothing drops it
+    db_path = os.path.abspath(db.db_path)
+    if db_path not in _customer_fts_databases:
+        if db.fetch_one("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'") is None:
+            return False
+        _customer_fts_databases.add(db_path)
+    return True
+
+def _fts_customer_rows(db, where, params, order_by=""):
+    return db.fetch_all(
+        f"""
+        SELECT c.customer_id, c.name, c.phone, c.city
+        FROM customers_fts
+        JOIN customers c ON c.customer_id = customers_fts.rowid
+        WHERE {where}
+        {order_by}
+        LIMIT ?
+        """,
+        params,
+        row_factory='dict'
+    )
+
+def search_customers(query, limit=20):
+    """
+    Type-ahead customer search over name, phones, city and PAN.
+
+    Every word in the query is matched as a prefix, so "ram 9845" finds
+    "Ramesh Kumar" with phone 98450xxxxx. Results are ranked by bm25 with
+    name matches first. When a very short prefix matches more than
+    RANKED_SEARCH_MAX_CANDIDATES customers, name matches are returned ahead of
+    the other fields without scoring every row, which keeps each keystroke fast.
+    On databases without the customers_fts index it falls back to a LIKE
+    match on name and phone.
+
+    Args:
+        query (str): What the user typed.
+        limit (int): Maximum number of matches to return.
+
+    Returns:
+        list: Up to `limit` dicts with customer_id, name, phone and city, best match first.
+    """
+    terms = re.findall(r"\w+", query or "")
+    if not terms:
+        return []
+
+    db = DBManager(DATABASE_NAME)
+    if not _has_customer_fts(db):
+        pattern = f"%{query.strip()}%"
+        return db.fetch_all(
+            "SELECT customer_id, name, phone, city FROM customers WHERE name LIKE ? OR phone LIKE ? ORDER BY name LIMIT ?",
+            (pattern, pattern, limit),
+            row_factory='dict'
+        )
+
+    match = " ".join(f'"{term}"*' for term in terms) # Quoted so words like AND/OR/NEAR stay plain text
+    candidates = db.fetch_one(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM customers_fts WHERE customers_fts MATCH ? LIMIT ?)",
+        (match, RANKED_SEARCH_MAX_CANDIDATES + 1)
+    )[0]
+    if candidates <= RANKED_SEARCH_MAX_CANDIDATES:
+        weights = ", ".join(str(weight) for weight in CUSTOMER_SEARCH_WEIGHTS)
+        return _fts_customer_rows(db, "customers_fts MATCH ?", (match, limit),
+                                  order_by=f"ORDER BY bm25(customers_fts, {weights})")
+
+    # Too broad to score: name matches first, then the rest
+    results = _fts_customer_rows(db, "customers_fts MATCH ?", (f"{{name}} : ({match})", limit))
+    if len(results) < limit:
+        seen = {row['customer_id'] for row in results}
+        others = _fts_customer_rows(db, "customers_fts MATCH ?", (match, limit + len(seen)))
+        results += [row for row in others if row['customer_id'] not in seen][:limit - len(results)]
+    return results
+
+def _validate_customer_ids(pan, aadhaar):
     if pan and len(pan) != 10: # PAN is typically 10 chars
-        st.error("Please enter a valid PAN (10 characters)")
-        return False # Return False on validation failure
+        raise ValidationError("Please enter a valid PAN (10 characters)", field="pan")
     if aadhaar and len(aadhaar) != 12: # Aadhaar is 12 digits
-        st.error("Please enter a valid Aadhaar (12 digits)")
-        return False # Return False on validation failure
+        raise ValidationError("Please enter a valid Aadhaar (12 digits)", field="aadhaar")
+
+def update_customer(phone, name=None, address=None, pan=None, aadhaar=None, alternate_phone=None, alternate_phone2=None, landline_phone=None):
+    """
+    Updates the customer identified by phone number.
+
+    Returns:
+        int: The customer_id of the updated customer.
+
+    Raises:
+        ValidationError: If the PAN or Aadhaar is malformed.
+        NotFoundError: If no customer has this phone number.
+        ConflictError: If the new name belongs to another customer.
+        ServiceError: If the database write fails otherwise (e.g. still locked after retries).
+    """
+    _validate_customer_ids(pan, aadhaar)
 
     db = DBManager(DATABASE_NAME)
     try:
-        db.execute_query(
-            "UPDATE customers SET name=?, address=?, pan=?, aadhaar=?, alternate_phone=?, alternate_phone2=?, landline_phone=?, updated_at=CURRENT_TIMESTAMP WHERE phone=?",
+        rows = db.fetch_all(
+            "UPDATE customers SET name=?, address=?, pan=?, aadhaar=?, alternate_phone=?, alternate_phone2=?, landline_phone=?, updated_at=CURRENT_TIMESTAMP WHERE phone=? RETURNING customer_id",
             (name, address, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone, phone)
         )
-        print(f"Updating customer with phone: {phone} with details: Name={name}, Address={address}, PAN={pan}, Aadhaar={aadhaar}")
-        st.success(f"Customer with phone '{phone}' updated successfully!") # Added success message
-        return True
-    except Exception as e:
-        st.error(f"Error updating customer: {str(e)}")
-        return False
+    except sqlite3.IntegrityError as e:
+        if "UNIQUE constraint failed: customers.name" in str(e):
+            raise ConflictError(f"Customer name '{name}' already exists.") from e
+        raise ServiceError(f"Error updating customer: {str(e)}") from e # e.g. NOT NULL on an empty name
+    except sqlite3.Error as e:
+        log.exception("update_customer failed")
+        raise ServiceError(f"Error updating customer: {str(e)}") from e
+    if not rows:
+        raise NotFoundError(f"No customer with phone '{phone}'.")
+    bump_customer_data_version() # Names may have changed
+    log.info("Updated customer", extra={'customer_id': rows[0][0]}) # No personal details in the log
+    return rows[0][0]
 
 def add_new_customer(name, phone, address="", pan="", aadhaar="", alternate_phone="", alternate_phone2="", landline_phone=""):
+    """
+    Adds a customer.
+
+    Returns:
+        int: The new customer's customer_id.
+
+    Raises:
+        ValidationError: If the name or phone is missing, or the phone, PAN or Aadhaar is malformed.
+        ConflictError: If the phone number or name is already taken.
+        ServiceError: If the database write fails otherwise (e.g. still locked after retries).
+    """
     # Input validation
     if not name or not phone:
-        st.error("Customer name and phone number are required!")
-        return None
+        raise ValidationError("Customer name and phone number are required!", field="name" if not name else "phone")
 
     # Phone number validation
     if not phone.isdigit() or len(phone) < 10 or len(phone) > 15: # Added max length for phone
-        st.error("Please enter a valid phone number (10-15 digits)")
-        return None
+        raise ValidationError("Please enter a valid phone number (10-15 digits)", field="phone")
 
-    if pan and len(pan) != 10:
-        st.error("Please enter a valid PAN (10 characters)")
-        return None
-    if aadhaar and len(aadhaar) != 12:
-        st.error("Please enter a valid Aadhaar (12 digits)")
-        return None
+    _validate_customer_ids(pan, aadhaar)
 
     db = DBManager(DATABASE_NAME)
     try:
-        db.execute_query(
-            "INSERT INTO customers (name, phone, address, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        # fetch_all (not fetch_one) so the INSERT runs to completion before commit
+        rows = db.fetch_all(
+            "INSERT INTO customers (name, phone, address, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone) VALUES (?, ?, ?, ?, ?, ?, ?, ?) RETURNING customer_id",
             (name, phone, address, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone)
         )
-        # Fetch the last inserted ID if needed, though DBManager's execute_query doesn't return it directly.
-        # If you need lastrowid, you'd extend DBManager or fetch by unique phone/name after insert.
-        # For now, we assume successful insertion is enough.
-        st.success(f"Customer '{name}' added successfully!")
-        # To get the ID, you might need a separate query, e.g.:
-        # customer_id = db.fetch_one("SELECT customer_id FROM customers WHERE phone = ?", (phone,))[0]
-        # return customer_id
-        return True # Return True for success, as we can't directly get lastrowid from DBManager's execute_query
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed: customers.phone" in str(e):
-            st.error(f"Phone number '{phone}' already exists.")
+            raise ConflictError(f"Phone number '{phone}' already exists.") from e
         elif "UNIQUE constraint failed: customers.name" in str(e):
-            st.error(f"Customer name '{name}' already exists.")
-        else:
-            st.error(f"An unexpected database error occurred: {str(e)}")
-        return False
-    except Exception as e:
-        st.error(f"Error adding customer: {str(e)}")
-        return False
+            raise ConflictError(f"Customer name '{name}' already exists.") from e
+        raise ServiceError(f"Error adding customer: {str(e)}") from e
+    except sqlite3.Error as e:
+        log.exception("add_new_customer failed")
+        raise ServiceError(f"Error adding customer: {str(e)}") from e
+    bump_customer_data_version() # New customer must show up in the pickers
+    return rows[0][0]
 
 def get_customer_details(customer_id):
+    # Returns the customer's contact details as a dict, or {} if there is no such customer
     if not customer_id:
         return {}
 
     db = DBManager(DATABASE_NAME)
-    try:
-        details = db.fetch_one(
-            "SELECT name, address, phone, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone FROM customers WHERE customer_id = ?",
-            (customer_id,)
-        )
-        if details:
-            return {
-                "name": details[0],
-                "address": details[1],
-                "phone": details[2],
-                "pan": details[3],
-                "aadhaar": details[4],
-                "alternate_phone": details[5],
-                "alternate_phone2": details[6],
-                "landline_phone": details[7]
-            }
-        return {}
-    except Exception as e:
-        st.error(f"Error fetching customer details: {str(e)}")
-        return {}
\ No newline at end of file
+    details = db.fetch_one(
+        "SELECT name, address, phone, pan, aadhaar, alternate_phone, alternate_phone2, landline_phone FROM customers WHERE customer_id = ?",
+        (customer_id,)
+    )
+    if details:
+        return {
+            "name": details[0],
+            "address": details[1],
+            "phone": details[2],
+            "pan": details[3],
+            "aadhaar": details[4],
+            "alternate_phone": details[5],
+            "alternate_phone2": details[6],
+            "landline_phone": details[7]
+        }
+    return {}
@@ -1,4 +1,3 @@
-import streamlit as st
 import sqlite3
 import os
 import io
@@ -16,12 +15,15 @@ from reportlab.pdfbase.ttfonts import TTFont
 
 from utils.config import DATABASE_NAME, BILLS_FOLDER, create_bills_directory
 from utils.convert_amount_to_word import convert_amount_to_words
-from utils.get_download_link import get_download_link
-from utils.load_and_display_pdf import load_and_display_pdf
 from utils.db_manager import DBManager
+from utils.pdf_resources import get_pdf_fonts, get_pdf_styles
+from utils.pdf_cache import cached_pdf
 
+# Bump when the invoice layout below changes: the PDF cache (utils/pdf_cache.py) then stops serving PDFs of the old layout
+TEMPLATE_VERSION = 1
 
-def generate_purchase_pdf(supplier_details, purchase_data, purchase_items, download=False):
+
+def generate_purchase_pdf(supplier_details, purchase_data, purchase_items, download=False, save_to_disk=True):
     """
     Generates a PDF invoice for a purchase transaction.
 
@@ -30,17 +32,35 @@ def generate_purchase_pdf(supplier_details, purchase_data, purchase_items, downl
         purchase_data (tuple): Tuple containing purchase details from the 'purchases' table.
         purchase_items (list of tuples): List of purchase item details from the 'purchase_items' table.
         download (bool): If True, returns PDF content and filename for download.
+        save_to_disk (bool): If False, skip writing the PDF to the daily bills folder.
+                             Requires download=True.
 
     Returns:
         tuple or str: (pdf_content, filename) if download=True, else file_path.
     """
-    current_daily_bills_folder = create_bills_directory()
+    if not save_to_disk and not download:
+        raise ValueError("generate_purchase_pdf: save_to_disk=False needs download=True, there would be no output")
+
+    current_daily_bills_folder = create_bills_directory() if save_to_disk else BILLS_FOLDER
 
     supplier_name = supplier_details.get("name", "supplier").replace(" ", "_")
     invoice_id = purchase_data[0].replace("/", "_") if purchase_data else "unknown_invoice"
     filename = f"purchase_{supplier_name}_{invoice_id}.pdf"
     file_path = os.path.join(current_daily_bills_folder, filename)
 
+    # An unchanged bill is served from the PDF cache instead of being rendered again
+    pdf_bytes = cached_pdf('purchase', TEMPLATE_VERSION, (supplier_details, purchase_data, purchase_items),
+                           lambda: _render_purchase_pdf(supplier_details, purchase_data, purchase_items))
+
+    if save_to_disk:
+        with open(file_path, 'wb') as f:
+            f.write(pdf_bytes)
+
+    return (pdf_bytes, filename) if download else file_path
+
+
+def _render_purchase_pdf(supplier_details, purchase_data, purchase_items):
+    """Builds the invoice with reportlab and returns the PDF bytes."""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -48,35 +68,9 @@ def generate_purchase_pdf(supplier_details, purchase_data, purchase_items, downl
         topMargin=45 * mm, bottomMargin=25 * mm, leftMargin=8 * mm, rightMargin=8 * mm
     )
 
-    # --- Font Registration and Selection (Copied from generate_sell_pdf) ---
-    font_name = 'Helvetica' # Default fallback
-    bold_font_name = 'Helvetica-Bold' # Default bold fallback
-
-    try:
-        if os.path.exists('arial.ttf'):
-            pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
-            font_name = 'Arial'
-            if os.path.exists('arialbd.ttf'):
-                pdfmetrics.registerFont(TTFont('Arial-Bold', 'arialbd.ttf'))
-                bold_font_name = 'Arial-Bold'
-            else:
-                bold_font_name = 'Helvetica-Bold'
-        else:
-            font_name = 'Helvetica'
-            bold_font_name = 'Helvetica-Bold'
-    except Exception as e:
-        print(f"Warning: Could not register Arial fonts. Falling back to Helvetica. Error: {e}")
-        font_name = 'Helvetica'
-        bold_font_name = 'Helvetica-Bold'
-
-    styles = getSampleStyleSheet()
-    for style in ['Normal', 'h1', 'h2', 'h3', 'h4']:
-        styles[style].fontName = font_name
-    styles['Normal'].fontSize = 12
-    styles['h1'].fontSize = 16
-    styles['h2'].fontSize = 14
-    styles['h3'].fontSize = 10
-    styles['h4'].fontSize = 10
+    # Fonts are registered and styles built once per process (see utils/pdf_resources.py)
+    font_name, bold_font_name = get_pdf_fonts()
+    styles = get_pdf_styles()
 
     elements = []
 
@@ -239,7 +233,4 @@ def generate_purchase_pdf(supplier_details, purchase_data, purchase_items, downl
 
     doc.build(elements)
 
-    with open(file_path, 'wb') as f:
-        f.write(buffer.getvalue())
-
-    return (buffer.getvalue(), filename) if download else file_path
+    return buffer.getvalue()
@@ -1,4 +1,3 @@
-import streamlit as st
 import sqlite3
 from utils.config import DATABASE_NAME, BILLS_FOLDER, create_bills_directory
 import os
@@ -13,12 +12,15 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 from utils.convert_amount_to_word import convert_amount_to_words
-from utils.get_download_link import get_download_link
-from utils.load_and_display_pdf import load_and_display_pdf
 from utils.db_manager import DBManager
+from utils.pdf_resources import get_pdf_fonts, get_pdf_styles
+from utils.pdf_cache import cached_pdf
+
+# Bump when the invoice layout below changes: the PDF cache (utils/pdf_cache.py) then stops serving PDFs of the old layout
+TEMPLATE_VERSION = 1
 
 # --- PDF Generation ---
-def generate_sell_pdf(customer_details, sale_data, sale_items, download=False):
+def generate_sell_pdf(customer_details, sale_data, sale_items, download=False, save_to_disk=True):
     """
     Generates a PDF invoice for a sale transaction.
 
@@ -38,12 +40,18 @@ def generate_sell_pdf(customer_details, sale_data, sale_items, download=False):
                                      cgst_rate, sgst_rate, hsn, created_at, updated_at)
         download (bool): If True, returns PDF content and filename for download.
                          If False, saves PDF to file_path and returns file_path.
+        save_to_disk (bool): If False, the PDF is only rendered in memory and not
+                             written to the daily bills folder (e.g. for reprints).
+                             Requires download=True.
 
     Returns:
         tuple or str: (pdf_content, filename) if download=True, else file_path.
     """
+    if not save_to_disk and not download:
+        raise ValueError("generate_sell_pdf: save_to_disk=False needs download=True, there would be no output")
+
     # Ensure the daily bills directory exists
-    current_daily_bills_folder = create_bills_directory()
+    current_daily_bills_folder = create_bills_directory() if save_to_disk else BILLS_FOLDER
 
     # Get customer name for filename
     customer_name = customer_details.get("name", "customer").replace(" ", "_")
@@ -51,50 +59,27 @@ def generate_sell_pdf(customer_details, sale_data, sale_items, download=False):
     filename = f"sale_{customer_name}_{invoice_id}.pdf"
     file_path = os.path.join(current_daily_bills_folder, filename)
 
+    # An unchanged bill is served from the PDF cache instead of being rendered again
+    pdf_bytes = cached_pdf('sale', TEMPLATE_VERSION, (customer_details, sale_data, sale_items),
+                           lambda: _render_sell_pdf(customer_details, sale_data, sale_items))
+
+    if save_to_disk:
+        with open(file_path, 'wb') as f:
+            f.write(pdf_bytes)
+
+    return (pdf_bytes, filename) if download else file_path
+
+
+def _render_sell_pdf(customer_details, sale_data, sale_items):
+    """Builds the invoice with reportlab and returns the PDF bytes."""
     # Create PDF
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=(210 * mm, 297 * mm * 0.75),
                             topMargin=45 * mm, bottomMargin=25 * mm, leftMargin=8 * mm, rightMargin=8 * mm)
 
-    # --- Font Registration and Selection ---
-    # Attempt to register Arial and Arial-Bold. If not found, fallback to Helvetica and Helvetica-Bold.
-    font_name = 'Helvetica' # Default fallback
-    bold_font_name = 'Helvetica-Bold' # Default bold fallback
-
-    try:
-        # Check if 'arial.ttf' exists in the current directory or accessible path
-        if os.path.exists('arial.ttf'):
-            pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
-            font_name = 'Arial'
-            # Try to register Arial-Bold if arial.ttf was found.
-            # Assuming 'arialbd.ttf' is the bold version. If not, this will fail gracefully.
-            if os.path.exists('arialbd.ttf'):
-                pdfmetrics.registerFont(TTFont('Arial-Bold', 'arialbd.ttf'))
-                bold_font_name = 'Arial-Bold'
-            else:
-                # If Arial exists but Arial-Bold.ttf doesn't, use Arial for normal and Helvetica-Bold for bold
-                bold_font_name = 'Helvetica-Bold'
-        else:
-            # If arial.ttf is not found, stick with Helvetica and Helvetica-Bold
-            font_name = 'Helvetica'
-            bold_font_name = 'Helvetica-Bold'
-    except Exception as e:
-        # Fallback to Helvetica if any font registration fails
-        print(f"Warning: Could not register Arial fonts. Falling back to Helvetica. Error: {e}")
-        font_name = 'Helvetica'
-        bold_font_name = 'Helvetica-Bold'
-
-    styles = getSampleStyleSheet()
-    styles['Normal'].fontName = font_name
-    styles['Normal'].fontSize = 12
-    styles['h1'].fontName = font_name
-    styles['h1'].fontSize = 16
-    styles['h2'].fontName = font_name
-    styles['h2'].fontSize = 14
-    styles['h3'].fontName = font_name
-    styles['h3'].fontSize = 10
-    styles['h4'].fontName = font_name
-    styles['h4'].fontSize = 10
+    # Fonts are registered and styles built once per process (see utils/pdf_resources.py)
+    font_name, bold_font_name = get_pdf_fonts()
+    styles = get_pdf_styles()
 
     # Build document content
     elements = []
@@ -254,11 +239,4 @@ def generate_sell_pdf(customer_details, sale_data, sale_items, download=False):
     # Build the PDF
     doc.build(elements)
 
-    # Save to file
-    with open(file_path, 'wb') as f:
-        f.write(buffer.getvalue())
-
-    if download:
-        return buffer.getvalue(), filename
-    else:
-        return file_path
+    return buffer.getvalue()
@@ -1,4 +1,3 @@
-import streamlit as st
 import sqlite3
 # Corrected import: use create_bills_directory function instead of direct variable
 from utils.config import DATABASE_NAME, BILLS_FOLDER, create_bills_directory
@@ -14,13 +13,19 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime # Import datetime for date formatting
 from utils.convert_amount_to_word import convert_amount_to_words 
-from utils.get_download_link import get_download_link
-from utils.load_and_display_pdf import load_and_display_pdf
 from utils.db_manager import DBManager
+from utils.pdf_resources import get_pdf_fonts, get_pdf_styles
+from utils.pdf_cache import cached_pdf
 
-def generate_udhaar_deposit_pdf(customer_details, deposit_data, original_invoice_data, download=False):
-    # Ensure the daily bills directory exists and get its path
-    current_daily_bills_folder = create_bills_directory()
+# Bump when the receipt layout below changes: the PDF cache (utils/pdf_cache.py) then stops serving PDFs of the old layout
+TEMPLATE_VERSION = 1
+
+def generate_udhaar_deposit_pdf(customer_details, deposit_data, original_invoice_data, download=False, save_to_disk=True):
+    if not save_to_disk and not download:
+        raise ValueError("generate_udhaar_deposit_pdf: save_to_disk=False needs download=True, there would be no output")
+
+    # Ensure the daily bills directory exists and get its path (not needed for in-memory only PDFs)
+    current_daily_bills_folder = create_bills_directory() if save_to_disk else BILLS_FOLDER
 
     # Get customer name for filename
     customer_name = customer_details.get("name", "customer").replace(" ", "_")
@@ -28,28 +33,28 @@ def generate_udhaar_deposit_pdf(customer_details, deposit_data, original_invoice
     filename = f"deposit_{customer_name}_{invoice_id}.pdf"
     # Use the path returned by create_bills_directory()
     file_path = os.path.join(current_daily_bills_folder, filename)
-    
+
+    # An unchanged bill is served from the PDF cache instead of being rendered again
+    pdf_bytes = cached_pdf('deposit', TEMPLATE_VERSION, (customer_details, deposit_data, original_invoice_data),
+                           lambda: _render_udhaar_deposit_pdf(customer_details, deposit_data, original_invoice_data))
+
+    if save_to_disk:
+        with open(file_path, 'wb') as f:
+            f.write(pdf_bytes)
+
+    return (pdf_bytes, filename) if download else file_path
+
+
+def _render_udhaar_deposit_pdf(customer_details, deposit_data, original_invoice_data):
+    """Builds the receipt with reportlab and returns the PDF bytes."""
     # Create PDF
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=(210 * mm, 297 * mm * 0.75),
                             topMargin=45 * mm, bottomMargin=25 * mm, leftMargin=8 * mm, rightMargin=8 * mm)
     
-    # Try to register font, with error handling
-    try:
-        pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
-        font_name = 'Arial'
-    except:
-        font_name = 'Helvetica'  # Fallback to a built-in font
-    
-    styles = getSampleStyleSheet()
-    styles['Normal'].fontName = font_name
-    styles['Normal'].fontSize = 12
-    styles['h1'].fontName = font_name
-    styles['h1'].fontSize = 16
-    styles['h2'].fontName = font_name
-    styles['h2'].fontSize = 14
-    styles['h3'].fontName = font_name
-    styles['h3'].fontSize = 10
+    # Fonts are registered and styles built once per process (see utils/pdf_resources.py)
+    font_name, _ = get_pdf_fonts()
+    styles = get_pdf_styles()
     
     # Build document content
     elements = []
@@ -84,12 +89,5 @@ def generate_udhaar_deposit_pdf(customer_details, deposit_data, original_invoice
     
     # Build the PDF
     doc.build(elements)
-    
-    # Save to file
-    with open(file_path, 'wb') as f:
-        f.write(buffer.getvalue())
-    
-    if download:
-        return buffer.getvalue(), filename
-    else:
-        return file_path
+
+    return buffer.getvalue()
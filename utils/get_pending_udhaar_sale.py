@@ -3,6 +3,9 @@ import pandas as pd # Import pandas
 from utils.config import DATABASE_NAME
 from datetime import datetime # Import datetime for current_timestamp in update_purchase_udhaar
 from utils.db_manager import DBManager # Import the new DBManager
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
 
 def get_pending_purchase_udhaar(supplier_id):
     """
@@ -23,7 +26,7 @@ def get_pending_purchase_udhaar(supplier_id):
         )
         return total_pending[0] if total_pending and total_pending[0] is not None else 0.0
     except Exception as e:
-        print(f"Error fetching pending purchase udhaar for supplier {supplier_id}: {e}")
+        log.error("Error fetching pending purchase udhaar: %s", e, extra={'supplier_id': supplier_id})
         return 0.0
     finally:
         # DBManager handles connection closing, so no need for explicit conn.close() here
@@ -39,29 +42,15 @@ def get_all_pending_purchase_udhaar():
     """
     db = DBManager(DATABASE_NAME) # Use DBManager for fetching rows
     try:
-        rows = db.fetch_all("SELECT * FROM purchase_udhaar WHERE current_balance > 0")
-        
-        if rows:
-            # Get column names from schema for dict conversion
-            # This part needs a direct sqlite3 connection for PRAGMA,
-            # as DBManager's methods don't expose cursor.description directly.
-            temp_conn = sqlite3.connect(DATABASE_NAME)
-            temp_conn.row_factory = sqlite3.Row # Set row_factory for column names
-            temp_cursor = temp_conn.cursor()
-            temp_cursor.execute("PRAGMA table_info(purchase_udhaar)")
-            columns = [col[1] for col in temp_cursor.fetchall()]
-            temp_conn.close() # Close the temporary connection
-
-            return [dict(zip(columns, row)) for row in rows]
-        return []
+        # row_factory='dict' names the values after the result columns, no schema lookup needed
+        return db.fetch_all("SELECT * FROM purchase_udhaar WHERE current_balance > 0", row_factory='dict')
     except Exception as e:
-        print(f"Error fetching all pending purchase udhaar: {e}")
+        log.error("Error fetching all pending purchase udhaar: %s", e)
         return []
     finally:
         # DBManager handles connection closing for its operations
         pass
 
-
 def update_purchase_udhaar(purchase_invoice_id, amount_paid):
     """
     Updates the pending amount for a specific purchase invoice in the purchase_udhaar table.
@@ -76,51 +65,46 @@ def update_purchase_udhaar(purchase_invoice_id, amount_paid):
     """
     db = DBManager(DATABASE_NAME) # Use DBManager
     try:
-        print(f"Debug (update_purchase_udhaar): Attempting to update purchase invoice {purchase_invoice_id} with amount paid {amount_paid}")
-        result = db.fetch_one(
-            "SELECT current_balance FROM purchase_udhaar WHERE purchase_invoice_id = ?",
-            (purchase_invoice_id,)
-        )
-
-        if result:
-            current_pending = result[0]
-            new_pending = current_pending - amount_paid
-            current_timestamp = datetime.now().isoformat()
-            print(f"Debug (update_purchase_udhaar): Current pending: {current_pending}, New pending: {new_pending}")
+        with db.transaction(): # Balance update and its log entry commit together
+            result = db.fetch_one(
+                "SELECT current_balance FROM purchase_udhaar WHERE purchase_invoice_id = ?",
+                (purchase_invoice_id,)
+            )
 
-            if new_pending <= 0:
-                db.execute_query(
-                    "UPDATE purchase_udhaar SET current_balance = ?, status = 'paid', last_payment_date = ?, updated_at = ? WHERE purchase_invoice_id = ?",
-                    (0.0, current_timestamp, current_timestamp, purchase_invoice_id)
-                )
-                print(f"Debug (update_purchase_udhaar): Set purchase invoice {purchase_invoice_id} to paid.")
-            else:
-                db.execute_query(
-                    "UPDATE purchase_udhaar SET current_balance = ?, status = 'partially_paid', last_payment_date = ?, updated_at = ? WHERE purchase_invoice_id = ?",
-                    (new_pending, current_timestamp, current_timestamp, purchase_invoice_id)
-                )
-                print(f"Debug (update_purchase_udhaar): Updated purchase invoice {purchase_invoice_id} to {new_pending}.")
+            if result:
+                current_pending = result[0]
+                new_pending = current_pending - amount_paid
+                current_timestamp = datetime.now().isoformat()
+                log.debug("Purchase udhaar %s -> %s after paying %s", current_pending, new_pending, amount_paid, extra={'purchase_invoice_id': purchase_invoice_id})
+
+                if new_pending <= 0:
+                    db.execute_query(
+                        "UPDATE purchase_udhaar SET current_balance = ?, status = 'paid', last_payment_date = ?, updated_at = ? WHERE purchase_invoice_id = ?",
+                        (0.0, current_timestamp, current_timestamp, purchase_invoice_id)
+                    )
+                else:
+                    db.execute_query(
+                        "UPDATE purchase_udhaar SET current_balance = ?, status = 'partially_paid', last_payment_date = ?, updated_at = ? WHERE purchase_invoice_id = ?",
+                        (new_pending, current_timestamp, current_timestamp, purchase_invoice_id)
+                    )
             
-            # Log the transaction in purchase_udhaar_transactions
-            udhaar_id_result = db.fetch_one("SELECT udhaar_id FROM purchase_udhaar WHERE purchase_invoice_id = ?", (purchase_invoice_id,))
-            if udhaar_id_result:
-                udhaar_id = udhaar_id_result[0]
-                db.execute_query('''
-                    INSERT INTO purchase_udhaar_transactions (udhaar_id, payment_date, amount_paid, payment_mode, transaction_info)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (udhaar_id, current_timestamp, amount_paid, 'Adjustment (Sale)', f"Adjusted against sale invoice"))
-                print(f"Debug (update_purchase_udhaar): Logged transaction for udhaar_id {udhaar_id}.")
+                # Log the transaction in purchase_udhaar_transactions
+                udhaar_id_result = db.fetch_one("SELECT udhaar_id FROM purchase_udhaar WHERE purchase_invoice_id = ?", (purchase_invoice_id,))
+                if udhaar_id_result:
+                    udhaar_id = udhaar_id_result[0]
+                    db.execute_query('''
+                        INSERT INTO purchase_udhaar_transactions (udhaar_id, payment_date, amount_paid, payment_mode, transaction_info)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (udhaar_id, current_timestamp, amount_paid, 'Adjustment (Sale)', f"Adjusted against sale invoice"))
+                else:
+                    log.warning("No purchase udhaar row to log the payment against", extra={'purchase_invoice_id': purchase_invoice_id})
+
+                return True
             else:
-                print(f"Debug (update_purchase_udhaar): Could not find udhaar_id for logging transaction for {purchase_invoice_id}.")
-
-
-            print(f"Debug (update_purchase_udhaar): Transaction for purchase invoice {purchase_invoice_id} processed via DBManager.")
-            return True
-        else:
-            print(f"Debug (update_purchase_udhaar): No pending purchase found for invoice ID: {purchase_invoice_id}")
-            return False
+                log.debug("No pending purchase found", extra={'purchase_invoice_id': purchase_invoice_id})
+                return False
     except Exception as e:
-        print(f"Error updating purchase udhaar for invoice {purchase_invoice_id}: {e}")
+        log.exception("Error updating purchase udhaar", extra={'purchase_invoice_id': purchase_invoice_id})
         return False
     finally:
         # DBManager handles connection closing
@@ -145,7 +129,7 @@ def get_pending_udhaar(customer_id):
         )
         return total_pending[0] if total_pending and total_pending[0] is not None else 0.0
     except Exception as e:
-        print(f"Error fetching pending udhaar for customer {customer_id}: {e}")
+        log.error("Error fetching pending udhaar: %s", e, extra={'customer_id': customer_id})
         return 0.0
     finally:
         # DBManager handles connection closing, so no need for explicit conn.close() here
@@ -179,41 +163,10 @@ def get_all_pending_udhaar():
             JOIN customers c ON u.customer_id = c.customer_id
             WHERE u.current_balance > 0
             ORDER BY u.created_at DESC
-        """)
-        
-        if rows:
-            # Get column names from schema for dict conversion
-            # This part needs a direct sqlite3 connection for PRAGMA,
-            # as DBManager's methods don't expose cursor.description directly.
-            temp_conn = sqlite3.connect(DATABASE_NAME)
-            temp_conn.row_factory = sqlite3.Row # Set row_factory for column names
-            temp_cursor = temp_conn.cursor()
-            temp_cursor.execute("""
-                SELECT
-                    u.udhaar_id,
-                    u.sell_invoice_id,
-                    u.customer_id,
-                    u.initial_balance,
-                    u.current_balance,
-                    u.last_payment_date,
-                    u.status,
-                    s.total_amount AS total_bill_amount,
-                    s.sale_date AS bill_date,
-                    c.name AS customer_name,
-                    c.phone AS customer_phone
-                FROM udhaar u
-                JOIN sales s ON u.sell_invoice_id = s.invoice_id
-                JOIN customers c ON u.customer_id = c.customer_id
-                WHERE u.current_balance > 0
-                ORDER BY u.created_at DESC
-            """)
-            columns = [col[0] for col in temp_cursor.description] # Get column names from description
-            temp_conn.close() # Close the temporary connection
-
-            return [dict(zip(columns, row)) for row in rows]
-        return []
+        """, row_factory='dict') # Column names come from the cursor, so the JOIN runs only once
+        return rows
     except Exception as e:
-        print(f"Error fetching all pending udhaar: {e}")
+        log.error("Error fetching all pending udhaar: %s", e)
         return []
     finally:
         # DBManager handles connection closing for its operations
@@ -226,19 +179,9 @@ def get_sale_details(invoice_id):
     """
     db = DBManager(DATABASE_NAME) # Use DBManager
     try:
-        sale_data = db.fetch_one("SELECT * FROM sales WHERE invoice_id = ?", (invoice_id,))
-        if sale_data:
-            # If DBManager returns tuples, get column names for dict conversion
-            temp_conn = sqlite3.connect(DATABASE_NAME)
-            temp_conn.row_factory = sqlite3.Row
-            temp_cursor = temp_conn.cursor()
-            temp_cursor.execute("SELECT * FROM sales LIMIT 0") # Get schema without fetching data
-            columns = [col[0] for col in temp_cursor.description]
-            temp_conn.close()
-            return dict(zip(columns, sale_data))
-        return None
+        return db.fetch_one("SELECT * FROM sales WHERE invoice_id = ?", (invoice_id,), row_factory='dict')
     except Exception as e:
-        print(f"Error fetching sale details for invoice {invoice_id}: {e}")
+        log.error("Error fetching sale details: %s", e, extra={'invoice_id': invoice_id})
         return None
     finally:
         # DBManager handles connection closing
@@ -251,49 +194,43 @@ def update_udhaar_balance(udhaar_id, amount_paid, payment_mode, transaction_info
     """
     db = DBManager(DATABASE_NAME) # Use DBManager
     try:
-        # --- DEBUG PRINT ---
-        print(f"DEBUG update_udhaar_balance: Received udhaar_id: {udhaar_id} (type: {type(udhaar_id)})")
         # Explicitly convert udhaar_id to int to avoid potential numpy.int64 issues with sqlite3
         udhaar_id = int(udhaar_id)
-        print(f"DEBUG update_udhaar_balance: Converted udhaar_id: {udhaar_id} (type: {type(udhaar_id)})")
-        # --- END DEBUG PRINT ---
 
-        result = db.fetch_one("SELECT current_balance FROM udhaar WHERE udhaar_id = ?", (udhaar_id,))
-        
-        # --- DEBUG PRINT ---
-        print(f"DEBUG update_udhaar_balance: Result of fetch_one for udhaar_id {udhaar_id}: {result}")
-        # --- END DEBUG PRINT ---
+        with db.transaction(): # Balance update and its log entry commit together
+            result = db.fetch_one("SELECT current_balance FROM udhaar WHERE udhaar_id = ?", (udhaar_id,))
+            log.debug("Paying %s against balance %s", amount_paid, result[0] if result else None, extra={'udhaar_id': udhaar_id})
 
-        if result:
-            current_balance = result[0]
-            new_balance = current_balance - amount_paid
-            current_timestamp = datetime.now().isoformat()
+            if result:
+                current_balance = result[0]
+                new_balance = current_balance - amount_paid
+                current_timestamp = datetime.now().isoformat()
 
-            if new_balance <= 0:
-                status = 'paid'
-                new_balance = 0 # Ensure balance is not negative
-            else:
-                status = 'partially_paid'
+                if new_balance <= 0:
+                    status = 'paid'
+                    new_balance = 0 # Ensure balance is not negative
+                else:
+                    status = 'partially_paid'
 
-            db.execute_query(
-                "UPDATE udhaar SET current_balance = ?, status = ?, last_payment_date = ?, updated_at = ? WHERE udhaar_id = ?",
-                (new_balance, status, current_timestamp, current_timestamp, udhaar_id)
-            )
+                db.execute_query(
+                    "UPDATE udhaar SET current_balance = ?, status = ?, last_payment_date = ?, updated_at = ? WHERE udhaar_id = ?",
+                    (new_balance, status, current_timestamp, current_timestamp, udhaar_id)
+                )
 
-            # Insert into udhaar_transactions
-            db.execute_query(
-                """
-                INSERT INTO udhaar_transactions (udhaar_id, payment_date, amount_paid, payment_mode, transaction_info)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (udhaar_id, current_timestamp, amount_paid, payment_mode, transaction_info)
-            )
-            return True
-        else:
-            print(f"No udhaar record found for ID: {udhaar_id}")
-            return False
+                # Insert into udhaar_transactions
+                db.execute_query(
+                    """
+                    INSERT INTO udhaar_transactions (udhaar_id, payment_date, amount_paid, payment_mode, transaction_info)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (udhaar_id, current_timestamp, amount_paid, payment_mode, transaction_info)
+                )
+                return True
+            else:
+                log.warning("No udhaar record found", extra={'udhaar_id': udhaar_id})
+                return False
     except Exception as e:
-        print(f"Error updating udhaar balance: {e}")
+        log.exception("Error updating udhaar balance", extra={'udhaar_id': udhaar_id})
         return False
     finally:
         # DBManager handles connection closing
@@ -2,59 +2,118 @@ import sqlite3
 from datetime import datetime
 from utils.config import DATABASE_NAME
 from utils.db_manager import DBManager
+from utils.app_logging import get_logger
 
-def get_next_invoice_number(prefix):
+log = get_logger(__name__)
+
+# --- Invoice numbering settings ---
+FINANCIAL_YEAR_START_MONTH = 4 # Indian GST financial year runs April-March
+INVOICE_NUMBER_WIDTH = 5 # Zero-padded digits in sales/purchase IDs; wider numbers still print in full
+UDHAAR_NUMBER_WIDTH = 3 # Zero-padded digits in per-customer udhaar IDs
+
+def financial_year(when=None):
     """
-    Retrieves the next sequential invoice number for a given prefix (e.g., 'SALES', 'PURCHASE').
-    Updates the last used number in the database.
+    Returns the financial year label (e.g., '2025-26') for a date.
+
+    Args:
+        when (date | datetime | str, optional): The date, or an ISO date/timestamp
+                                                string such as a created_at value.
+                                                Defaults to today.
     """
-    db = DBManager(DATABASE_NAME) # Instantiate DBManager
-    try:
-        # Use db.fetch_one instead of cursor.execute and cursor.fetchone
-        last_number_result = db.fetch_one("SELECT MAX(invoice_number) FROM invoice_numbers WHERE prefix = ?", (prefix,))
-        last_number = last_number_result[0] if last_number_result else None # Extract value from tuple
+    if when is None:
+        when = datetime.now()
+    elif isinstance(when, str):
+        when = datetime.strptime(when[:10], '%Y-%m-%d')
+    start_year = when.year if when.month >= FINANCIAL_YEAR_START_MONTH else when.year - 1
+    return f"{start_year}-{(start_year + 1) % 100:02d}"
+
+def invoice_counter_prefix(counter, when=None):
+    """
+    Returns the invoice_numbers key for a counter in the financial year of `when`,
+    e.g. invoice_counter_prefix('SALES') -> 'SALES-2025-26'. Each year's row is
+    created lazily by its first allocation, so numbering restarts at 1 every April.
+    """
+    return f"{counter}-{financial_year(when)}"
+
+def reserve_invoice_numbers(prefix, count=1):
+    """
+    Atomically reserves a block of consecutive invoice numbers for a prefix.
 
-        next_number = (last_number if last_number is not None else 0) + 1
+    The counter row is created on first use and bumped by a single
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement, so concurrent
+    callers (other counters, other browser sessions) can never receive the
+    same number. A terminal can reserve e.g. 50 numbers up front and hand
+    them out locally without touching the database again.
 
-        # Use db.execute_query instead of cursor.execute and conn.commit
-        db.execute_query("REPLACE INTO invoice_numbers (prefix, invoice_number) VALUES (?, ?)", (prefix, next_number))
-        
-        return next_number
+    Args:
+        prefix (str): The counter to allocate from (e.g., 'SALES', 'PURCHASE').
+        count (int): How many consecutive numbers to reserve.
+
+    Returns:
+        range: The reserved numbers, or None if the allocation failed.
+    """
+    if count < 1:
+        raise ValueError(f"count must be at least 1, got {count}")
+
+    db = DBManager(DATABASE_NAME) # Instantiate DBManager
+    try:
+        # fetch_all (not fetch_one) so the statement always runs to completion before commit
+        rows = db.fetch_all(
+            """
+            INSERT INTO invoice_numbers (prefix, invoice_number) VALUES (?, ?)
+            ON CONFLICT(prefix) DO UPDATE SET
+                invoice_number = invoice_number + excluded.invoice_number,
+                updated_at = CURRENT_TIMESTAMP
+            RETURNING invoice_number
+            """,
+            (prefix, count)
+        )
+        last_number = rows[0][0]
+        return range(last_number - count + 1, last_number + 1)
     except Exception as e:
-        print(f"Error getting next invoice number for prefix {prefix}: {e}")
-        # DBManager's execute_query handles rollback internally, no need for conn.rollback()
+        log.error("Error reserving %d invoice number(s): %s", count, e, extra={'prefix': prefix})
+        return None
+
+def get_next_invoice_number(prefix):
+    """
+    Retrieves the next sequential invoice number for a given prefix (e.g., 'SALES', 'PURCHASE').
+    Updates the last used number in the database in the same atomic statement.
+    """
+    numbers = reserve_invoice_numbers(prefix, 1)
+    if numbers is None:
         return None
-    finally:
-        # DBManager handles connection closing, no need for conn.close()
-        pass
+    return numbers[0]
 
 def generate_sales_invoice_id():
     """
-    Generates a unique sales invoice ID in the format SAL-YYYY-NNNNN.
+    Generates a unique sales invoice ID in the format SAL-YYYY-YY-NNNNN,
+    numbered per financial year.
     """
-    year = datetime.now().strftime("%Y")
-    next_num = get_next_invoice_number("SALES")
+    fy = financial_year()
+    next_num = get_next_invoice_number(invoice_counter_prefix("SALES"))
     if next_num is None:
         return None # Handle error case
-    return f"SAL-{year}-{next_num:05d}" # Example: SAL-2023-00001
+    return f"SAL-{fy}-{next_num:0{INVOICE_NUMBER_WIDTH}d}" # Example: SAL-2025-26-00001
 
 def generate_purchase_invoice_id():
     """
-    Generates a unique purchase invoice ID in the format PUR-YYYY-NNNNN.
+    Generates a unique purchase invoice ID in the format PUR-YYYY-YY-NNNNN,
+    numbered per financial year.
     """
-    year = datetime.now().strftime("%Y")
-    next_num = get_next_invoice_number("PURCHASE")
+    fy = financial_year()
+    next_num = get_next_invoice_number(invoice_counter_prefix("PURCHASE"))
     if next_num is None:
         return None # Handle error case
-    return f"PUR-{year}-{next_num:05d}"
+    return f"PUR-{fy}-{next_num:0{INVOICE_NUMBER_WIDTH}d}"
 
 def generate_udhaar_invoice_id(customer_id):
     """
-    Generates a unique udhaar (credit) invoice ID in the format UDH-YYYY-CUSTOMERID-NNN.
+    Generates a unique udhaar (credit) invoice ID in the format UDH-YYYY-YY-CUSTOMERID-NNN,
+    numbered per customer and financial year.
     """
-    year = datetime.now().strftime("%Y")
+    fy = financial_year()
     # Using customer_id as part of the prefix for udhaar to ensure uniqueness per customer
-    next_num = get_next_invoice_number(f"UDHAAR-{customer_id}")
+    next_num = get_next_invoice_number(invoice_counter_prefix(f"UDHAAR-{customer_id}"))
     if next_num is None:
         return None # Handle error case
-    return f"UDH-{year}-{customer_id}-{next_num:03d}"
+    return f"UDH-{fy}-{customer_id}-{next_num:0{UDHAAR_NUMBER_WIDTH}d}"
@@ -1,6 +1,9 @@
 import streamlit as st
 import sqlite3
+import base64
+import os
 from utils.config import DATABASE_NAME,BILLS_FOLDER
+from utils.get_download_link import get_download_link
 
 
 # Function to load and display PDF bill
@@ -12,7 +15,7 @@ def load_and_display_pdf(file_path):
             pdf_display = f'<iframe src="data:application/pdf;base64,{b64_pdf}" width="800" height="600" type="application/pdf"></iframe>'
             st.markdown(pdf_display, unsafe_allow_html=True)
             
-            # Create download button
-            st.markdown(get_download_link(pdf_bytes, os.path.basename(file_path)), unsafe_allow_html=True)
+            # Create download button, reusing the base64 text of the preview
+            st.markdown(get_download_link(pdf_bytes, os.path.basename(file_path), b64=b64_pdf), unsafe_allow_html=True)
     except Exception as e:
         st.error(f"Error displaying PDF: {str(e)}")
@@ -0,0 +1,300 @@
+import argparse
+import json
+import sqlite3
+import sys
+
+from utils.config import (DATABASE_NAME, add_day_columns, create_base_tables, create_customer_search,
+                          create_daily_summary_table, create_indexes, create_pdf_jobs_table)
+from utils.db_manager import DBManager
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Schema migrations, applied in order and recorded in PRAGMA user_version.
+#
+# Each step is (version, description, apply, backfill):
+#   apply(db)                      runs in one transaction together with the
+#                                  version check; it returns None when the step
+#                                  is complete, or the starting cursor of its backfill.
+#   backfill(db, cursor, chunk)    processes one batch in its own short transaction
+#                                  and returns the next cursor, or None when done.
+# The cursor of an unfinished backfill is kept in migration_progress, so an
+# interrupted upgrade (crash, Ctrl+C, power cut) resumes where it stopped, and
+# the app can keep writing between batches instead of waiting behind one
+# hours-long lock on a large database.
+#
+# Never edit a released step: append a new one with the next version number.
+MIGRATION_CHUNK_SIZE = 5000 # Rows copied per backfill transaction
+SUMMARY_DAYS_PER_CHUNK = 31 # Days re-aggregated per daily_summary backfill transaction
+
+# --- Step 2: tables still in the layout of the original app.py ---
+# app.py created customers/sales/... without created_at and with other columns
+# (sales.date, purchases.customer_id, udhaar.pending_amount, deposits keyed by
+# deposit_invoice_id). Those tables are renamed to legacy_<name>, recreated in
+# the current layout and copied over in chunks, then dropped.
+LEGACY_TABLES = ['customers', 'sales', 'sale_items', 'purchases', 'purchase_items', 'udhaar', 'udhaar_deposits']
+
+# (target table, chunked legacy table, legacy tables the copy reads, INSERT reading rowids ? < rowid <= ?)
+LEGACY_COPIES = [
+    ('customers', 'legacy_customers', {'customers'}, '''
+        INSERT INTO customers (customer_id, name, phone, address, pan, aadhaar)
+        SELECT l.customer_id,
+               -- customers.name is UNIQUE now; later duplicates keep their ID as a suffix
+               CASE WHEN EXISTS (SELECT 1 FROM legacy_customers d WHERE d.name = l.name AND d.customer_id < l.customer_id)
+                    THEN l.name || ' #' || l.customer_id ELSE l.name END,
+               l.phone, l.address, l.pan, l.aadhaar
+        FROM legacy_customers l WHERE l.rowid > ? AND l.rowid <= ?
+    '''),
+    ('sales', 'legacy_sales', {'sales'}, '''
+        INSERT INTO sales (invoice_id, sale_date, customer_id, total_amount, cheque_amount, online_amount, upi_amount,
+                           cash_amount, old_gold_amount, amount_balance, payment_mode, payment_other_info, created_at)
+        SELECT l.invoice_id, COALESCE(NULLIF(l.sale_date, ''), l.date), l.customer_id, l.total_amount, l.cheque_amount,
+               l.online_amount, l.upi_amount, l.cash_amount, l.old_gold_amount, l.amount_balance, l.payment_mode,
+               l.payment_other_info, l.date -- Day the bill was entered, so older bills sort before new ones
+        FROM legacy_sales l WHERE l.rowid > ? AND l.rowid <= ?
+    '''),
+    ('sale_items', 'legacy_sale_items', {'sale_items'}, '''
+        INSERT INTO sale_items (item_id, invoice_id, metal, metal_rate, description, qty, net_wt, purity, amount,
+                                cgst_rate, sgst_rate, hsn)
+        SELECT l.item_id, l.invoice_id, l.metal, l.metal_rate, l.description, l.qty, l.net_wt, l.purity, l.amount,
+               l.cgst_rate, l.sgst_rate, l.hsn
+        FROM legacy_sale_items l
+        WHERE l.rowid > ? AND l.rowid <= ?
+          AND EXISTS (SELECT 1 FROM sales s WHERE s.invoice_id = l.invoice_id) -- Items left behind by deleted bills
+    '''),
+    ('purchases', 'legacy_purchases', {'purchases'}, '''
+        INSERT INTO purchases (invoice_id, purchase_date, supplier_id, total_amount, payment_mode, payment_other_info,
+                               amount_balance, created_at)
+        SELECT l.invoice_id, l.date, l.customer_id, l.total_amount, l.payment_mode, l.payment_other_info,
+               0.0, l.date -- app.py did not track supplier balances
+        FROM legacy_purchases l WHERE l.rowid > ? AND l.rowid <= ?
+    '''),
+    ('purchase_items', 'legacy_purchase_items', {'purchase_items'}, '''
+        INSERT INTO purchase_items (item_id, invoice_id, metal, qty, net_wt, price, amount)
+        SELECT l.item_id, l.invoice_id, l.metal, l.qty, l.net_wt, l.price, l.amount
+        FROM legacy_purchase_items l
+        WHERE l.rowid > ? AND l.rowid <= ?
+          AND EXISTS (SELECT 1 FROM purchases p WHERE p.invoice_id = l.invoice_id)
+    '''),
+    # app.py kept only the still-pending amount and deleted the row once paid;
+    # the current layout has one row per credit sale with its initial balance.
+    ('udhaar', 'legacy_sales', {'sales', 'udhaar'}, '''
+        INSERT INTO udhaar (sell_invoice_id, customer_id, initial_balance, current_balance, status, created_at)
+        SELECT invoice_id, customer_id, amount_balance, pending,
+               CASE WHEN pending <= 0 THEN 'paid' WHEN pending < amount_balance THEN 'partially_paid' ELSE 'pending' END,
+               date
+        FROM (
+            SELECT l.invoice_id, l.customer_id, l.amount_balance, l.date,
+                   (SELECT COALESCE(SUM(u.pending_amount), 0) FROM legacy_udhaar u WHERE u.sell_invoice_id = l.invoice_id) AS pending
+            FROM legacy_sales l WHERE l.rowid > ? AND l.rowid <= ? AND l.amount_balance > 0
+        )
+    '''),
+    ('udhaar_deposits', 'legacy_udhaar_deposits', {'udhaar_deposits'}, '''
+        INSERT INTO udhaar_deposits (deposit_invoice_id, sell_invoice_id, customer_id, deposit_amount, deposit_date,
+                                     payment_mode, payment_other_info, created_at)
+        SELECT l.deposit_invoice_id,
+               (SELECT s.invoice_id FROM sales s WHERE s.invoice_id = l.sell_invoice_id), -- NULL if the sale was deleted
+               l.customer_id, l.deposit_amount, l.date, l.payment_mode, l.payment_other_info, l.date
+        FROM legacy_udhaar_deposits l WHERE l.rowid > ? AND l.rowid <= ?
+    '''),
+]
+
+# Lookups the copies make against the legacy tables
+LEGACY_INDEXES = [
+    ('idx_legacy_customers_name', 'customers', 'name, customer_id'),
+    ('idx_legacy_udhaar_sell_invoice_id', 'udhaar', 'sell_invoice_id'),
+]
+
+
+def _legacy_tables(db):
+    """Tables that exist in the original app.py layout (no created_at column)."""
+    legacy = []
+    for table in LEGACY_TABLES:
+        columns = {row[1] for row in db.fetch_all(f"PRAGMA table_info({table})")}
+        if columns and 'created_at' not in columns:
+            legacy.append(table)
+    return legacy
+
+def _renamed_legacy_tables(db):
+    """Legacy tables already renamed by step 2 and not yet dropped."""
+    rows = db.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'legacy\\_%' ESCAPE '\\'")
+    return {row[0][len('legacy_'):] for row in rows if row[0][len('legacy_'):] in LEGACY_TABLES}
+
+def upgrade_legacy_tables(db):
+    legacy = _legacy_tables(db)
+    if not legacy:
+        return None
+    for table in legacy:
+        db.execute_query(f"ALTER TABLE {table} RENAME TO legacy_{table}")
+    # With foreign keys on, the rename also repoints REFERENCES in the tables an
+    # earlier create_tables() added next to the legacy ones (purchase_udhaar,
+    # udhaar_transactions, ...). The app could not start on such a database, so
+    # they are still empty: drop them and let create_base_tables recreate them.
+    for (table,) in db.fetch_all("""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'legacy\\_%' ESCAPE '\\' AND sql LIKE '%REFERENCES "legacy\\_%' ESCAPE '\\'
+    """):
+        if db.fetch_one(f"SELECT 1 FROM {table} LIMIT 1"):
+            raise sqlite3.IntegrityError(f"{table} has rows but refers to a table in the old app.py layout; upgrade it by hand")
+        db.execute_query(f"DROP TABLE {table}")
+    for index_name, table, columns in LEGACY_INDEXES:
+        if table in legacy:
+            db.execute_query(f"CREATE INDEX IF NOT EXISTS {index_name} ON legacy_{table} ({columns})")
+    create_base_tables(db)
+    log.info("Renamed %s to legacy_* for copying into the current layout", ', '.join(legacy))
+    return {'copy': 0, 'rowid': 0}
+
+def copy_legacy_tables(db, cursor, chunk_size):
+    renamed = _renamed_legacy_tables(db)
+    copies = [copy for copy in LEGACY_COPIES if copy[2] <= renamed]
+    if cursor['copy'] >= len(copies):
+        for table in sorted(renamed):
+            db.execute_query(f"DROP TABLE legacy_{table}")
+        log.info("Dropped the legacy tables after copying them")
+        return None
+
+    target, source, _, insert_query = copies[cursor['copy']]
+    rowids = db.fetch_all(f"SELECT rowid FROM {source} WHERE rowid > ? ORDER BY rowid LIMIT ?", (cursor['rowid'], chunk_size))
+    if not rowids:
+        return {'copy': cursor['copy'] + 1, 'rowid': 0}
+    db.execute_query(insert_query, (cursor['rowid'], rowids[-1][0]))
+    log.info("Copied %s into %s up to rowid %d", source, target, rowids[-1][0])
+    return {'copy': cursor['copy'], 'rowid': rowids[-1][0]}
+
+# --- Step 5: daily_summary rollup, filled one range of days at a time ---
+def create_daily_summary(db):
+    if not create_daily_summary_table(db):
+        return None
+    return {'day': ''} # Every day after '' (i.e. all of them)
+
+def fill_daily_summary(db, cursor, chunk_size):
+    from utils.daily_summary import refresh_daily_summary # Local import: daily_summary imports config
+    days = [row[0] for row in db.fetch_all("""
+        SELECT sale_day FROM sales WHERE sale_day > ?
+        UNION
+        SELECT purchase_day FROM purchases WHERE purchase_day > ?
+        ORDER BY 1 LIMIT ?
+    """, (cursor['day'], cursor['day'], SUMMARY_DAYS_PER_CHUNK))]
+    if not days:
+        return None
+    refresh_daily_summary(days, db)
+    return {'day': days[-1]}
+
+def _no_backfill(step):
+    def apply(db):
+        step(db)
+        return None
+    return apply
+
+MIGRATIONS = [
+    (1, "Core tables", _no_backfill(create_base_tables), None),
+    (2, "Upgrade tables from the original app.py layout", upgrade_legacy_tables, copy_legacy_tables),
+    (3, "Generated sale_day/purchase_day columns", _no_backfill(add_day_columns), None),
+    (4, "Secondary indexes", _no_backfill(create_indexes), None),
+    (5, "daily_summary rollup", create_daily_summary, fill_daily_summary),
+    (6, "customers_fts search index", _no_backfill(create_customer_search), None),
+    (7, "pdf_jobs background render queue", _no_backfill(create_pdf_jobs_table), None),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(db):
+    return db.fetch_one("PRAGMA user_version")[0]
+
+def _set_schema_version(db, version):
+    db.execute_query(f"PRAGMA user_version = {int(version)}") # PRAGMA values cannot be bound parameters
+
+def _create_progress_table(db):
+    db.execute_query('''
+        CREATE TABLE IF NOT EXISTS migration_progress (
+            version INTEGER PRIMARY KEY,
+            cursor TEXT NOT NULL, -- JSON position of the unfinished backfill
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+def _load_cursor(db, version):
+    row = db.fetch_one("SELECT cursor FROM migration_progress WHERE version = ?", (version,))
+    return json.loads(row[0]) if row else None
+
+def _run_step(db, version, apply, backfill, chunk_size):
+    """Applies one migration and runs its backfill to the end, one batch per transaction."""
+    with db.transaction():
+        # Re-read under the write lock: another process may have applied it meanwhile
+        if get_schema_version(db) >= version:
+            return False
+        if _load_cursor(db, version) is None: # Not resuming an interrupted backfill
+            cursor = apply(db)
+            if cursor is None:
+                _set_schema_version(db, version)
+                return True
+            db.execute_query("INSERT INTO migration_progress (version, cursor) VALUES (?, ?)", (version, json.dumps(cursor)))
+
+    while True:
+        with db.transaction():
+            cursor = _load_cursor(db, version)
+            if cursor is None: # Finished by another process
+                return get_schema_version(db) >= version
+            cursor = backfill(db, cursor, chunk_size)
+            if cursor is None:
+                db.execute_query("DELETE FROM migration_progress WHERE version = ?", (version,))
+                _set_schema_version(db, version)
+                return True
+            db.execute_query("UPDATE migration_progress SET cursor = ?, updated_at = CURRENT_TIMESTAMP WHERE version = ?",
+                             (json.dumps(cursor), version))
+
+def migrate(db=None, target=None, chunk_size=MIGRATION_CHUNK_SIZE):
+    """
+    Brings the database up to the target schema version.
+
+    Each step runs in its own transaction together with its user_version
+    bump, so a failed step leaves the database at the previous version.
+    Backfills commit after every chunk and resume from migration_progress
+    when called again.
+
+    Args:
+        db (DBManager, optional): Manager for the database to upgrade.
+        target (int, optional): Version to stop at. Defaults to SCHEMA_VERSION.
+        chunk_size (int): Rows per backfill transaction.
+
+    Returns:
+        list: Versions applied by this call.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    target = SCHEMA_VERSION if target is None else target
+    current = get_schema_version(db)
+    if current > SCHEMA_VERSION:
+        log.warning("Database schema version %d is newer than this app (%d)", current, SCHEMA_VERSION)
+        return []
+
+    applied = []
+    _create_progress_table(db)
+    for version, description, apply, backfill in MIGRATIONS:
+        if version > target or get_schema_version(db) >= version:
+            continue
+        log.info("Applying schema migration %d: %s", version, description)
+        if _run_step(db, version, apply, backfill, chunk_size):
+            applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    # python -m utils.migrations [--status] [--chunk-size N]
+    # Run before starting the app to upgrade a large database ahead of time.
+    parser = argparse.ArgumentParser(description="Upgrade jewellery_app.db in the current folder to the current schema.")
+    parser.add_argument("--status", action="store_true", help="show the schema version and pending steps only")
+    parser.add_argument("--chunk-size", type=int, default=MIGRATION_CHUNK_SIZE, help="rows per backfill transaction")
+    args = parser.parse_args()
+
+    db = DBManager(DATABASE_NAME)
+    version = get_schema_version(db)
+    print(f"Schema version {version} (current: {SCHEMA_VERSION})")
+    if args.status:
+        has_progress = db.fetch_one("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'migration_progress'")
+        for step_version, description, _, _ in MIGRATIONS:
+            if step_version > version:
+                cursor = _load_cursor(db, step_version) if has_progress else None
+                print(f"  pending {step_version}: {description}" + (f" (resuming at {cursor})" if cursor else ""))
+        sys.exit(0)
+    applied = migrate(db, chunk_size=args.chunk_size)
+    print(f"Applied migration(s): {', '.join(map(str, applied)) or 'none'}")
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import tempfile
+import threading
+import reportlab
+from utils.pdf_resources import get_font_signature
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Content-addressed cache of rendered invoice PDFs.
+#
+# The key is a SHA-256 of everything a PDF is rendered from: the bill kind,
+# the generator's TEMPLATE_VERSION, the fonts (utils.pdf_resources.get_font_signature),
+# the reportlab version and the customer, header and item rows exactly as
+# they were read from the database (updated_at included). Editing a bill, e.g.
+# with update_sale_bill, or the customer changes those rows and so the key:
+# the old PDF is simply never asked for again and ages out. Nothing has to be
+# invalidated by hand.
+#
+# PDFs are stored as files under PDF_CACHE_DIR/<first 2 hex digits>/<key>.pdf.
+# A hit touches the file's mtime; once the folder grows past PDF_CACHE_MAX_BYTES
+# the least recently used files are deleted down to PDF_CACHE_TARGET_RATIO of
+# the limit. Files are written to a temporary name and renamed, so batch
+# reprint workers and Streamlit sessions can share the folder.
+PDF_CACHE_ENABLED = True
+PDF_CACHE_DIR = os.path.join('cache', 'pdf') # Relative to the app folder, like DATABASE_NAME
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+PDF_CACHE_TARGET_RATIO = 0.9
+
+_lock = threading.Lock()
+_total_bytes = None # Size of the cache folder as this process knows it; None until first scanned
+_counters = {'hits': 0, 'misses': 0, 'stores': 0, 'evicted': 0}
+
+
+def cache_key(kind, template_version, *rows):
+    """
+    The cache key for one PDF.
+
+    Args:
+        kind (str): 'sale', 'purchase' or 'deposit'.
+        template_version (int): The generator's TEMPLATE_VERSION.
+        *rows: The generator's inputs (customer dict, header row, item rows).
+
+    Returns:
+        str: 64 hex digits.
+    """
+    # repr of str/int/float/None tuples is stable, and a dict keeps its column order
+    material = repr((kind, template_version, get_font_signature(), reportlab.Version, rows))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+def _path(key):
+    return os.path.join(PDF_CACHE_DIR, key[:2], f"{key}.pdf")
+
+def get(key):
+    """The cached PDF bytes for key, or None."""
+    if not PDF_CACHE_ENABLED:
+        return None
+    path = _path(key)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path) # Most recently used
+    except OSError:
+        data = None # Not cached, or evicted by another process meanwhile
+    with _lock:
+        _counters['hits' if data else 'misses'] += 1
+    return data or None
+
+def put(key, data):
+    """Stores PDF bytes under key, evicting least recently used PDFs if the cache is over its size limit."""
+    global _total_bytes
+    if not PDF_CACHE_ENABLED:
+        return
+    path = _path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # A full disk or read-only folder only costs the next reprint a render
+        log.warning("Could not store PDF in the cache: %s", e, extra={'key': key})
+        return
+    with _lock:
+        _counters['stores'] += 1
+        if _total_bytes is None:
+            _total_bytes = _scan()[1]
+        else:
+            _total_bytes += len(data)
+        over = _total_bytes > PDF_CACHE_MAX_BYTES
+    if over:
+        _evict()
+
+def _scan():
+    """(list of (mtime, size, path), total bytes) of the cached PDFs on disk."""
+    files = []
+    if os.path.isdir(PDF_CACHE_DIR):
+        for bucket in os.scandir(PDF_CACHE_DIR):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    return files, sum(size for _, size, _ in files)
+
+def _evict():
+    global _total_bytes
+    with _lock: # One eviction at a time per process; other processes may race, deletes are idempotent
+        files, total = _scan()
+        target = PDF_CACHE_MAX_BYTES * PDF_CACHE_TARGET_RATIO
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass # Already gone
+            total -= size
+            evicted += 1
+        _total_bytes = total
+        _counters['evicted'] += evicted
+    log.info("Evicted %d PDFs from the cache", evicted, extra={'cache_bytes': total})
+
+def cached_pdf(kind, template_version, rows, render):
+    """
+    Returns the PDF for rows from the cache, or renders and caches it.
+
+    Args:
+        kind (str): 'sale', 'purchase' or 'deposit'.
+        template_version (int): The generator's TEMPLATE_VERSION.
+        rows (tuple): The generator's inputs, see cache_key.
+        render (callable): No-argument function returning the PDF bytes on a miss.
+
+    Returns:
+        bytes: The PDF.
+    """
+    key = cache_key(kind, template_version, *rows)
+    data = get(key)
+    if data is None:
+        data = render()
+        put(key, data)
+    return data
+
+def stats():
+    """Hit/miss/store/eviction counts of this process and the cache folder's current size."""
+    files, total = _scan()
+    with _lock:
+        return dict(_counters, files=len(files), bytes=total)
+
+def clear():
+    """Deletes every cached PDF."""
+    global _total_bytes
+    with _lock:
+        for _, _, path in _scan()[0]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        _total_bytes = 0
+
+def configure(enabled=None, folder=None, max_bytes=None):
+    """Turns the cache on/off, moves it or changes its size limit (e.g. from a benchmark)."""
+    global PDF_CACHE_ENABLED, PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, _total_bytes
+    with _lock:
+        if enabled is not None:
+            PDF_CACHE_ENABLED = enabled
+        if folder is not None:
+            PDF_CACHE_DIR = folder
+            _total_bytes = None
+        if max_bytes is not None:
+            PDF_CACHE_MAX_BYTES = max_bytes
@@ -0,0 +1,282 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from utils.config import DATABASE_NAME
+from utils.db_manager import DBManager
+from utils.fetch_bill_data import fetch_bill_data, fetch_purchase_data, fetch_deposit_data
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Background rendering of invoice PDFs, so the counter doesn't wait for reportlab.
+#
+# After a bill is committed the screen calls enqueue_pdf(), which adds a row
+# to the pdf_jobs table and wakes the worker threads of this process. A worker
+# claims the oldest runnable job with a SELECT and an UPDATE inside one
+# BEGIN IMMEDIATE transaction (so several workers, or several app processes on
+# the same database, never render the same job),
+# reads the bill, renders the PDF into the daily bills folder exactly as the
+# save screens used to, and marks the job done. The screens poll get_job()
+# and offer the download once it is.
+#
+# A failed render is retried after PDF_JOB_RETRY_DELAYS seconds until
+# max_attempts; then the job is 'failed' and can be retried by hand from the
+# PDF Jobs screen. Jobs left 'running' by a process that died are put back in
+# the queue (or failed, once out of attempts): all of them when a process
+# starts its workers, since the shop runs one app process per database, and
+# otherwise by the workers every PDF_JOB_STALE_CHECK_SECONDS once a job has
+# been running for PDF_JOB_STALE_SECONDS.
+PDF_JOB_WORKERS = 1 # Threads per app process; reportlab holds the GIL, so more mostly adds contention
+PDF_JOB_MAX_ATTEMPTS = 3
+PDF_JOB_RETRY_DELAYS = (2, 10, 60) # Seconds before the 2nd, 3rd, ... attempt
+PDF_JOB_POLL_SECONDS = 2.0 # Idle workers re-check the table this often (enqueue_pdf wakes them at once)
+PDF_JOB_STALE_SECONDS = 300 # A render takes milliseconds; a job running this long has lost its worker
+PDF_JOB_STALE_CHECK_SECONDS = 60
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+# kind -> (bill fetcher, PDF generator name in its module)
+_JOB_TYPES = {
+    'sale': (fetch_bill_data, ('utils.generate_sell_pdf', 'generate_sell_pdf')),
+    'purchase': (fetch_purchase_data, ('utils.generate_purchase_pdf', 'generate_purchase_pdf')),
+    'deposit': (fetch_deposit_data, ('utils.generate_udhaar_deposit_pdf', 'generate_udhaar_deposit_pdf')),
+}
+
+JOB_COLUMNS = ['job_id', 'kind', 'invoice_id', 'status', 'attempts', 'max_attempts', 'run_after',
+               'file_path', 'filename', 'error', 'worker', 'created_at', 'started_at', 'finished_at']
+_SELECT_JOB = "SELECT " + ", ".join(JOB_COLUMNS) + " FROM pdf_jobs"
+
+_wake = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def _now(offset_seconds=0):
+    return (datetime.now() + timedelta(seconds=offset_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+def enqueue_pdf(kind, invoice_id, max_attempts=PDF_JOB_MAX_ATTEMPTS, db=None):
+    """
+    Queues a bill's PDF for rendering; call it after the bill is committed.
+
+    A bill that already has a queued or running job gets that job back
+    instead of a second one.
+
+    Args:
+        kind (str): 'sale', 'purchase' or 'deposit'.
+        invoice_id (str): The sale/purchase invoice_id or the deposit_invoice_id.
+
+    Returns:
+        int: The job_id, for get_job().
+    """
+    if kind not in _JOB_TYPES:
+        raise ValueError(f"Unknown PDF job kind {kind!r}; expected one of {list(_JOB_TYPES)}")
+    db = db or DBManager(DATABASE_NAME)
+    with db.transaction():
+        existing = db.fetch_one(
+            "SELECT job_id FROM pdf_jobs WHERE kind = ? AND invoice_id = ? AND status IN ('queued', 'running')",
+            (kind, invoice_id)
+        )
+        if existing:
+            job_id = existing[0]
+        else:
+            now = _now()
+            db.execute_query(
+                "INSERT INTO pdf_jobs (kind, invoice_id, max_attempts, run_after, created_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, invoice_id, max_attempts, now, now)
+            )
+            job_id = db.fetch_one("SELECT last_insert_rowid()")[0]
+    log.debug("Queued PDF job", extra={'job_id': job_id, 'kind': kind, 'invoice_id': invoice_id})
+    start_workers()
+    _wake.set()
+    return job_id
+
+def get_job(job_id, db=None):
+    """The job as a dict (see JOB_COLUMNS), or None."""
+    db = db or DBManager(DATABASE_NAME)
+    row = db.fetch_one(_SELECT_JOB + " WHERE job_id = ?", (job_id,))
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+def list_jobs(status=None, limit=200, db=None):
+    """The newest jobs first, optionally only those with one status."""
+    db = db or DBManager(DATABASE_NAME)
+    if status is None:
+        rows = db.fetch_all(_SELECT_JOB + " ORDER BY job_id DESC LIMIT ?", (limit,))
+    else:
+        rows = db.fetch_all(_SELECT_JOB + " WHERE status = ? ORDER BY job_id DESC LIMIT ?", (status, limit))
+    return [dict(zip(JOB_COLUMNS, row)) for row in rows]
+
+def count_jobs(db=None):
+    """{status: number of jobs} for every status in JOB_STATUSES."""
+    db = db or DBManager(DATABASE_NAME)
+    counts = dict.fromkeys(JOB_STATUSES, 0)
+    for status in JOB_STATUSES:
+        counts[status] = db.fetch_one("SELECT COUNT(*) FROM pdf_jobs WHERE status = ?", (status,))[0]
+    return counts
+
+def retry_job(job_id, db=None):
+    """
+    Puts a failed job back in the queue with a fresh set of attempts.
+
+    Returns:
+        bool: True if the job was failed and is queued again.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    with db.transaction():
+        if not db.fetch_one("SELECT 1 FROM pdf_jobs WHERE job_id = ? AND status = 'failed'", (job_id,)):
+            return False
+        db.execute_query(
+            "UPDATE pdf_jobs SET status = 'queued', attempts = 0, run_after = ?, error = NULL, finished_at = NULL WHERE job_id = ?",
+            (_now(), job_id)
+        )
+    start_workers()
+    _wake.set()
+    return True
+
+def _worker_prefix():
+    """Start of the worker names of this process's threads, see start_workers."""
+    return f"pdf-worker-{os.getpid()}-"
+
+def requeue_stale_jobs(db=None, other_processes=False):
+    """
+    Puts jobs back in the queue that a crashed or killed worker left 'running'.
+    A job that has used up its attempts is marked 'failed' instead, so a bill
+    that takes its worker down with it isn't retried forever.
+
+    Args:
+        other_processes (bool): Requeue every running job not claimed by this
+            process, whatever its age (at start-up, before this process has
+            claimed anything). Otherwise only jobs running for more than
+            PDF_JOB_STALE_SECONDS.
+
+    Returns:
+        int: Number of jobs requeued or failed.
+    """
+    db = db or DBManager(DATABASE_NAME)
+    now = _now()
+    error = "Interrupted: the worker stopped while rendering"
+    if other_processes:
+        rows = db.fetch_all(
+            "UPDATE pdf_jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "run_after = ?, error = ?, finished_at = CASE WHEN attempts >= max_attempts THEN ? END "
+            "WHERE status = 'running' AND (worker IS NULL OR worker NOT LIKE ?) RETURNING job_id",
+            (now, error, now, _worker_prefix() + '%')
+        )
+    else:
+        rows = db.fetch_all(
+            "UPDATE pdf_jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+            "run_after = ?, error = ?, finished_at = CASE WHEN attempts >= max_attempts THEN ? END "
+            "WHERE status = 'running' AND started_at < ? RETURNING job_id",
+            (now, error, now, _now(-PDF_JOB_STALE_SECONDS))
+        )
+    if rows:
+        log.warning("Requeued or failed %d interrupted PDF job(s)", len(rows), extra={'job_ids': [row[0] for row in rows]})
+    return len(rows)
+
+def _claim_job(db, worker):
+    """Marks the oldest runnable job running and returns (job_id, kind, invoice_id, attempts, max_attempts), or None."""
+    with db.transaction(): # BEGIN IMMEDIATE: no other worker can claim the same row in between
+        job = db.fetch_one(
+            "SELECT job_id, kind, invoice_id, attempts, max_attempts FROM pdf_jobs "
+            "WHERE status = 'queued' AND run_after <= ? ORDER BY run_after, job_id LIMIT 1",
+            (_now(),)
+        )
+        if job is None:
+            return None
+        db.execute_query(
+            "UPDATE pdf_jobs SET status = 'running', attempts = attempts + 1, started_at = ?, worker = ? WHERE job_id = ?",
+            (_now(), worker, job[0])
+        )
+    return job[0], job[1], job[2], job[3] + 1, job[4]
+
+def _render(kind, invoice_id):
+    """Renders a bill's PDF into the daily bills folder. Returns (file_path, filename)."""
+    fetch, (module_name, function_name) = _JOB_TYPES[kind]
+    details, data, items = fetch(invoice_id)
+    if not data:
+        raise LookupError(f"{kind} {invoice_id} not found")
+    generate = getattr(__import__(module_name, fromlist=[function_name]), function_name)
+    file_path = generate(details, data, items, download=False)
+    return file_path, os.path.basename(file_path)
+
+def run_job(job, db, worker):
+    """Renders one claimed job and records the outcome (done, queued again for a retry, or failed)."""
+    job_id, kind, invoice_id, attempts, max_attempts = job
+    start = time.perf_counter()
+    try:
+        file_path, filename = _render(kind, invoice_id)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        retry = attempts < max_attempts and not isinstance(e, LookupError) # A deleted bill won't come back
+        if retry:
+            delay = PDF_JOB_RETRY_DELAYS[min(attempts - 1, len(PDF_JOB_RETRY_DELAYS) - 1)]
+            db.execute_query(
+                "UPDATE pdf_jobs SET status = 'queued', run_after = ?, error = ? WHERE job_id = ?",
+                (_now(delay), error, job_id)
+            )
+            log.warning("PDF job failed, retrying in %ss: %s", delay, error,
+                        extra={'job_id': job_id, 'invoice_id': invoice_id, 'attempt': attempts})
+        else:
+            db.execute_query(
+                "UPDATE pdf_jobs SET status = 'failed', error = ?, finished_at = ? WHERE job_id = ?",
+                (error, _now(), job_id)
+            )
+            log.error("PDF job failed: %s", error, extra={'job_id': job_id, 'invoice_id': invoice_id, 'attempt': attempts})
+        return False
+    db.execute_query(
+        "UPDATE pdf_jobs SET status = 'done', file_path = ?, filename = ?, error = NULL, finished_at = ? WHERE job_id = ?",
+        (file_path, filename, _now(), job_id)
+    )
+    log.info("Rendered PDF in %.0f ms", (time.perf_counter() - start) * 1000,
+             extra={'job_id': job_id, 'kind': kind, 'invoice_id': invoice_id})
+    return True
+
+def _worker_loop(name):
+    db = DBManager(DATABASE_NAME)
+    last_stale_check = time.monotonic()
+    while True:
+        if time.monotonic() - last_stale_check >= PDF_JOB_STALE_CHECK_SECONDS:
+            last_stale_check = time.monotonic()
+            try:
+                requeue_stale_jobs(db)
+            except Exception:
+                log.exception("Could not requeue stale PDF jobs", extra={'worker': name})
+        _wake.clear() # Before claiming, so a job enqueued after an empty claim still wakes us
+        try:
+            job = _claim_job(db, name)
+        except Exception:
+            log.exception("Could not claim a PDF job", extra={'worker': name})
+            job = None
+        if job is None:
+            _wake.wait(PDF_JOB_POLL_SECONDS)
+            continue
+        try:
+            run_job(job, db, name)
+        except Exception:
+            # Recording the outcome failed (e.g. database locked for too long); the stale check requeues it
+            log.exception("Could not record PDF job outcome", extra={'job_id': job[0]})
+
+def start_workers(count=PDF_JOB_WORKERS):
+    """Starts this process's worker threads, once. Safe to call on every rerun."""
+    with _workers_lock:
+        if any(worker.is_alive() for worker in _workers):
+            return
+        _workers.clear()
+        try:
+            requeue_stale_jobs(other_processes=True) # Left by this app's previous run
+        except Exception:
+            log.exception("Could not requeue stale PDF jobs")
+        for i in range(count):
+            worker = threading.Thread(target=_worker_loop, args=(f"{_worker_prefix()}{i + 1}",),
+                                      name=f"pdf-worker-{i + 1}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+
+def wait_for_job(job_id, timeout=30.0, interval=0.05, db=None):
+    """Polls until the job is done or failed (or timeout seconds pass) and returns it; for scripts and benchmarks."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_job(job_id, db)
+        if job is None or job['status'] in ('done', 'failed') or time.monotonic() >= deadline:
+            return job
+        time.sleep(interval)
@@ -0,0 +1,138 @@
+import os
+import threading
+from types import MappingProxyType
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# TrueType fonts used when present in the working folder; Helvetica otherwise
+REGULAR_FONT = ('Arial', 'arial.ttf')
+BOLD_FONT = ('Arial-Bold', 'arialbd.ttf')
+
+# Font sizes shared by the sale, purchase and deposit invoices
+STYLE_FONT_SIZES = {
+    'Normal': 12,
+    'h1': 16,
+    'h2': 14,
+    'h3': 10,
+    'h4': 10,
+}
+
+_lock = threading.Lock()
+_fonts = None
+_styles = None
+
+
+class FrozenParagraphStyle(ParagraphStyle):
+    """
+    A ParagraphStyle that cannot be modified, so one cached instance can be
+    shared by every invoice and every Streamlit session thread.
+    Use clone() to get an editable variant.
+    """
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"PDF style '{self.name}' is shared and read-only; use clone() for a variant")
+        super().__setattr__(name, value)
+
+    def clone(self, name, parent=None, **kwds):
+        attrs = {key: value for key, value in self.__dict__.items() if key not in ('name', 'parent', '_frozen')}
+        attrs.update(kwds)
+        return ParagraphStyle(name, parent=parent, **attrs)
+
+
+def _freeze(style):
+    frozen = FrozenParagraphStyle(style.name)
+    frozen.__dict__.update({key: value for key, value in style.__dict__.items() if key != 'parent'})
+    frozen.__dict__['parent'] = None # Attributes are already resolved from the parent
+    frozen.__dict__['_frozen'] = True
+    return frozen
+
+
+def _register_fonts():
+    font_name = 'Helvetica' # Default fallback
+    bold_font_name = 'Helvetica-Bold' # Default bold fallback
+    try:
+        if os.path.exists(REGULAR_FONT[1]):
+            pdfmetrics.registerFont(TTFont(*REGULAR_FONT))
+            font_name = REGULAR_FONT[0]
+            # Arial without its bold file keeps Helvetica-Bold for bold text
+            if os.path.exists(BOLD_FONT[1]):
+                pdfmetrics.registerFont(TTFont(*BOLD_FONT))
+                bold_font_name = BOLD_FONT[0]
+    except Exception as e:
+        # Fallback to Helvetica if any font registration fails
+        log.warning("Could not register Arial fonts. Falling back to Helvetica: %s", e)
+        font_name = 'Helvetica'
+        bold_font_name = 'Helvetica-Bold'
+    return font_name, bold_font_name
+
+
+def get_pdf_fonts():
+    """
+    Registers the invoice fonts on first use and returns their names.
+
+    TTF parsing is the slow part of rendering a bill, so it happens once per
+    process instead of once per invoice.
+
+    Returns:
+        tuple: (font_name, bold_font_name), e.g. ('Arial', 'Arial-Bold') or
+               ('Helvetica', 'Helvetica-Bold') when arial.ttf is not available.
+    """
+    global _fonts
+    if _fonts is None:
+        with _lock:
+            if _fonts is None:
+                _fonts = _register_fonts()
+    return _fonts
+
+
+def get_font_signature():
+    """
+    Identifies the fonts invoices are rendered with, for the PDF cache key
+    (utils/pdf_cache.py): the font names plus the size and modification time
+    of each TrueType file in use, so replacing arial.ttf invalidates cached PDFs.
+
+    Returns:
+        tuple: (font_name, bold_font_name, ((file, size, mtime_ns), ...))
+    """
+    font_name, bold_font_name = get_pdf_fonts()
+    files = []
+    for name, path in (REGULAR_FONT, BOLD_FONT):
+        if name in (font_name, bold_font_name):
+            try:
+                stat = os.stat(path)
+                files.append((path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                files.append((path, None, None)) # Removed since it was registered
+    return font_name, bold_font_name, tuple(files)
+
+
+def get_pdf_styles():
+    """
+    Returns the shared, read-only invoice stylesheet.
+
+    Built once per process from getSampleStyleSheet() with the invoice font
+    and the sizes in STYLE_FONT_SIZES. Look styles up as before
+    (styles['h3']); the styles themselves raise if modified.
+
+    Returns:
+        Mapping: style name -> FrozenParagraphStyle.
+    """
+    global _styles
+    if _styles is None:
+        font_name, _ = get_pdf_fonts()
+        with _lock:
+            if _styles is None:
+                sample = getSampleStyleSheet()
+                for name, size in STYLE_FONT_SIZES.items():
+                    sample[name].fontName = font_name
+                    sample[name].fontSize = size
+                styles = {name: _freeze(style) for name, style in sample.byName.items()}
+                # Short aliases ('h1' for 'Heading1', ...) point at the same frozen style
+                styles.update({alias: styles[style.name] for alias, style in sample.byAlias.items()})
+                _styles = MappingProxyType(styles)
+    return _styles
@@ -0,0 +1,144 @@
+import ast
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+from utils.db_manager import DBManager, close_all_pools
+
+# Tables that grow with every bill; a full SCAN of these is a regression
+LARGE_TABLES = {
+    'sales', 'sale_items', 'purchases', 'purchase_items',
+    'udhaar', 'udhaar_transactions', 'udhaar_deposits',
+    'purchase_udhaar', 'purchase_udhaar_transactions',
+    'inventory_transactions',
+}
+
+# (source file, table, query fragment) for full scans that are intentional:
+# whole-history aggregates and the pick-any-bill dropdowns
+INTENTIONAL_FULL_SCANS = [
+    ('ui/reports_section.py', 'sale_items', 'FROM sale_items si'), # Inventory Value Report
+    ('ui/reports_section.py', 'purchase_items', 'FROM purchase_items pi'), # Inventory Value Report
+    ('ui/reports_section.py', 'sales', 'GROUP BY s.customer_id'), # Top Customers
+    ('ui/reprint_section.py', 'sales', 'SELECT invoice_id FROM sales ORDER BY invoice_id DESC'),
+    ('ui/modify_bill_section.py', 'sales', 'FROM sales ORDER BY created_at DESC'),
+    ('ui/modify_bill_section.py', 'purchases', 'FROM purchases ORDER BY created_at DESC'),
+    ('ui/modify_bill_section.py', 'udhaar_deposits', 'FROM udhaar_deposits ORDER BY deposit_date DESC'),
+    ('utils/daily_summary.py', 'sales', 'SELECT sale_day FROM sales UNION'), # Full rollup rebuild
+    ('utils/daily_summary.py', 'purchases', 'SELECT purchase_day FROM purchases'),
+]
+
+
+def _is_intentional(rel_path, table, sql):
+    return any(rel_path == path and table == scan_table and fragment in sql
+               for path, scan_table, fragment in INTENTIONAL_FULL_SCANS)
+
+SOURCE_FOLDERS = ('utils', 'ui')
+SQL_STATEMENT = re.compile(r'^\s*(SELECT\s.*\bFROM\b|DELETE\s+FROM\b|UPDATE\s+\w+\s+SET\b)', re.DOTALL) # Upper-case keywords, as written in this repo
+TABLE_ALIAS = re.compile(r'\b(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+SQL_KEYWORDS = {'where', 'join', 'on', 'left', 'inner', 'group', 'order', 'limit', 'set', 'using'}
+
+
+def extract_queries(root):
+    """
+    Finds the literal SQL statements in the utils/ and ui/ source files.
+
+    Returns:
+        list of tuple: (relative file path, line number, sql) for every string
+                       constant that starts with SELECT, UPDATE or DELETE.
+    """
+    queries = []
+    for folder in SOURCE_FOLDERS:
+        for dirpath, _, filenames in os.walk(os.path.join(root, folder)):
+            for filename in sorted(filenames):
+                if not filename.endswith('.py') or filename == 'query_plan_check.py':
+                    continue # Skip this checker's own allow-list fragments
+                path = os.path.join(dirpath, filename)
+                with open(path, encoding='utf-8') as f:
+                    tree = ast.parse(f.read(), filename=path)
+                rel_path = os.path.relpath(path, root).replace(os.sep, '/')
+                for node in ast.walk(tree):
+                    if isinstance(node, ast.Constant) and isinstance(node.value, str) and SQL_STATEMENT.match(node.value):
+                        queries.append((rel_path, node.lineno, node.value.strip()))
+    return queries
+
+
+def _table_aliases(sql):
+    aliases = {}
+    for table, alias in TABLE_ALIAS.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def find_full_scans(db_path, root='.'):
+    """
+    Runs EXPLAIN QUERY PLAN for every query in the source tree against db_path.
+
+    Returns:
+        tuple: (scans, errors) where scans lists (file, line, table, plan detail, sql)
+               for queries that fully scan a large table, and errors lists
+               (file, line, error, sql) for queries that could not be planned.
+    """
+    conn = sqlite3.connect(db_path) # Plain connection: planning failures are expected and reported, not logged
+    conn.execute("PRAGMA foreign_keys = ON") # So DELETE plans include the foreign key child lookups
+    # Scanning a partial index only visits the rows it covers (e.g. pending balances)
+    partial_indexes = {name for name, index_sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql LIKE '% WHERE %'")}
+    scans = []
+    errors = []
+    for rel_path, line, sql in extract_queries(root):
+        if re.search(r'\bLIMIT 0\s*$', sql):
+            continue # Reads no rows
+        params = (None,) * sql.count('?')
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except sqlite3.Error as e:
+            errors.append((rel_path, line, str(e), sql))
+            continue
+        aliases = _table_aliases(sql)
+        has_limit = re.search(r'\bLIMIT\b', sql) is not None
+        for _, _, _, detail in plan:
+            match = re.match(r'SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?', detail)
+            if not match:
+                continue # SEARCH steps use an index lookup
+            if match.group(2) and (has_limit or match.group(2) in partial_indexes):
+                continue # Top-N read in index order, or a bounded partial index
+            table = aliases.get(match.group(1), match.group(1))
+            if table in LARGE_TABLES and not _is_intentional(rel_path, table, sql):
+                scans.append((rel_path, line, table, detail, sql))
+    conn.close()
+    return scans, errors
+
+
+def check_query_plans(root='.'):
+    """
+    Builds a scratch database with the current schema and indexes and reports
+    every query that regressed to a full table scan. Returns True when clean.
+    """
+    from utils.config import create_tables # Local import: config imports DBManager too
+
+    root = os.path.abspath(root)
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        os.chdir(scratch) # create_tables() works on DATABASE_NAME in the current folder
+        try:
+            create_tables()
+            db_path = os.path.abspath(DBManager().db_path)
+            scans, errors = find_full_scans(db_path, root)
+        finally:
+            close_all_pools() # Don't leave pooled connections to the scratch file behind
+            os.chdir(cwd)
+
+    for rel_path, line, error, sql in errors:
+        print(f"Warning: {rel_path}:{line}: could not plan query ({error})")
+    for rel_path, line, table, detail, sql in scans:
+        print(f"FULL SCAN {rel_path}:{line}: {detail} (table {table})\n    {' '.join(sql.split())}")
+    print(f"{len(scans)} full table scan(s) found.")
+    return not scans
+
+
+if __name__ == "__main__":
+    # python -m utils.query_plan_check  (exit code 1 if any query scans a large table)
+    sys.exit(0 if check_query_plans() else 1)
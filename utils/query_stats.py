@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+# Per-statement timing for DBManager.
+#
+# Every statement DBManager runs is reduced to a fingerprint (the SQL with
+# literals replaced by ? and whitespace collapsed), and its time, row count and
+# lock retries are added to an in-memory histogram for that fingerprint.
+# Statements slower than SLOW_QUERY_THRESHOLD_MS are also written to a
+# rotating JSON-lines log. The numbers are per server process and start over
+# when the app restarts; ui/query_stats_section.py shows them.
+QUERY_STATS_ENABLED = True
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_LOG = os.path.join('logs', 'slow_queries.log') # Relative to the app folder, like DATABASE_NAME
+SLOW_QUERY_LOG_MAX_BYTES = 5 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+SLOW_QUERY_SQL_CHARS = 2000 # Longer statements are cut in the log
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000) # Upper bounds; one more bucket for slower
+MAX_FINGERPRINTS = 1000 # Dynamically built SQL beyond this is counted under OTHER_FINGERPRINT
+OTHER_FINGERPRINT = '<other>'
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)") # IN (?, ?, ?) of any length
+_SPACES = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Normalizes a statement so all executions of the same query group together.
+
+    Comments are dropped, string and number literals become ?, parameter lists
+    of any length become (?+) and whitespace is collapsed, e.g.
+    "SELECT * FROM sales WHERE invoice_id IN (?, ?)  LIMIT 5" gives
+    "SELECT * FROM sales WHERE invoice_id IN (?+) LIMIT ?".
+    """
+    sql = _COMMENTS.sub(' ', sql)
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _PARAM_LISTS.sub('(?+)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """
+    Thread-safe per-fingerprint counters and latency histograms.
+
+    Streamlit serves every session from its own thread, so one instance
+    (query_stats below) collects the statements of all of them.
+    """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS, max_fingerprints=MAX_FINGERPRINTS):
+        self.buckets = tuple(buckets)
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.started_at = time.time()
+
+    def _new_entry(self):
+        return {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'lock_retries': 0, 'errors': 0,
+                'histogram': [0] * (len(self.buckets) + 1)}
+
+    def record(self, sql, elapsed_ms, rows=0, lock_retries=0, error=None):
+        """Adds one execution of sql to its fingerprint's counters."""
+        key = fingerprint(sql)
+        bucket = 0
+        while bucket < len(self.buckets) and elapsed_ms > self.buckets[bucket]:
+            bucket += 1
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    key = OTHER_FINGERPRINT
+                    entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = self._new_entry()
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows
+            entry['lock_retries'] += lock_retries
+            entry['errors'] += error is not None
+            entry['histogram'][bucket] += 1
+
+    def _percentile(self, entry, fraction):
+        # Upper bound of the bucket holding the percentile, capped at the slowest call seen
+        needed = fraction * entry['calls']
+        seen = 0
+        for bucket, count in enumerate(entry['histogram']):
+            seen += count
+            if seen >= needed:
+                break
+        if bucket < len(self.buckets):
+            return min(self.buckets[bucket], entry['max_ms'])
+        return entry['max_ms']
+
+    def snapshot(self):
+        """
+        Current counters, one dict per fingerprint.
+
+        Returns:
+            list of dict: fingerprint, calls, total_ms, mean_ms, p50_ms, p95_ms
+                          (histogram bucket bounds), max_ms, rows, lock_retries,
+                          errors and the raw histogram counts.
+        """
+        with self._lock:
+            entries = [(key, dict(entry, histogram=list(entry['histogram']))) for key, entry in self._entries.items()]
+        rows = []
+        for key, entry in entries:
+            calls = entry['calls']
+            rows.append({
+                'fingerprint': key,
+                'calls': calls,
+                'total_ms': entry['total_ms'],
+                'mean_ms': entry['total_ms'] / calls,
+                'p50_ms': self._percentile(entry, 0.50),
+                'p95_ms': self._percentile(entry, 0.95),
+                'max_ms': entry['max_ms'],
+                'rows': entry['rows'],
+                'lock_retries': entry['lock_retries'],
+                'errors': entry['errors'],
+                'histogram': entry['histogram'],
+            })
+        return rows
+
+    def top(self, n=10, by='total_ms'):
+        """The n fingerprints with the highest value of `by` (e.g. 'total_ms', 'max_ms', 'calls', 'p95_ms')."""
+        return sorted(self.snapshot(), key=lambda row: row[by], reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self.started_at = time.time()
+
+
+query_stats = QueryStats() # Process-wide, fed by every DBManager
+
+_slow_log = None
+_slow_log_lock = threading.Lock()
+
+def _slow_query_logger():
+    """The rotating slow-query log, opened on the first slow statement."""
+    global _slow_log
+    with _slow_log_lock:
+        if _slow_log is None:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG) or '.', exist_ok=True)
+            handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                          backupCount=SLOW_QUERY_LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.getLogger('jewellery.slow_queries')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False # One JSON object per line, not mixed into the console output
+            logger.addHandler(handler)
+            _slow_log = logger
+        return _slow_log
+
+def configure(threshold_ms=None, enabled=None, log_path=None):
+    """
+    Changes the slow-query threshold, turns collection on/off or moves the log file.
+
+    Args:
+        threshold_ms (float, optional): Statements slower than this are logged.
+        enabled (bool, optional): False skips timing altogether.
+        log_path (str, optional): New slow-query log file; takes effect for the next slow statement.
+    """
+    global SLOW_QUERY_THRESHOLD_MS, QUERY_STATS_ENABLED, SLOW_QUERY_LOG, _slow_log
+    if threshold_ms is not None:
+        SLOW_QUERY_THRESHOLD_MS = threshold_ms
+    if enabled is not None:
+        QUERY_STATS_ENABLED = enabled
+    if log_path is not None:
+        with _slow_log_lock:
+            SLOW_QUERY_LOG = log_path
+            if _slow_log is not None:
+                for handler in list(_slow_log.handlers):
+                    _slow_log.removeHandler(handler)
+                    handler.close()
+            _slow_log = None
+
+def record_query(db_path, sql, elapsed_ms, rows=0, lock_retries=0, error=None):
+    """
+    Called by DBManager after every statement (including failed ones).
+
+    Parameters are never logged: they hold customer names, phones and PANs.
+    """
+    if not QUERY_STATS_ENABLED:
+        return
+    query_stats.record(sql, elapsed_ms, rows, lock_retries, error)
+    if elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+        _slow_query_logger().info(json.dumps({
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'lock_retries': lock_retries,
+            'error': error,
+            'database': os.path.basename(db_path),
+            'thread': threading.current_thread().name,
+            'fingerprint': fingerprint(sql),
+            'sql': ' '.join(sql.split())[:SLOW_QUERY_SQL_CHARS],
+        }))
+
+def read_slow_queries(limit=100):
+    """The most recent entries of the current slow-query log file, newest first."""
+    if not os.path.exists(SLOW_QUERY_LOG):
+        return []
+    with open(SLOW_QUERY_LOG, encoding='utf-8') as f:
+        lines = f.readlines()[-limit:]
+    entries = []
+    for line in reversed(lines):
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue # A line cut short by a crash or rotation
+    return entries
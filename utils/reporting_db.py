@@ -0,0 +1,127 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from utils.config import DATABASE_NAME
+from utils.db_manager import DBManager, CONNECT_TIMEOUT
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
+
+# Read path for the Reports & Analytics screens.
+#
+# Reports never use the read-write connections the counter saves bills on:
+#
+# 'snapshot' (default): read-only (mode=ro) connections to the live database.
+#     In WAL mode a reader works on a snapshot and never blocks a writer, and
+#     each report runs its queries inside one short read transaction, so they
+#     agree with each other even if a sale is saved half-way through. The
+#     rendering happens after it ends, so the snapshot isn't held for the run.
+# 'replica': the same read-only connections, but to REPORTING_REPLICA, a copy
+#     of the live database made with the SQLite online backup API and refreshed
+#     in the background once it is older than REPLICA_MAX_AGE seconds. Reports
+#     may then be up to that old, but a long aggregate doesn't even hold a WAL
+#     snapshot on the live file (a held snapshot stops checkpoints from
+#     recycling the WAL, so it keeps growing while the counter writes).
+#
+# The replica can also be refreshed from a scheduled task:
+#     python -m utils.reporting_db --refresh
+REPORTING_MODE = 'snapshot'
+REPORTING_REPLICA = 'jewellery_app_reports.db' # Relative to the app folder, like DATABASE_NAME
+REPLICA_MAX_AGE = 15 * 60 # Seconds
+REPLICA_BACKUP_PAGES = -1 # -1: copy in one step. Stepped copies restart whenever a bill is saved meanwhile.
+
+_refresh_lock = threading.Lock()
+_background_lock = threading.Lock()
+_background_refresh = None # The running background refresh thread, if any
+
+def replica_age(replica_path=REPORTING_REPLICA):
+    """Seconds since the replica was last refreshed, or None if it doesn't exist yet."""
+    try:
+        return max(time.time() - os.path.getmtime(replica_path), 0)
+    except OSError:
+        return None
+
+def refresh_replica(source_path=DATABASE_NAME, replica_path=REPORTING_REPLICA, pages=REPLICA_BACKUP_PAGES):
+    """
+    Copies the live database into the reporting replica with the online backup API.
+
+    The source is read through a read-only connection, i.e. one WAL snapshot
+    that doesn't stop bills from being saved during the copy. The replica is
+    overwritten in place in WAL mode, so reports already running on it keep
+    their old snapshot and the next query sees the new copy; no file is swapped
+    under an open connection.
+
+    Args:
+        source_path (str): The live database.
+        replica_path (str): The replica file, created if missing.
+        pages (int): Pages copied per backup step (-1: all in one step).
+
+    Returns:
+        float: Seconds the copy took.
+    """
+    with _refresh_lock: # One refresh at a time; a second caller waits and then copies again
+        start = time.perf_counter()
+        source = sqlite3.connect(f"file:{quote(os.path.abspath(source_path))}?mode=ro", uri=True, timeout=CONNECT_TIMEOUT)
+        replica = sqlite3.connect(replica_path, timeout=CONNECT_TIMEOUT)
+        try:
+            replica.execute("PRAGMA journal_mode = WAL").fetchall() # Readers of the old copy don't block the refresh
+            source.backup(replica, pages=pages)
+        finally:
+            replica.close()
+            source.close()
+        os.utime(replica_path) # mtime is the refresh time, even when no page changed
+        elapsed = time.perf_counter() - start
+        log.info("Refreshed reporting replica in %.2fs", elapsed, extra={'replica': replica_path})
+        return elapsed
+
+def _refresh_in_background(source_path, replica_path):
+    global _background_refresh
+
+    def run():
+        try:
+            refresh_replica(source_path, replica_path)
+        except sqlite3.Error:
+            log.exception("Reporting replica refresh failed", extra={'replica': replica_path})
+
+    with _background_lock: # Every report page load checks the age; start one refresh, not one per session
+        if _background_refresh is None or not _background_refresh.is_alive():
+            _background_refresh = threading.Thread(target=run, name="replica-refresh", daemon=True)
+            _background_refresh.start()
+
+def reporting_db(mode=None, source_path=DATABASE_NAME, replica_path=REPORTING_REPLICA, max_age=REPLICA_MAX_AGE):
+    """
+    The DBManager reports should read from (read-only, see the notes above).
+
+    In 'replica' mode a stale replica is refreshed in a background thread and
+    the current copy is used meanwhile; before the first copy exists, reports
+    read the live database (read-only) instead.
+
+    Args:
+        mode (str, optional): 'snapshot' or 'replica'. Defaults to REPORTING_MODE.
+
+    Returns:
+        DBManager: A read_only manager; wrap each report's queries in its transaction().
+    """
+    mode = mode or REPORTING_MODE
+    if mode not in ('snapshot', 'replica'):
+        raise ValueError(f"Unknown reporting mode {mode!r}; expected 'snapshot' or 'replica'")
+    if mode == 'replica':
+        age = replica_age(replica_path)
+        if age is None or age > max_age:
+            _refresh_in_background(source_path, replica_path)
+        if age is not None:
+            return DBManager(replica_path, read_only=True)
+    return DBManager(source_path, read_only=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh or inspect the reporting replica.")
+    parser.add_argument("--refresh", action="store_true", help="copy the live database into the replica now")
+    args = parser.parse_args()
+    if args.refresh:
+        print(f"Refreshed {REPORTING_REPLICA} in {refresh_replica():.2f}s")
+    age = replica_age()
+    print(f"{REPORTING_REPLICA}: " + ("not created yet" if age is None else f"refreshed {age:.0f}s ago"))
@@ -1,9 +1,13 @@
-import streamlit as st
 import sqlite3
 from datetime import datetime
 from utils.config import DATABASE_NAME, BILLS_FOLDER
 from utils.get_pending_purchase_udhaar import update_purchase_udhaar
 from utils.db_manager import DBManager # Import the new DBManager
+from utils.daily_summary import refresh_daily_summary
+from utils.errors import ServiceError, ValidationError, ConflictError
+from utils.app_logging import get_logger
+
+log = get_logger(__name__)
 
 def save_sale(invoice_id, customer_id, total_amount, cheque_amount, online_amount, upi_amount, cash_amount, old_gold_amount, amount_balance, payment_mode, payment_other_info, sale_date, sale_items_data, applied_purchase_udhaar=0.0):
     """
@@ -34,154 +38,176 @@ def save_sale(invoice_id, customer_id, total_amount, cheque_amount, online_amoun
         applied_purchase_udhaar (float, optional): Amount of pending purchase udhaar applied to this sale. Defaults to 0.0.
 
     Returns:
-        str: The invoice_id if the sale is saved successfully, None otherwise.
+        dict: {'invoice_id': str, 'unapplied_purchase_udhaar': float} - the part of
+              applied_purchase_udhaar that found no pending purchase to clear (0.0 normally).
+
+    Raises:
+        ValidationError: If the customer, items or amounts are missing or invalid.
+        ConflictError: If a sale with this invoice_id already exists.
+        ServiceError: If the database write fails, or applying the purchase udhaar does; nothing is saved.
     """
     # Validation
     if not customer_id:
-        st.error("Customer is required for sale!")
-        return None
+        raise ValidationError("Customer is required for sale!", field="customer_id")
 
     if not sale_items_data:
-        st.error("At least one sale item is required!")
-        return None
+        raise ValidationError("At least one sale item is required!", field="sale_items_data")
 
     if total_amount <= 0:
-        st.error("Total amount must be greater than zero!")
-        return None
+        raise ValidationError("Total amount must be greater than zero!", field="total_amount")
 
     # Validate each item has required fields
     for item in sale_items_data:
         if not all(key in item for key in ['metal', 'metal_rate', 'description', 'qty', 'net_wt', 'amount']):
-            st.error("All item details are required (metal, rate, description, quantity, weight, amount)")
-            return None
+            raise ValidationError("All item details are required (metal, rate, description, quantity, weight, amount)", field="sale_items_data")
 
         if item['qty'] <= 0 or item['net_wt'] <= 0 or item['amount'] <= 0:
-            st.error("Quantity, weight, and amount must be greater than zero!")
-            return None
+            raise ValidationError("Quantity, weight, and amount must be greater than zero!", field="sale_items_data")
 
     db = DBManager(DATABASE_NAME) # Use DBManager
 
     try:
         current_timestamp = datetime.now().isoformat() # For created_at and updated_at
 
-        # Insert into sales table
-        db.execute_query(
-            """
-            INSERT INTO sales (
-                invoice_id, sale_date, customer_id, total_amount,
-                cheque_amount, online_amount, upi_amount, cash_amount,
-                old_gold_amount, amount_balance, payment_mode, payment_other_info,
-                created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                invoice_id, sale_date, customer_id, total_amount,
-                cheque_amount, online_amount, upi_amount, cash_amount,
-                old_gold_amount, amount_balance, payment_mode, payment_other_info,
-                current_timestamp, current_timestamp
-            )
-        )
-
-        for item in sale_items_data:
-            # Extract item details, providing defaults for new fields
-            product_id = item.get('product_id') # Can be None if not linked to a product
-            gross_wt = item.get('gross_wt', 0.0)
-            loss_wt = item.get('loss_wt', 0.0)
-            making_charge = item.get('making_charge', 0.0)
-            making_charge_type = item.get('making_charge_type', 'fixed') # Default type
-            stone_weight = item.get('stone_weight', 0.0)
-            stone_charge = item.get('stone_charge', 0.0)
-            wastage_percentage = item.get('wastage_percentage', 0.0)
-            # Use defaults from table schema if not provided in item data
-            cgst_rate = item.get('cgst_rate', 1.5)
-            sgst_rate = item.get('sgst_rate', 1.5)
-            hsn = item.get('hsn', '7113')
-            purity = item.get('purity') # Purity can be None if not applicable or chosen
-
-            # Insert into sale_items table with all new columns
+        with db.transaction(): # One atomic commit for the whole bill
+            # Insert into sales table
             db.execute_query(
                 """
-                INSERT INTO sale_items (
-                    invoice_id, product_id, metal, metal_rate, description, qty, net_wt,
-                    purity, gross_wt, loss_wt, making_charge, making_charge_type,
-                    stone_weight, stone_charge, wastage_percentage, amount,
-                    cgst_rate, sgst_rate, hsn, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO sales (
+                    invoice_id, sale_date, customer_id, total_amount,
+                    cheque_amount, online_amount, upi_amount, cash_amount,
+                    old_gold_amount, amount_balance, payment_mode, payment_other_info,
+                    created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
+                    invoice_id, sale_date, customer_id, total_amount,
+                    cheque_amount, online_amount, upi_amount, cash_amount,
+                    old_gold_amount, amount_balance, payment_mode, payment_other_info,
+                    current_timestamp, current_timestamp
+                )
+            )
+
+            # Keep the daily report rollup in step with the new bill
+            sale_day = db.fetch_one("SELECT sale_day FROM sales WHERE invoice_id = ?", (invoice_id,))[0]
+            refresh_daily_summary([sale_day], db)
+
+            item_rows = []
+            stocked_items = []
+            for item in sale_items_data:
+                # Extract item details, providing defaults for new fields
+                product_id = item.get('product_id') # Can be None if not linked to a product
+                gross_wt = item.get('gross_wt', 0.0)
+                loss_wt = item.get('loss_wt', 0.0)
+                making_charge = item.get('making_charge', 0.0)
+                making_charge_type = item.get('making_charge_type', 'fixed') # Default type
+                stone_weight = item.get('stone_weight', 0.0)
+                stone_charge = item.get('stone_charge', 0.0)
+                wastage_percentage = item.get('wastage_percentage', 0.0)
+                # Use defaults from table schema if not provided in item data
+                cgst_rate = item.get('cgst_rate', 1.5)
+                sgst_rate = item.get('sgst_rate', 1.5)
+                hsn = item.get('hsn', '7113')
+                purity = item.get('purity') # Purity can be None if not applicable or chosen
+
+                item_rows.append((
                     invoice_id, product_id, item['metal'], item['metal_rate'], item['description'],
                     item['qty'], item['net_wt'], purity, gross_wt, loss_wt,
                     making_charge, making_charge_type, stone_weight, stone_charge,
                     wastage_percentage, item['amount'], cgst_rate, sgst_rate, hsn,
                     current_timestamp, current_timestamp
-                )
+                ))
+                if product_id:
+                    stocked_items.append((product_id, item['qty']))
+
+            # Insert all rows into sale_items table in one executemany call
+            db.execute_many(
+                """
+                INSERT INTO sale_items (
+                    invoice_id, product_id, metal, metal_rate, description, qty, net_wt,
+                    purity, gross_wt, loss_wt, making_charge, making_charge_type,
+                    stone_weight, stone_charge, wastage_percentage, amount,
+                    cgst_rate, sgst_rate, hsn, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                item_rows
             )
 
             # --- Inventory Management: Update product stock and log transaction ---
-            if product_id:
-                # Update current_stock in products table
-                db.execute_query(
-                    "UPDATE products SET current_stock = current_stock - ?, updated_at = ? WHERE product_id = ?",
-                    (item['qty'], current_timestamp, product_id)
+            inventory_rows = []
+            for product_id, qty in stocked_items:
+                # Update current_stock and read the new value back in the same statement
+                # (one at a time, so a product listed twice logs the right running stock)
+                updated_stock = db.fetch_all(
+                    "UPDATE products SET current_stock = current_stock - ?, updated_at = ? WHERE product_id = ? RETURNING current_stock",
+                    (qty, current_timestamp, product_id)
                 )
+                inventory_rows.append((
+                    product_id, 'sale_out', -qty, updated_stock[0][0],
+                    invoice_id, current_timestamp, f"Sale of {qty} units for invoice {invoice_id}",
+                    current_timestamp
+                ))
+
+            # Log inventory transactions
+            db.execute_many(
+                """
+                INSERT INTO inventory_transactions (
+                    product_id, transaction_type, quantity_change,
+                    current_stock_after, reference_id, transaction_date, notes, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                inventory_rows
+            )
 
-                # Fetch the updated current_stock to log accurately
-                new_stock = db.fetch_one("SELECT current_stock FROM products WHERE product_id = ?", (product_id,))[0]
-
-                # Log inventory transaction
+            # Insert into udhaar table if there's a balance
+            if amount_balance != 0:
+                # Corrected: Use initial_balance and current_balance
                 db.execute_query(
-                    """
-                    INSERT INTO inventory_transactions (
-                        product_id, transaction_type, quantity_change,
-                        current_stock_after, reference_id, transaction_date, notes, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        product_id, 'sale_out', -item['qty'], new_stock,
-                        invoice_id, current_timestamp, f"Sale of {item['qty']} units for invoice {invoice_id}",
-                        current_timestamp
-                    )
+                    "INSERT INTO udhaar (sell_invoice_id, customer_id, initial_balance, current_balance, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (invoice_id, customer_id, amount_balance, amount_balance, 'pending', current_timestamp, current_timestamp)
                 )
 
-        # Insert into udhaar table if there's a balance
-        if amount_balance != 0:
-            # Corrected: Use initial_balance and current_balance
-            db.execute_query(
-                "INSERT INTO udhaar (sell_invoice_id, customer_id, initial_balance, current_balance, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                (invoice_id, customer_id, amount_balance, amount_balance, 'pending', current_timestamp, current_timestamp)
-            )
-
-        # --- Update pending purchase udhaar if applied ---
-        if applied_purchase_udhaar > 0:
-            print(f"Debug (save_sale): Attempting to apply {applied_purchase_udhaar} from purchase udhaar for customer {customer_id}")
-            # Fetch all pending purchase invoices for this supplier/customer
-            pending_purchases = db.fetch_all(
-                "SELECT udhaar_id, purchase_invoice_id, current_balance FROM purchase_udhaar WHERE supplier_id = ? AND current_balance > 0 ORDER BY created_at ASC",
-                (customer_id,)
-            )
-            print(f"Debug (save_sale): Found pending purchases: {pending_purchases}")
-
-            remaining_to_apply = applied_purchase_udhaar
-            for udhaar_id, pur_inv_id, pur_pending_amt in pending_purchases:
-                if remaining_to_apply <= 0:
-                    break
-
-                amount_to_clear_this_invoice = min(remaining_to_apply, pur_pending_amt)
-                print(f"Debug (save_sale): Clearing {amount_to_clear_this_invoice} from purchase invoice {pur_inv_id}")
-
-                # Update the specific purchase udhaar record
-                # This will either reduce the current_balance or set to 0 and update status
-                update_purchase_udhaar(pur_inv_id, amount_to_clear_this_invoice)
-
-                remaining_to_apply -= amount_to_clear_this_invoice
-
-            if remaining_to_apply > 0:
-                st.warning(f"Note: Could not fully apply pending purchase amount. Remaining to apply: {remaining_to_apply:.2f}")
-
-
-        print(f"Debug (save_sale): All transactions for invoice {invoice_id} processed via DBManager.")
-        return invoice_id
-    except Exception as e:
-        st.error(f"Error saving sale: {str(e)}")
-        print(f"Debug (save_sale): Error during save_sale: {e}")
-        return None
+            # --- Update pending purchase udhaar if applied ---
+            remaining_to_apply = 0.0
+            if applied_purchase_udhaar > 0:
+                log.debug("Applying %s from purchase udhaar", applied_purchase_udhaar, extra={'invoice_id': invoice_id, 'customer_id': customer_id})
+                # Fetch all pending purchase invoices for this supplier/customer
+                pending_purchases = db.fetch_all(
+                    "SELECT udhaar_id, purchase_invoice_id, current_balance FROM purchase_udhaar WHERE supplier_id = ? AND current_balance > 0 ORDER BY created_at ASC",
+                    (customer_id,)
+                )
+                log.debug("Found %d pending purchase(s) to clear", len(pending_purchases), extra={'invoice_id': invoice_id})
+
+                remaining_to_apply = applied_purchase_udhaar
+                for udhaar_id, pur_inv_id, pur_pending_amt in pending_purchases:
+                    if remaining_to_apply <= 0:
+                        break
+
+                    amount_to_clear_this_invoice = min(remaining_to_apply, pur_pending_amt)
+                    log.debug("Clearing %s from purchase invoice %s", amount_to_clear_this_invoice, pur_inv_id, extra={'invoice_id': invoice_id})
+
+                    # Update the specific purchase udhaar record
+                    # This will either reduce the current_balance or set to 0 and update status.
+                    # It rolls back its own savepoint on failure; roll the whole sale back too,
+                    # rather than commit a sale whose applied udhaar was never cleared
+                    if not update_purchase_udhaar(pur_inv_id, amount_to_clear_this_invoice):
+                        raise ServiceError(f"Could not clear purchase udhaar for invoice {pur_inv_id}")
+
+                    remaining_to_apply -= amount_to_clear_this_invoice
+
+                if remaining_to_apply > 0:
+                    log.warning("Could not fully apply pending purchase amount; remaining %.2f", remaining_to_apply, extra={'invoice_id': invoice_id})
+
+
+        log.debug("Sale committed", extra={'invoice_id': invoice_id, 'items': len(sale_items_data)})
+        return {'invoice_id': invoice_id, 'unapplied_purchase_udhaar': max(remaining_to_apply, 0.0)}
+    except ServiceError:
+        raise
+    except sqlite3.IntegrityError as e:
+        if "UNIQUE constraint failed: sales.invoice_id" in str(e):
+            raise ConflictError(f"Invoice '{invoice_id}' already exists.") from e
+        log.exception("save_sale failed", extra={'invoice_id': invoice_id})
+        raise ServiceError(f"Error saving sale: {str(e)}") from e
+    except sqlite3.Error as e:
+        log.exception("save_sale failed", extra={'invoice_id': invoice_id})
+        raise ServiceError(f"Error saving sale: {str(e)}") from e